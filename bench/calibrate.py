@@ -0,0 +1,280 @@
+"""
+Timing-profile calibration
+
+Runs the login flow up to (not including) the login click against a target,
+measures how long each step's element really takes to become ready, and
+writes timeouts covering the requested success rate (with a safety margin)
+as a named timing profile that config loads at startup. Only the waits the
+flow blocks on are calibrated: the element readiness timeout, the cookie
+banner dismissal timeout and the grace for the page's answer.
+
+Targets:
+    fake     - FakeWindow on a VirtualClock with jittered delays (instant, offline)
+    fixture  - real pywebview window against the local fixture server
+    live     - real pywebview window against DEEPSEEK_URL (or --url)
+
+Usage:
+    python -m bench.calibrate [--target fake|fixture|live] [--url URL] [--runs N]
+                              [--profile NAME] [--success-rate 0.95] [--margin 2.0]
+"""
+import argparse
+import datetime
+import math
+import random
+import sys
+import tempfile
+import threading
+from urllib.parse import urlparse
+from config import DEEPSEEK_URL, TIMING_PROFILES_FILE
+from config.profiles import TIMING_PROFILE_KEYS, load_timing_profile, save_timing_profile
+from src import logger
+from src.clock import VirtualClock
+from src.element_waiter import COOKIE_TARGET, EMAIL_TARGET, PASSWORD_TARGET, CHAT_TARGET
+from src.js_api import EventBus, JsApi, FIELD_FILLED
+from src.timing import quantile
+from .fake_window import FakePage, FakeWindow
+from .fixtures import fixture_path
+from .run_bench import build_handler
+
+
+# Measured step -> timeout that bounds it in the flow; a setting covers all its steps
+STEP_SETTINGS = [
+    ('page_ready', 'ELEMENT_READY_TIMEOUT'),
+    ('cookie_banner', 'ELEMENT_READY_TIMEOUT'),
+    ('cookie_dismiss', 'COOKIE_DISMISS_TIMEOUT'),
+    ('field_ready', 'ELEMENT_READY_TIMEOUT'),
+    ('field_filled', 'ELEMENT_READY_GRACE')
+]
+
+MIN_TIMEOUT = 0.5  # never write a timeout below this (seconds)
+MEASURE_TIMEOUT = 30  # bound for each measured step, independent of the loaded profile
+CALIBRATION_EMAIL = 'calibration@example.com'
+CALIBRATION_PASSWORD = 'calibration-password'
+
+
+def measure_run(handler, timeout=MEASURE_TIMEOUT):
+    """
+    Measure one pass over the login page, stopping before the login click
+
+    Args:
+        handler: PageHandler wired to a freshly loaded page
+        timeout: Maximum seconds to wait for each step
+
+    Returns:
+        dict of step -> seconds, None if the step never became ready;
+        steps that do not apply to the page (no cookie banner) are left out
+    """
+    clock = handler.clock
+    waiter = handler.element_waiter
+    samples = {}
+
+    start = clock.now()
+    ready = waiter.wait_for_any([COOKIE_TARGET, EMAIL_TARGET, CHAT_TARGET], timeout)
+    samples['page_ready'] = clock.now() - start if ready else None
+    if not ready:
+        return samples
+
+    if ready.get(COOKIE_TARGET) or waiter.wait_for(COOKIE_TARGET, timeout):
+        samples['cookie_banner'] = clock.now() - start
+
+        click = clock.now()
+        result = handler.strategy_engine.locate(COOKIE_TARGET, 'click')
+        if not result.get('found'):
+            result = handler.dom_scanner.click_best(COOKIE_TARGET)
+        gone = result.get('found') and waiter.wait_for_gone(COOKIE_TARGET, timeout)
+        samples['cookie_dismiss'] = clock.now() - click if gone else None
+
+    fields = clock.now()
+    if not (waiter.wait_for(EMAIL_TARGET, timeout) and waiter.wait_for(PASSWORD_TARGET, timeout)):
+        samples['field_ready'] = None
+        return samples
+    samples['field_ready'] = clock.now() - fields
+
+    waiter.watch_fields()
+    filled = handler.event_bus.expect(
+        FIELD_FILLED, lambda payload: payload.get('field') == 'password'
+    )
+    typed = clock.now()
+    handler.keyboard_automation.inject_credentials(
+        handler.window, CALIBRATION_EMAIL, CALIBRATION_PASSWORD
+    )
+    samples['field_filled'] = clock.now() - typed if filled.wait(timeout) is not None else None
+    return samples
+
+
+def derive_timeouts(runs, success_rate, margin=2.0, minimum=MIN_TIMEOUT):
+    """
+    Pick a timeout per setting that covers `success_rate` of the runs
+
+    A run where a step never became ready counts as a miss for that step.
+    A setting bounding several steps gets the largest of their timeouts;
+    if any of its steps missed the success rate the setting is left alone.
+
+    Args:
+        runs: List of dicts returned by measure_run()
+        success_rate: Required fraction of runs covered (0-1)
+        margin: Multiplier applied to the measured quantile
+        minimum: Lower bound for every timeout
+
+    Returns:
+        (delays, report) where delays maps setting -> seconds for every
+        calibrated setting, and report maps step -> statistics
+    """
+    delays = {}
+    report = {}
+    uncovered = set()
+    for step, setting in STEP_SETTINGS:
+        values = sorted(
+            math.inf if run[step] is None else run[step] for run in runs if step in run
+        )
+        if not values:
+            continue
+        needed = quantile(values, success_rate)
+        stats = {
+            'setting': setting,
+            'samples': len(values),
+            'misses': sum(1 for value in values if value == math.inf),
+            'p50': quantile(values, 0.5),
+            'needed': needed
+        }
+        if needed != math.inf:
+            delay = math.ceil(max(minimum, needed * margin) * 100) / 100
+            delays[setting] = max(delays.get(setting, 0), delay)
+            stats['delay'] = delay
+        else:
+            uncovered.add(setting)
+        report[step] = stats
+    for setting in uncovered:
+        delays.pop(setting, None)
+    return delays, report
+
+
+def print_report(report, delays, profile_name):
+    """Print per-step measurements and the timeouts written to the profile"""
+    print(f"{'step':<16} {'setting':<24} {'n':>4} {'miss':>5} {'p50 ms':>9} {'needed ms':>10} {'timeout s':>10}")
+    for step, _ in STEP_SETTINGS:
+        stats = report.get(step)
+        if not stats:
+            print(f"{step:<16} {'(not seen)':<24}")
+            continue
+        needed = 'n/a' if stats['needed'] == math.inf else f"{stats['needed'] * 1000:.1f}"
+        p50 = 'n/a' if stats['p50'] == math.inf else f"{stats['p50'] * 1000:.1f}"
+        delay = f"{stats['delay']:.2f}" if 'delay' in stats else 'keep'
+        print(f"{step:<16} {stats['setting']:<24} {stats['samples']:>4} {stats['misses']:>5} "
+              f"{p50:>9} {needed:>10} {delay:>10}")
+    for key in TIMING_PROFILE_KEYS:
+        if key in delays:
+            print(f"{key} = {delays[key]:.2f}")
+    missing = [key for key in TIMING_PROFILE_KEYS if key not in delays]
+    if missing:
+        print(f"Not calibrated (built-in defaults apply): {', '.join(missing)}")
+    print(f"Profile '{profile_name}' written to {TIMING_PROFILES_FILE}")
+
+
+def calibrate_fake(runs, work_dir, seed=None):
+    """
+    Calibrate against FakeWindow on a VirtualClock
+
+    Render, dismissal and login delays are drawn at random per run so the
+    derived profile reflects a spread of page timings.
+    """
+    rng = random.Random(seed)
+    clock = VirtualClock()
+    results = []
+    for _ in range(runs):
+        event_bus = EventBus(clock)
+        page = FakePage(
+            clock=clock,
+            render_delay=rng.uniform(0.2, 1.5),
+            dismiss_delay=rng.uniform(0.05, 0.4)
+        )
+        handler = build_handler(FakeWindow(page, JsApi(event_bus)), event_bus, work_dir)
+        results.append(measure_run(handler))
+    return results
+
+
+def calibrate_webview(url, runs, work_dir):
+    """Calibrate a real pywebview window by reloading `url` for every run"""
+    import webview
+
+    event_bus = EventBus()
+    window = webview.create_window('DeepSeek calibration', 'about:blank', js_api=JsApi(event_bus))
+    loaded = threading.Event()
+    window.events.loaded += loaded.set
+    results = []
+
+    def calibrate():
+        for _ in range(runs):
+            handler = build_handler(window, event_bus, work_dir)
+            loaded.clear()
+            window.load_url(url)
+            if not loaded.wait(MEASURE_TIMEOUT):
+                results.append({'page_ready': None})
+                continue
+            results.append(measure_run(handler))
+        window.destroy()
+
+    webview.start(calibrate)
+    return results
+
+
+def main(argv=None):
+    """Parse arguments, run the calibration and write the profile"""
+    parser = argparse.ArgumentParser(description='Calibrate a timing profile for the login flow')
+    parser.add_argument('--target', choices=['fake', 'fixture', 'live'], default='fake')
+    parser.add_argument('--url', help='page to calibrate against (live target)')
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--profile', help='profile name (defaults to the target host)')
+    parser.add_argument('--success-rate', type=float, default=0.95,
+                        help='fraction of runs each timeout must cover')
+    parser.add_argument('--margin', type=float, default=2.0,
+                        help='multiplier applied to the measured times (headroom for slow loads)')
+    parser.add_argument('--render-delay-ms', type=int, default=800,
+                        help='fixture render delay (fixture target)')
+    parser.add_argument('--seed', type=int, help='random seed (fake target)')
+    args = parser.parse_args(argv)
+
+    if not 0 < args.success_rate <= 1:
+        parser.error('--success-rate must be in (0, 1]')
+
+    writer = logger.get_writer()
+    writer.console_levels = (logger.ERROR,)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        if args.target == 'fake':
+            target = 'fake'
+            profile_name = args.profile or 'fake'
+            runs = calibrate_fake(args.runs, work_dir, args.seed)
+        elif args.target == 'fixture':
+            from .server import FixtureServer
+            server = FixtureServer().start()
+            target = f"{server.base_url}{fixture_path(1000)}?render_delay_ms={args.render_delay_ms}"
+            profile_name = args.profile or 'fixture'
+            try:
+                runs = calibrate_webview(target, args.runs, work_dir)
+            finally:
+                server.stop()
+        else:
+            target = args.url or DEEPSEEK_URL
+            profile_name = args.profile or urlparse(target).hostname
+            runs = calibrate_webview(target, args.runs, work_dir)
+
+    delays, report = derive_timeouts(runs, args.success_rate, args.margin)
+    # Keep previously calibrated values for steps this run could not measure
+    merged = load_timing_profile(TIMING_PROFILES_FILE, profile_name)
+    merged.update(delays)
+    save_timing_profile(TIMING_PROFILES_FILE, profile_name, {
+        'delays': merged,
+        'target': target,
+        'runs': len(runs),
+        'success_rate': args.success_rate,
+        'margin': args.margin,
+        'calibrated_at': datetime.datetime.now().isoformat(timespec='seconds')
+    })
+    print_report(report, merged, profile_name)
+    logger.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
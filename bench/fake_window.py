@@ -0,0 +1,516 @@
+"""
+Fake pywebview window for offline benchmarks
+
+FakeWindow answers the project's injected scripts from a small Python model
+of the login page instead of a browser, so the Python side of the flow can be
+measured without launching a webview.
+"""
+import json
+import threading
+import time
+from collections import defaultdict
+from src.clock import REAL_CLOCK
+from src.consent_preseed import PRESEED_JS
+from src.page_bundle import BUNDLE_JS, CALL_JS, MISSING_KEY
+from src.session_cache import SNAPSHOT_JS, RESTORE_JS
+
+
+# Script templates in match order; a template's text before '%s' identifies it
+SCRIPT_KINDS = [
+    ('call', CALL_JS),
+    ('bundle', BUNDLE_JS),
+    ('preseed', PRESEED_JS),
+    ('snapshot', SNAPSHOT_JS),
+    ('restore', RESTORE_JS)
+]
+
+
+def classify(script):
+    """
+    Identify which project script is being evaluated
+
+    Helper bundle calls are reported under the helper's name.
+
+    Args:
+        script: JavaScript source passed to evaluate_js
+
+    Returns:
+        (kind, spec) where spec is the decoded JSON argument or None
+    """
+    kind, spec = _match_template(script)
+    if kind == 'call' and spec:
+        return spec['name'], spec.get('arg')
+    return kind, spec
+
+
+def is_helper_call(script):
+    """Check if a script calls a helper bundle function"""
+    return _match_template(script)[0] == 'call'
+
+
+def _match_template(script):
+    """Match a script against SCRIPT_KINDS, decoding its JSON argument"""
+    for kind, template in SCRIPT_KINDS:
+        prefix, _, suffix = template.partition('%s')
+        if script.startswith(prefix):
+            if not _:
+                return kind, None
+            body = script[len(prefix):]
+            if suffix and body.endswith(suffix):
+                body = body[:-len(suffix)]
+            try:
+                return kind, json.loads(body)
+            except ValueError:
+                return kind, None
+    return 'other', None
+
+
+class BridgeStats:
+    """Count evaluate_js round trips, payload bytes and time per script kind"""
+
+    def __init__(self):
+        self.calls = defaultdict(int)
+        self.bytes = defaultdict(int)
+        self.seconds = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def record(self, kind, script, elapsed):
+        """Record one round trip"""
+        with self._lock:
+            self.calls[kind] += 1
+            self.bytes[kind] += len(script.encode('utf-8'))
+            self.seconds[kind] += elapsed
+
+    @property
+    def total_calls(self):
+        """Total round trips"""
+        return sum(self.calls.values())
+
+    @property
+    def total_bytes(self):
+        """Total script bytes sent over the bridge"""
+        return sum(self.bytes.values())
+
+    def reset(self):
+        """Forget all recorded calls"""
+        with self._lock:
+            self.calls.clear()
+            self.bytes.clear()
+            self.seconds.clear()
+
+
+class FakePage:
+    """Python model of the DeepSeek login page"""
+
+    # Selector id each target matches in this model (must exist in config lists)
+    MATCHING_SELECTORS = {
+        'cookie': 'div.cookie_banner-accept-essential-button',
+        'email': 'input[placeholder*="email"]',
+        'password': 'input[type="password"]',
+        'login': '.ds-sign-up-form__register-button',
+        'chat': 'textarea#chat-input',
+        'send': 'div[role="button"][aria-label*="Send"]'
+    }
+
+    def __init__(self, nodes=1000, cookie_banner=True, render_delay=0.0, login_delay=0.2,
+                 dismiss_delay=0.0, login_error=None, answer_delay=2.0, rate_limit=None, hang=None,
+                 clock=None):
+        """
+        Initialize the page model
+
+        Args:
+            nodes: DOM size reported by scans
+            cookie_banner: Render the cookie banner
+            render_delay: Seconds before the app renders
+            login_delay: Seconds between the login click and the chat view,
+                None if the login never goes through
+            dismiss_delay: Seconds between the cookie click and the banner closing
+            login_error: None to log in, or 'bad_credentials' / 'captcha' shown
+                login_delay after the click instead
+            answer_delay: Seconds from sending a prompt to its finished answer
+            rate_limit: Optional (prompts, seconds): more prompts in any such
+                window show a throttling banner instead of an answer
+            hang: Optional dict of script kind -> seconds the page blocks
+                before answering such a call (a hung evaluate_js)
+            clock: Clock driving render and login delays (real time by default)
+        """
+        self.clock = clock or REAL_CLOCK
+        self.nodes = nodes
+        self.login_delay = login_delay
+        self.dismiss_delay = dismiss_delay
+        self.login_error = login_error
+        self.answer_delay = answer_delay
+        self.rate_limit = rate_limit
+        self.hang = hang or {}
+        self.prompts = []
+        self.sent_at = []
+        self.throttled = 0
+        self.error = None
+        self.cookie_visible = cookie_banner
+        self.form_visible = True
+        self.chat_visible = False
+        self.values = {}
+        self.logged_in = threading.Event()
+        self._rendered_at = self.clock.now() + render_delay
+        self._lock = threading.Lock()
+        self._watchers = []
+        if render_delay > 0:
+            self.clock.call_later(render_delay, self.changed)
+
+    def present(self, target):
+        """Check if a target is currently shown"""
+        if self.clock.now() < self._rendered_at:
+            return False
+        if target == 'cookie':
+            return self.cookie_visible
+        if target in ('chat', 'send'):
+            return self.chat_visible
+        return self.form_visible
+
+    def click(self, target):
+        """Apply a click on a target"""
+        if target == 'cookie':
+            if self.dismiss_delay > 0:
+                self.clock.call_later(self.dismiss_delay, self._dismiss_banner)
+            else:
+                self.cookie_visible = False
+        elif (target == 'login' and self.login_delay is not None
+              and self.values.get('email') and self.values.get('password')):
+            if self.login_error:
+                self.clock.call_later(self.login_delay, self._show_error)
+            else:
+                self.clock.call_later(self.login_delay, self._log_in)
+        self.changed()
+
+    def _dismiss_banner(self):
+        """Close the cookie banner"""
+        self.cookie_visible = False
+        self.changed()
+
+    def _show_error(self):
+        """Show the configured error toast or captcha"""
+        self.error = self.login_error
+        self.changed()
+
+    def _log_in(self):
+        """Swap the login form for the chat view"""
+        self.form_visible = False
+        self.chat_visible = True
+        self.logged_in.set()
+        self.changed()
+
+    def watch(self, callback):
+        """Register a function called after every state change"""
+        with self._lock:
+            self._watchers.append(callback)
+
+    def unwatch(self, callback):
+        """Remove a state change callback"""
+        with self._lock:
+            if callback in self._watchers:
+                self._watchers.remove(callback)
+
+    def changed(self):
+        """Notify watchers, like a MutationObserver callback"""
+        with self._lock:
+            watchers = list(self._watchers)
+        for callback in watchers:
+            callback()
+
+
+class FakeEvents:
+    """Stand-in for window.events with a loaded event"""
+
+    def __init__(self, clock=None):
+        self.loaded = FakeEvent(clock)
+
+
+class FakeEvent:
+    """Minimal pywebview Event supporting += and set()"""
+
+    def __init__(self, clock=None):
+        self.clock = clock or REAL_CLOCK
+        self._handlers = []
+
+    def __iadd__(self, handler):
+        self._handlers.append(handler)
+        return self
+
+    def __isub__(self, handler):
+        self._handlers.remove(handler)
+        return self
+
+    def set(self):
+        """Fire the event on a background step, like pywebview does"""
+        for handler in list(self._handlers):
+            self.clock.spawn(handler)
+
+
+class FakeWindow:
+    """Window implementing evaluate_js and events.loaded against a FakePage"""
+
+    def __init__(self, page, js_api=None):
+        """
+        Initialize the fake window
+
+        Args:
+            page: FakePage model
+            js_api: JsApi receiving events pushed by page scripts
+        """
+        self.page = page
+        self.js_api = js_api
+        self.clock = page.clock
+        self.events = FakeEvents(page.clock)
+        self.stats = BridgeStats()
+        self.bundle_installed = False
+        self.cache = {}
+
+    def load(self):
+        """Simulate a new document finishing loading"""
+        self.bundle_installed = False
+        self.cache = {}
+        self.events.loaded.set()
+
+    def evaluate_js(self, script, callback=None):
+        """
+        Answer a project script from the page model
+
+        Args:
+            script: JavaScript source
+            callback: Unused, kept for signature compatibility
+
+        Returns:
+            What the real script would return
+        """
+        start = time.perf_counter()
+        kind, spec = classify(script)
+        if kind in self.page.hang:
+            self.clock.sleep(self.page.hang[kind])
+        if kind == 'bundle':
+            self.bundle_installed = True
+            result = True
+        elif not self.bundle_installed and is_helper_call(script):
+            result = {MISSING_KEY: True}
+        else:
+            handler = getattr(self, f'_eval_{kind}', None)
+            result = handler(spec) if handler else None
+        self.stats.record(kind, script, time.perf_counter() - start)
+        return result
+
+    def _emit(self, event, payload):
+        """Push an event through js_api after the current call returns, like the real bridge"""
+        if self.js_api:
+            self.clock.call_later(0, self.js_api.emit, event, payload)
+
+    def _eval_ready(self, spec):
+        """Resolve a readiness watch now, on a later change, or at its deadline"""
+        page = self.page
+        start = self.clock.now()
+        state = {'done': False, 'timer': None}
+        lock = threading.Lock()
+
+        def probe():
+            hits = {}
+            for target in spec['targets']:
+                if self._resolve(target, spec['methods'][target]) != spec['absent']:
+                    hits[target] = True
+            return hits
+
+        def finish(found, hits):
+            with lock:
+                if state['done']:
+                    return
+                state['done'] = True
+            page.unwatch(on_change)
+            if state['timer'] is not None:
+                state['timer'].cancel()
+            self._emit(spec['event'], {
+                'watch_id': spec['watch_id'],
+                'found': found,
+                'targets': hits,
+                'elapsed': int((self.clock.now() - start) * 1000)
+            })
+
+        def on_change():
+            hits = probe()
+            if hits:
+                finish(True, hits)
+
+        hits = probe()
+        if hits:
+            finish(True, hits)
+            return True
+        page.watch(on_change)
+        state['timer'] = self.clock.call_later(spec['timeout_ms'] / 1000, finish, False, {})
+        if state['done']:
+            state['timer'].cancel()
+        return True
+
+    def _eval_confirm(self, spec):
+        """Report the login outcome now, on a later change, or at its deadline"""
+        page = self.page
+        start = self.clock.now()
+        state = {'done': False, 'timer': None}
+        lock = threading.Lock()
+
+        def probe():
+            if page.present('chat') and not page.present('password'):
+                return {'outcome': 'success', 'detail': 'chat'}
+            if page.error:
+                return {'outcome': page.error, 'detail': 'fake'}
+            return None
+
+        def finish(result):
+            with lock:
+                if state['done']:
+                    return
+                state['done'] = True
+            page.unwatch(on_change)
+            if state['timer'] is not None:
+                state['timer'].cancel()
+            self._emit(spec['event'], dict(result, watch_id=spec['watch_id'], url='http://fixture/',
+                                           elapsed=int((self.clock.now() - start) * 1000)))
+
+        def on_change():
+            result = probe()
+            if result:
+                finish(result)
+
+        result = probe()
+        if result:
+            finish(result)
+            return True
+        page.watch(on_change)
+        state['timer'] = self.clock.call_later(
+            spec['timeout_ms'] / 1000, finish, {'outcome': 'timeout', 'detail': ''}
+        )
+        if state['done']:
+            state['timer'].cancel()
+        return True
+
+    def _eval_fields(self, spec):
+        return True
+
+    def _cached(self, target):
+        """Cached method id for a target while the target is shown, like the page cache"""
+        if target in self.cache and not self.page.present(target):
+            del self.cache[target]
+        return self.cache.get(target)
+
+    def _resolve(self, target, methods):
+        """Check a target through the cache, caching the first matching method"""
+        if self._cached(target):
+            return True
+        for method in methods:
+            if self._target_for(method['id']) == target and self.page.present(target):
+                self.cache[target] = method['id']
+                return True
+        return False
+
+    def _eval_probe(self, spec):
+        """Walk the ranked methods until the model's matching selector"""
+        target = spec.get('target')
+        method_id = self._cached(target)
+        if method_id:
+            if spec.get('action') == 'click':
+                self.page.click(target)
+            return {'found': True, 'method': method_id, 'ms': 0, 'tried': [],
+                    'cached': True, 'elapsed': 0.01}
+        tried = []
+        for method in spec['methods']:
+            matched = self._target_for(method['id'])
+            if matched and self.page.present(matched):
+                if target:
+                    self.cache[target] = method['id']
+                if spec.get('action') == 'click':
+                    self.page.click(matched)
+                return {'found': True, 'method': method['id'], 'ms': 0.05,
+                        'tried': tried, 'elapsed': 0.05 * (len(tried) + 1)}
+            tried.append({'id': method['id'], 'ms': 0.05})
+        return {'found': False, 'method': 'not_found', 'tried': tried, 'elapsed': 0.05 * len(tried)}
+
+    def _target_for(self, selector):
+        """Target a selector id matches in the model, if any"""
+        for target, matching in self.page.MATCHING_SELECTORS.items():
+            if matching == selector:
+                return target
+        return None
+
+    def _eval_scan(self, spec):
+        """Report every present target with a strong score"""
+        result = {'visited': self.page.nodes, 'elapsed': 0, 'clicked': False}
+        for target in spec['targets']:
+            found = self.page.present(target)
+            result[target] = {'found': found, 'score': 90 if found else 0,
+                              'method': 'text_exact' if found else 'not_found', 'text': ''}
+        if spec.get('click') and result.get(spec['click'], {}).get('found'):
+            self.page.click(spec['click'])
+            result['clicked'] = True
+        return result
+
+    def _eval_inject(self, spec):
+        """Fill both fields"""
+        if not self.page.present('email'):
+            return {'emailFilled': False, 'passwordFilled': False, 'bothFilled': False}
+        self.page.values['email'] = spec['email']
+        self.page.values['password'] = spec['password']
+        self._emit('field_filled', {'field': 'email', 'length': len(spec['email'])})
+        self._emit('field_filled', {'field': 'password', 'length': len(spec['password'])})
+        return {'emailFilled': True, 'passwordFilled': True, 'bothFilled': True,
+                'emailFound': True, 'passwordFound': True}
+
+    def _eval_check(self, spec):
+        email = bool(self.page.values.get('email'))
+        password = bool(self.page.values.get('password'))
+        return {'emailFilled': email, 'passwordFilled': password, 'bothFilled': email and password}
+
+    def _eval_state(self, spec):
+        """Shown flag per target and filled flag per field"""
+        state = {'shown': {}, 'filled': {}}
+        for target, methods in spec['methods'].items():
+            state['shown'][target] = self._resolve(target, methods)
+            if target in ('email', 'password'):
+                state['filled'][target] = state['shown'][target] and bool(self.page.values.get(target))
+        return state
+
+    def _eval_submit(self, spec):
+        """Send a prompt and stream its answer over the page's answer_delay"""
+        if not self._resolve('chat', spec['methods']['chat']):
+            return {'submitted': False, 'reason': 'no chat input'}
+        now = self.clock.now()
+        if self.page.rate_limit:
+            limit, period = self.page.rate_limit
+            if sum(1 for sent in self.page.sent_at if now - sent < period) >= limit:
+                self.page.throttled += 1
+                return {'submitted': False, 'reason': 'throttled', 'detail': 'Too many requests, try again later'}
+        self.page.sent_at.append(now)
+        self.page.prompts.append(spec['prompt'])
+        delay = self.page.answer_delay
+        words = f"Answer to: {spec['prompt']}".split(' ')
+        # One chunk per word at even intervals, the last one as the answer completes
+        offset = 0
+        for seq, word in enumerate(words):
+            text = word if seq == 0 else ' ' + word
+            self.clock.call_later(delay * (seq + 1) / len(words), self._emit, spec['chunk_event'], {
+                'watch_id': spec['watch_id'], 'seq': seq, 'offset': offset, 'text': text
+            })
+            offset += len(text)
+        self.clock.call_later(delay, self._emit, spec['event'], {
+            'watch_id': spec['watch_id'],
+            'outcome': 'done',
+            'chunks': len(words),
+            'length': offset,
+            'method': self.page.MATCHING_SELECTORS['send'],
+            'url': 'http://fixture/a/chat/s/fixture-conversation',
+            'elapsed': int(delay * 1000)
+        })
+        return {'submitted': True}
+
+    def _eval_preseed(self, spec):
+        return {'bootstrap': False}
+
+    def _eval_snapshot(self, spec):
+        return {'origin': 'http://fixture', 'local_storage': {}, 'cookies': ''}
+
+    def _eval_restore(self, spec):
+        return {'restored': True, 'keys': 0}
@@ -0,0 +1,111 @@
+"""
+Local HTML fixtures mimicking the DeepSeek login page and cookie banner
+"""
+
+# DOM sizes (approximate node counts) benchmarked by default
+FIXTURE_SIZES = [1000, 10000, 100000]
+
+# Nodes produced by one filler block (div + span + text + p + text)
+NODES_PER_BLOCK = 5
+
+
+FIXTURE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>DeepSeek fixture ({nodes} nodes)</title>
+<style>
+  .cookie_banner {{ position: fixed; bottom: 0; left: 0; right: 0; background: #eee; padding: 12px; }}
+  .ds-button {{ display: inline-block; padding: 6px 12px; border: 1px solid #999; cursor: pointer; }}
+  .filler {{ font-size: 10px; color: #999; }}
+</style>
+</head>
+<body>
+<div id="root"></div>
+<script>
+(function() {{
+    var renderDelay = {render_delay_ms};
+    var loginDelay = {login_delay_ms};
+    var withBanner = {cookie_banner};
+
+    function filler(count) {{
+        var box = document.createElement('div');
+        box.className = 'filler';
+        for (var i = 0; i < count; i++) {{
+            var block = document.createElement('div');
+            var span = document.createElement('span');
+            span.textContent = 'Conversation item ' + i;
+            var p = document.createElement('p');
+            p.textContent = 'Lorem ipsum dolor sit amet, message preview number ' + i;
+            block.appendChild(span);
+            block.appendChild(p);
+            box.appendChild(block);
+        }}
+        return box;
+    }}
+
+    function render() {{
+        var root = document.getElementById('root');
+        root.innerHTML =
+            '<div class="ds-sign-up-form">' +
+            '  <div><div><input type="text" placeholder="Phone number / email address"></div></div>' +
+            '  <div><div><input type="password" placeholder="Password"></div></div>' +
+            '  <div class="ds-button ds-sign-up-form__register-button" role="button">Log in</div>' +
+            '</div>';
+        root.appendChild(filler({blocks}));
+
+        root.querySelector('.ds-sign-up-form__register-button').addEventListener('click', function() {{
+            var email = root.querySelector('input[type="text"]').value;
+            var password = root.querySelector('input[type="password"]').value;
+            if (!email || !password) return;
+            setTimeout(function() {{
+                root.querySelector('.ds-sign-up-form').outerHTML =
+                    '<textarea id="chat-input" placeholder="Message DeepSeek"></textarea>';
+            }}, loginDelay);
+        }});
+
+        if (withBanner) {{
+            var banner = document.createElement('div');
+            banner.className = 'cookie_banner';
+            banner.innerHTML = 'We use cookies. ' +
+                '<div class="ds-button cookie_banner-accept-essential-button">Necessary cookies only</div>';
+            banner.querySelector('.ds-button').addEventListener('click', function() {{
+                banner.remove();
+            }});
+            document.body.appendChild(banner);
+        }}
+    }}
+
+    setTimeout(render, renderDelay);
+}})();
+</script>
+</body>
+</html>
+"""
+
+
+def build_fixture_html(nodes, cookie_banner=True, render_delay_ms=0, login_delay_ms=200):
+    """
+    Build a login page fixture
+
+    Args:
+        nodes: Approximate number of DOM nodes (elements and text nodes)
+        cookie_banner: Render the cookie banner
+        render_delay_ms: Delay before the app renders, like an SPA bootstrapping
+        login_delay_ms: Delay between the login click and the chat view
+
+    Returns:
+        HTML string
+    """
+    return FIXTURE_TEMPLATE.format(
+        nodes=nodes,
+        blocks=max(1, nodes // NODES_PER_BLOCK),
+        cookie_banner='true' if cookie_banner else 'false',
+        render_delay_ms=int(render_delay_ms),
+        login_delay_ms=int(login_delay_ms)
+    )
+
+
+def fixture_path(nodes):
+    """URL path of the fixture for a DOM size"""
+    return f"/login_{nodes}.html"
@@ -0,0 +1,514 @@
+"""
+Benchmark runner for PageHandler and LoginButtonDetector
+
+Modes:
+    fake     - FakeWindow answers scripts from a Python page model; measures the
+               Python side of the flow and bridge round trips (no browser needed)
+    virtual  - the fake flow on a VirtualClock; runs many logins in simulated time
+               to measure pure logic overhead and check timeouts deterministically
+    webview  - real pywebview window against fixtures served from a local HTTP
+               server; measures detection-script latency in a real engine
+
+Usage:
+    python -m bench.run_bench [--mode fake|virtual|webview] [--sizes 1000,10000,100000]
+                              [--repeat N] [--flows N]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from config import (
+    ELEMENT_READY_TIMEOUT,
+    LOGIN_CONFIRM_TIMEOUT,
+    STEP_MAX_ATTEMPTS,
+    EVALUATE_JS_TIMEOUT,
+    COOKIE_CONSENT_PRESEED_ENABLED
+)
+from src import logger
+from src.clock import VirtualClock
+from src.bridge import BridgeTimeout
+from src.consent_preseed import ConsentPreseed
+from src.credentials_manager import CredentialsManager
+from src.element_waiter import COOKIE_TARGET, EMAIL_TARGET, CHAT_TARGET
+from src.js_api import EventBus, JsApi
+from src.login_confirmation import BAD_CREDENTIALS, CAPTCHA
+from src.login_pipeline import BUTTON_CLICKED, AUTHENTICATED
+from src.page_handler import PageHandler
+from src.prompt_queue import PromptQueue, PromptResult, TIMEOUT
+from src.prompt_scheduler import PromptScheduler
+from src.response_cache import ResponseCache
+from src.transcript_store import TranscriptStore
+from src.timing import get_tracer, read_spans
+from .fake_window import FakePage, FakeWindow, BridgeStats, classify
+from .fixtures import FIXTURE_SIZES, fixture_path
+
+
+FLOW_TIMEOUT = 30  # seconds allowed for one login flow
+
+
+def build_handler(window, event_bus, work_dir):
+    """
+    Create a PageHandler wired for benchmarking
+
+    The log, spans, selector and consent stats go to `work_dir` and the
+    credentials are passed in, so the run never reads or writes the
+    project's real files.
+
+    Args:
+        window: FakeWindow or CountingWindow
+        event_bus: EventBus shared with the window's js_api
+        work_dir: Temporary directory for the log, stats and spans
+
+    Returns:
+        PageHandler
+    """
+    logger.get_writer().redirect(os.path.join(work_dir, 'bench.log'))
+    tracer = get_tracer()
+    tracer.spans_file = os.path.join(work_dir, 'spans.jsonl')
+    tracer.prom_file = os.path.join(work_dir, 'timing.prom')
+
+    consent_preseed = None
+    if COOKIE_CONSENT_PRESEED_ENABLED:
+        consent_preseed = ConsentPreseed(os.path.join(work_dir, 'consent_stats.json'))
+    handler = PageHandler(
+        window,
+        event_bus,
+        consent_preseed=consent_preseed,
+        credentials_manager=CredentialsManager('bench@example.com', 'bench-password')
+    )
+    handler.strategy_engine.stats_file = os.path.join(work_dir, 'selector_stats.json')
+    handler.strategy_engine.stats = {}
+    return handler
+
+
+def time_calls(func, repeat):
+    """
+    Time repeated calls
+
+    Args:
+        func: Function to call
+        repeat: Number of calls
+
+    Returns:
+        List of durations in milliseconds
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def summarize_ms(durations):
+    """Format mean/p95 of a list of milliseconds"""
+    if not durations:
+        return 'n/a'
+    ordered = sorted(durations)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"mean {statistics.mean(durations):8.2f} ms  p95 {p95:8.2f} ms"
+
+
+def print_report(nodes, flow_ms, stats, detection):
+    """
+    Print the results for one DOM size
+
+    Args:
+        nodes: Fixture DOM size
+        flow_ms: End-to-end flow time, None if the flow timed out
+        stats: BridgeStats of the flow
+        detection: dict of component name -> list of durations (ms)
+    """
+    print(f"\n=== {nodes} nodes ===")
+    flow = f"{flow_ms:.1f} ms" if flow_ms is not None else "TIMEOUT"
+    print(f"end-to-end flow: {flow}, {stats.total_calls} round trips, {stats.total_bytes} script bytes")
+    for kind in sorted(stats.calls):
+        print(f"  {kind:<12} {stats.calls[kind]:>4} calls {stats.bytes[kind]:>9} bytes "
+              f"{stats.seconds[kind] * 1000:>9.2f} ms")
+    for name, durations in detection.items():
+        print(f"  {name:<32} {summarize_ms(durations)}")
+
+
+def run_fake(sizes, repeat):
+    """Benchmark against FakeWindow"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        for nodes in sizes:
+            event_bus = EventBus()
+            page = FakePage(nodes=nodes)
+            window = FakeWindow(page, JsApi(event_bus))
+            handler = build_handler(window, event_bus, work_dir)
+            window.events.loaded += handler.on_page_loaded
+
+            start = time.perf_counter()
+            window.load()
+            logged_in = page.logged_in.wait(FLOW_TIMEOUT)
+            flow_ms = (time.perf_counter() - start) * 1000 if logged_in else None
+            flow_stats = window.stats
+
+            # Detection on a fresh, fully rendered page
+            detect_page = FakePage(nodes=nodes, cookie_banner=False)
+            detect_window = FakeWindow(detect_page, JsApi(event_bus))
+            detect_handler = build_handler(detect_window, event_bus, work_dir)
+            detection = {
+                'PageHandler.handle_cookie_banner': time_calls(detect_handler.handle_cookie_banner, repeat),
+                'LoginButtonDetector.detect': time_calls(
+                    detect_handler.login_detector.detect_button_position, repeat
+                ),
+                'DomScanner.scan': time_calls(detect_handler.dom_scanner.scan, repeat)
+            }
+            print_report(nodes, flow_ms, flow_stats, detection)
+
+
+def run_virtual_flow(clock, work_dir, **page_options):
+    """
+    Run one login flow on a VirtualClock
+
+    Args:
+        clock: VirtualClock shared by the page, bus and handler
+        work_dir: Temporary directory for stats and spans
+        **page_options: FakePage options
+
+    Returns:
+        Simulated seconds until the chat view, None if it never appeared
+    """
+    event_bus = EventBus(clock)
+    page = FakePage(clock=clock, **page_options)
+    window = FakeWindow(page, JsApi(event_bus))
+    handler = build_handler(window, event_bus, work_dir)
+    window.events.loaded += handler.on_page_loaded
+
+    start = clock.now()
+    window.load()
+    # Steps run inline on a VirtualClock, so load() may already have advanced time
+    remaining = start + FLOW_TIMEOUT - clock.now()
+    if clock.wait(page.logged_in, remaining):
+        return clock.now() - start
+    return None
+
+
+def check_timeouts(clock, work_dir):
+    """
+    Check that timeouts fire at exactly their configured simulated time, that
+    a hung helper call is cut off by the bridge and that rejected logins stop
+    the flow
+
+    Returns:
+        List of (name, passed, detail)
+    """
+    checks = []
+
+    # The app never renders: the readiness watch gives up after ELEMENT_READY_TIMEOUT
+    event_bus = EventBus(clock)
+    page = FakePage(clock=clock, render_delay=FLOW_TIMEOUT * 2)
+    handler = build_handler(FakeWindow(page, JsApi(event_bus)), event_bus, work_dir)
+    start = clock.now()
+    ready = handler.element_waiter.wait_for_any([COOKIE_TARGET, EMAIL_TARGET, CHAT_TARGET])
+    elapsed = clock.now() - start
+    checks.append(('readiness timeout', not ready and abs(elapsed - ELEMENT_READY_TIMEOUT) < 1e-9,
+                   f"{elapsed:.3f} s simulated (expected {ELEMENT_READY_TIMEOUT} s)"))
+
+    # A helper call that never returns: every component goes through the bridge,
+    # whose deadline turns the hang into a BridgeTimeout
+    event_bus = EventBus(clock)
+    page = FakePage(clock=clock, hang={'state': FLOW_TIMEOUT})
+    handler = build_handler(FakeWindow(page, JsApi(event_bus)), event_bus, work_dir)
+    components = (handler.strategy_engine, handler.login_detector, handler.element_waiter,
+                  handler.login_confirmation, handler.dom_scanner)
+    try:
+        handler.element_waiter.page_state([COOKIE_TARGET])
+        raised = None
+    except BridgeTimeout as e:
+        raised = e
+    checks.append(('hung call times out',
+                   raised is not None and raised.timeout == EVALUATE_JS_TIMEOUT
+                   and all(component.window is handler.window for component in components),
+                   f"{raised or 'no BridgeTimeout'} (expected after {EVALUATE_JS_TIMEOUT} s)"))
+
+    # The login never goes through: every confirmation waits the full
+    # LOGIN_CONFIRM_TIMEOUT and the pipeline gives up after STEP_MAX_ATTEMPTS
+    event_bus = EventBus(clock)
+    page = FakePage(clock=clock, login_delay=None)
+    window = FakeWindow(page, JsApi(event_bus))
+    handler = build_handler(window, event_bus, work_dir)
+    window.events.loaded += handler.on_page_loaded
+    window.load()
+    pipeline = handler.pipeline
+    failures = pipeline.failures.get(AUTHENTICATED, 0) if pipeline else 0
+    confirm = clock.now() - pipeline.started - pipeline.checkpoints.get(BUTTON_CLICKED, 0) if pipeline else 0
+    checks.append(('login never completes',
+                   not page.logged_in.is_set() and failures == STEP_MAX_ATTEMPTS
+                   and abs(confirm - LOGIN_CONFIRM_TIMEOUT) < 1e-9,
+                   f"{failures} confirmations, last {confirm:.3f} s simulated "
+                   f"(expected {STEP_MAX_ATTEMPTS} x {LOGIN_CONFIRM_TIMEOUT} s)"))
+
+    # Rejected credentials and captchas end the flow at once, without retries
+    for error in (BAD_CREDENTIALS, CAPTCHA):
+        event_bus = EventBus(clock)
+        page = FakePage(clock=clock, login_error=error)
+        window = FakeWindow(page, JsApi(event_bus))
+        handler = build_handler(window, event_bus, work_dir)
+        window.events.loaded += handler.on_page_loaded
+        window.load()
+        outcome = handler.login_outcome
+        stopped = handler.pipeline.stopped if handler.pipeline else None
+        checks.append((f"{error} outcome",
+                       outcome is not None and outcome.outcome == error and stopped == error,
+                       f"{outcome!r}, flow stopped by {stopped}"))
+    return checks
+
+
+def check_prompt_queue(clock, work_dir, prompts=10, done_before=3):
+    """
+    Check that queued prompts follow each other without idle time, that a
+    run resumes after the items recorded as answered in the progress file
+    (resending the failed ones) and that a repeated batch is answered from the response cache
+
+    Returns:
+        List of (name, passed, detail)
+    """
+    event_bus = EventBus(clock)
+    page = FakePage(clock=clock)
+    window = FakeWindow(page, JsApi(event_bus))
+    handler = build_handler(window, event_bus, work_dir)
+    window.events.loaded += handler.on_page_loaded
+    window.load()
+    clock.wait(handler.flow_done, FLOW_TIMEOUT)
+
+    progress_file = os.path.join(work_dir, 'prompts.progress.jsonl')
+    items = [{'id': f"p{index}", 'prompt': f"prompt {index}"} for index in range(prompts)]
+    # A first run that crashed after `done_before` prompts
+    PromptQueue(handler.window, event_bus, handler.strategy_engine, clock,
+                progress_file).run(items[:done_before])
+    # ... and whose next prompt timed out: it is sent again
+    with open(progress_file, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(PromptResult(done_before, items[done_before]['id'], TIMEOUT, 0.0).to_dict()) + '\n')
+    transcripts = TranscriptStore(os.path.join(work_dir, 'transcripts'))
+    cache = ResponseCache(os.path.join(work_dir, 'response_cache'))
+    queue = PromptQueue(handler.window, event_bus, handler.strategy_engine, clock, progress_file,
+                        transcripts=transcripts, account='bench@example.com', cache=cache)
+    # The finished prompts moved to the end: resuming goes by prompt id, not position
+    wall_start = time.time()
+    report = queue.run(items[done_before:] + items[:done_before])
+    wall_end = time.time()
+    transcripts.close()
+    cache.close()
+    # The same prompts again, with different whitespace, from a cold memory LRU
+    submitted = len(page.prompts)
+    repeat = PromptQueue(handler.window, event_bus, handler.strategy_engine, clock,
+                         cache=ResponseCache(os.path.join(work_dir, 'response_cache')))
+    repeat_report = repeat.run([dict(item, prompt=f"  {item['prompt']} ") for item in items[done_before:]])
+    records = list(transcripts.conversation('fixture-conversation'))
+    stored = [(record['prompt'], record['response']) for record in records]
+    # Transcripts carry the wall time of the send, even when latencies are simulated
+    stamps = [record['ts'] for record in records]
+    stamps_ok = stamps == sorted(stamps) and all(wall_start <= stamp <= wall_end for stamp in stamps)
+
+    expected = prompts - done_before
+    sent = page.prompts[done_before:]
+    latencies = [result.latency for result in queue.results]
+    answers_ok = all(result.response == f"Answer to: {item['prompt']}"
+                     for result, item in zip(queue.results, items[done_before:]))
+    first_ok = all(abs(result.first_token - page.answer_delay / 4) < 1e-9 for result in queue.results)
+    return [
+        ('transcripts stored',
+         stored == [(item['prompt'], result.response)
+                    for result, item in zip(queue.results, items[done_before:])] and stamps_ok,
+         f"{len(stored)} records in conversation fixture-conversation (expected {expected})"),
+        ('answers streamed',
+         answers_ok and first_ok and report['tokens_per_second_p50'] > 0,
+         f"first token {report['first_token_p50']:.3f} s simulated (expected {page.answer_delay / 4:.3f} s), "
+         f"{report['tokens_per_second_p50']:.1f} tokens/s"),
+        ('prompt queue resumes',
+         report['resumed'] == done_before and sent == [item['prompt'] for item in items[done_before:]],
+         f"{report['resumed']} skipped, {len(sent)} sent (expected {done_before} and {expected})"),
+        ('prompts back to back',
+         report['completed'] == expected and all(abs(latency - page.answer_delay) < 1e-9 for latency in latencies)
+         and abs(report['elapsed'] - expected * page.answer_delay) < 1e-9,
+         f"{report['completed']} answered in {report['elapsed']:.3f} s simulated, "
+         f"{report['prompts_per_minute']:.1f} prompts/minute"),
+        ('repeated prompts cached',
+         repeat_report['cached'] == expected and len(page.prompts) == submitted
+         and [result.response for result in repeat.results] == [result.response for result in queue.results],
+         f"{repeat_report['cached']} answered from cache, {len(page.prompts) - submitted} sent, "
+         f"{repeat_report['cache']['disk_hits']} disk hits (expected {expected} and 0)")
+    ]
+
+
+def check_scheduler(clock, work_dir, accounts=3, long_job=24, short_job=6, server_limit=(3, 60)):
+    """
+    Check that windows of several accounts share two jobs fairly and keep
+    sending close to the server's limit when their buckets start above it
+
+    Returns:
+        List of (name, passed, detail)
+    """
+    workers = []
+    pages = []
+    for number in range(accounts):
+        event_bus = EventBus(clock)
+        page = FakePage(clock=clock, rate_limit=server_limit)
+        window = FakeWindow(page, JsApi(event_bus))
+        handler = build_handler(window, event_bus, work_dir)
+        window.events.loaded += handler.on_page_loaded
+        window.load()
+        clock.wait(handler.flow_done, FLOW_TIMEOUT)
+        workers.append((f"account{number}", PromptQueue(handler.window, event_bus, handler.strategy_engine, clock)))
+        pages.append(page)
+
+    # Buckets start at twice the server's limit, so throttling has to slow them down
+    limit, period = server_limit
+    scheduler = PromptScheduler(workers, clock, rate=2 * limit / period, burst=2)
+    order = []
+    for job_id, size in (('long', long_job), ('short', short_job)):
+        scheduler.add_job(job_id, [{'id': f"{job_id}{index}", 'prompt': f"{job_id} prompt {index}"}
+                                   for index in range(size)],
+                          on_result=lambda item, result, job_id=job_id: order.append(job_id))
+    report = scheduler.run()
+
+    total = long_job + short_job
+    ceiling = accounts * limit / period * 60
+    throttled = sum(page.throttled for page in pages)
+    short_done = max(position for position, job_id in enumerate(order) if job_id == 'short') + 1
+    tracer = get_tracer()
+    tracer.flush()
+    waits = [record for record in read_spans(tracer.spans_file) if record['phase'] == 'prompt_wait']
+    return [
+        ('throttled accounts adapt',
+         report['completed'] == total and throttled == report['throttled'] > 0
+         and report['prompts_per_minute'] >= 0.75 * ceiling,
+         f"{report['completed']}/{total} answered at {report['prompts_per_minute']:.1f} prompts/minute "
+         f"(limit {ceiling:.0f}), {throttled} throttled"),
+        ('jobs share windows',
+         short_done <= 2 * short_job + accounts,
+         f"short job done after {short_done} of {total} answers (expected <= {2 * short_job + accounts})"),
+        ('queue wait exported',
+         len(waits) == total + report['throttled'] and report['max_depth'] == total,
+         f"{len(waits)} prompt_wait spans, wait p50 {report['wait_p50']:.1f} s, "
+         f"p95 {report['wait_p95']:.1f} s simulated, max depth {report['max_depth']}")
+    ]
+
+
+def run_virtual(sizes, flows):
+    """Run many login flows in simulated time"""
+    clock = VirtualClock()
+    tracer = get_tracer()
+    writer = logger.get_writer()
+    real_clock, console_levels = tracer.clock, writer.console_levels
+    tracer.clock = clock
+    writer.console_levels = (logger.ERROR,)
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            for nodes in sizes:
+                simulated = []
+                failures = 0
+                start = time.perf_counter()
+                for _ in range(flows):
+                    flow = run_virtual_flow(clock, work_dir, nodes=nodes)
+                    if flow is None:
+                        failures += 1
+                    else:
+                        simulated.append(flow * 1000)
+                wall = time.perf_counter() - start
+
+                print(f"\n=== {nodes} nodes, {flows} flows ===")
+                print(f"wall time {wall:.2f} s, {flows / wall:.0f} flows/s, "
+                      f"{wall / flows * 1e6:.0f} us logic overhead per flow, {failures} failed")
+                print(f"  simulated flow time              {summarize_ms(simulated)}")
+
+            print("\n=== timeout checks ===")
+            for name, passed, detail in (check_timeouts(clock, work_dir) + check_prompt_queue(clock, work_dir)
+                                       + check_scheduler(clock, work_dir)):
+                print(f"  {'PASS' if passed else 'FAIL'}  {name:<24} {detail}")
+    finally:
+        # Write queued records while the console is still quiet
+        logger.flush()
+        tracer.clock = real_clock
+        writer.console_levels = console_levels
+
+
+class CountingWindow:
+    """Proxy around a real pywebview window that records every evaluate_js call"""
+
+    def __init__(self, window):
+        self._window = window
+        self.stats = BridgeStats()
+
+    def evaluate_js(self, script, callback=None):
+        start = time.perf_counter()
+        try:
+            if callback is None:
+                return self._window.evaluate_js(script)
+            return self._window.evaluate_js(script, callback)
+        finally:
+            self.stats.record(classify(script)[0], script, time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        return getattr(self._window, name)
+
+
+def run_webview(sizes, repeat):
+    """Benchmark a real pywebview window against the local fixture server"""
+    import webview
+    from .server import FixtureServer
+
+    server = FixtureServer().start()
+    event_bus = EventBus()
+    window = webview.create_window('DeepSeek benchmark', 'about:blank', js_api=JsApi(event_bus))
+    loaded = threading.Event()
+    window.events.loaded += loaded.set
+
+    def benchmark():
+        with tempfile.TemporaryDirectory() as work_dir:
+            for nodes in sizes:
+                counting = CountingWindow(window)
+                handler = build_handler(counting, event_bus, work_dir)
+
+                loaded.clear()
+                start = time.perf_counter()
+                window.load_url(server.base_url + fixture_path(nodes))
+                loaded.wait(FLOW_TIMEOUT)
+                handler.on_page_loaded()
+                logged_in = handler.element_waiter.wait_for('chat', FLOW_TIMEOUT)
+                flow_ms = (time.perf_counter() - start) * 1000 if logged_in else None
+                flow_stats = counting.stats
+
+                counting.stats = BridgeStats()
+                detection = {
+                    'DomScanner.scan': time_calls(handler.dom_scanner.scan, repeat),
+                    'StrategyEngine.locate(chat)': time_calls(
+                        lambda: handler.strategy_engine.locate('chat'), repeat
+                    )
+                }
+                print_report(nodes, flow_ms, flow_stats, detection)
+        window.destroy()
+        server.stop()
+
+    webview.start(benchmark)
+
+
+def main(argv=None):
+    """Parse arguments and run the selected benchmark"""
+    parser = argparse.ArgumentParser(description='Benchmark the DeepSeek login automation offline')
+    parser.add_argument('--mode', choices=['fake', 'virtual', 'webview'], default='fake')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in FIXTURE_SIZES),
+                        help='comma-separated fixture DOM sizes')
+    parser.add_argument('--repeat', type=int, default=20, help='detection calls per size')
+    parser.add_argument('--flows', type=int, default=1000, help='login flows per size (virtual mode)')
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    if args.mode == 'webview':
+        run_webview(sizes, args.repeat)
+    elif args.mode == 'virtual':
+        run_virtual(sizes, args.flows)
+    else:
+        run_fake(sizes, args.repeat)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
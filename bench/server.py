@@ -0,0 +1,75 @@
+"""
+Local HTTP server for the benchmark fixtures
+"""
+import re
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from .fixtures import build_fixture_html
+
+
+FIXTURE_PATTERN = re.compile(r'^/login_(\d+)\.html$')
+
+
+class FixtureRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serve /login_<nodes>.html, generated on demand
+
+    Optional query parameters render_delay_ms and login_delay_ms slow the
+    fixture down like a real SPA.
+    """
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        match = FIXTURE_PATTERN.match(url.path)
+        if not match:
+            self.send_error(404)
+            return
+        options = {}
+        for name, values in parse_qs(url.query).items():
+            if name in ('render_delay_ms', 'login_delay_ms'):
+                try:
+                    options[name] = max(0, int(values[-1]))
+                except ValueError:
+                    self.send_error(400)
+                    return
+        body = build_fixture_html(int(match.group(1)), **options).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Keep benchmark output clean"""
+        pass
+
+
+class FixtureServer:
+    """Serve fixtures on 127.0.0.1 from a background thread"""
+
+    def __init__(self, port=0):
+        """
+        Initialize the server
+
+        Args:
+            port: Port to bind, 0 picks a free one
+        """
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), FixtureRequestHandler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        """Base URL of the running server"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Start serving"""
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
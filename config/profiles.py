@@ -0,0 +1,78 @@
+"""
+Timing profiles - calibrated timeouts loaded in place of the built-in defaults
+
+Profiles are written by `python -m bench.calibrate` into a JSON file keyed by
+profile name (e.g. 'fast', 'safe' or a host name such as 'chat.deepseek.com').
+"""
+import json
+import os
+import sys
+
+
+# Settings a timing profile may override: the waits the login flow actually blocks on
+TIMING_PROFILE_KEYS = (
+    'ELEMENT_READY_TIMEOUT',
+    'COOKIE_DISMISS_TIMEOUT',
+    'ELEMENT_READY_GRACE'
+)
+
+
+def read_timing_profiles(path):
+    """
+    Read every profile from the profiles file
+
+    Args:
+        path: JSON file mapping profile name -> profile
+
+    Returns:
+        dict of profiles, empty if the file is missing or unreadable
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            profiles = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        sys.stderr.write(f"Ignoring unreadable timing profiles {path}: {e}\n")
+        return {}
+    return profiles if isinstance(profiles, dict) else {}
+
+
+def load_timing_profile(path, name):
+    """
+    Load the timeouts of one profile
+
+    Unknown keys and non-numeric or non-positive values are ignored, so a
+    damaged profile falls back to the built-in defaults key by key.
+
+    Args:
+        path: JSON file mapping profile name -> profile
+        name: Profile to load
+
+    Returns:
+        dict of setting name -> timeout in seconds
+    """
+    profile = read_timing_profiles(path).get(name) or {}
+    delays = profile.get('delays', {}) if isinstance(profile, dict) else {}
+    return {
+        key: float(value) for key, value in delays.items()
+        if key in TIMING_PROFILE_KEYS
+        and isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0
+    }
+
+
+def save_timing_profile(path, name, profile):
+    """
+    Add or replace one profile, keeping the others
+
+    Args:
+        path: JSON file mapping profile name -> profile
+        name: Profile name
+        profile: dict with 'delays' and calibration metadata
+    """
+    profiles = read_timing_profiles(path)
+    profiles[name] = profile
+    tmp_file = path + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(profiles, f, indent=2, sort_keys=True)
+    os.replace(tmp_file, path)
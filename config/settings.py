@@ -3,6 +3,8 @@ Configuration settings for the DeepSeek application
 """
 import os
 import sys
+from urllib.parse import urlparse
+from .profiles import load_timing_profile
 
 # Get the project root directory
 # Handle both normal Python and PyInstaller frozen exe
@@ -19,23 +21,138 @@ WINDOW_HEIGHT = 900
 MIN_WIDTH = 800
 MIN_HEIGHT = 600
 
-# Timing configuration (in seconds)
-INITIAL_DELAY = 0.5
-FIELD_FOCUS_DELAY = 0.5
-TYPING_DELAY = 0.5
-COOKIE_HANDLER_DELAY = 1
-COOKIE_PROCESSING_DELAY = 2
-
 # URL configuration
 DEEPSEEK_URL = 'https://chat.deepseek.com'
 WINDOW_TITLE = 'DeepSeek Chat - Automation'
 
+# Timing profiles written by `python -m bench.calibrate`; select one with the
+# DEEPSEEK_TIMING_PROFILE environment variable (defaults to the app's host)
+TIMING_PROFILES_FILE = os.path.join(PROJECT_ROOT, 'timing_profiles.json')
+TIMING_PROFILE = os.environ.get('DEEPSEEK_TIMING_PROFILE') or urlparse(DEEPSEEK_URL).hostname
+_timing_profile = load_timing_profile(TIMING_PROFILES_FILE, TIMING_PROFILE)
+
+# Timing configuration (in seconds)
+FIELD_FOCUS_DELAY = 0.5  # keyboard typing only
+TYPING_DELAY = 0.5  # keyboard typing only
+
+# Credential input mode: 'inject' sets field values directly in one call
+# (typing as fallback), 'inject_only' never sends OS key events (needed with
+# several windows), 'keyboard' types with OS key events (needs window focus)
+INPUT_MODE = 'inject'
+
+# Cookie consent preseed: the window first opens a lightweight same-origin
+# URL, stores the "essential only" choice there, then navigates to the app
+COOKIE_CONSENT_PRESEED_ENABLED = True
+CONSENT_BOOTSTRAP_URL = DEEPSEEK_URL + '/favicon.ico'
+COOKIE_CONSENT_LOCAL_STORAGE = {
+    'cookie_consent': '{"necessary":true,"analytics":false,"marketing":false}'
+}
+COOKIE_CONSENT_COOKIES = {
+    'cookie_consent': 'necessary'
+}
+CONSENT_STATS_FILE = os.path.join(PROJECT_ROOT, 'consent_stats.json')
+
 # Credentials file (in project root, not in config folder)
 CREDENTIALS_FILE = os.path.join(PROJECT_ROOT, 'credentials.json')
 
+# Session cache (skip the login flow while the saved session is valid)
+SESSION_CACHE_ENABLED = True
+SESSION_STORAGE_DIR = os.path.join(PROJECT_ROOT, 'session')
+
+# Multi-account runs (python main.py --accounts accounts.json)
+ACCOUNTS_FILE = os.path.join(PROJECT_ROOT, 'accounts.json')
+ACCOUNTS_STORAGE_DIR = os.path.join(PROJECT_ROOT, 'accounts')  # one session dir per account
+ACCOUNT_CONCURRENCY = 3  # windows logging in at the same time
+ACCOUNT_STAGGER = 2  # seconds between two page loads
+ACCOUNT_LOGIN_TIMEOUT = 120  # seconds before an account counts as timed out
+ACCOUNT_STORAGE_WAIT = 60  # max seconds a window waits for another account to free the shared storage
+ACCOUNT_SESSION_TTL = 24 * 3600  # seconds a fresh login is assumed to stay valid (.jsonl stores)
+ACCOUNT_META_COMPACT_LINES = 1000  # metadata journal lines (and at least 2 per profile) before it is compacted
+
+# Prompt queue (python main.py --prompts prompts.txt, run after the login)
+PROMPT_RESPONSE_TIMEOUT = 300  # max seconds from send to a finished answer
+PROMPT_SEND_TIMEOUT = 5  # max seconds for the send button to become enabled
+PROMPT_SETTLE_MS = 1500  # answer unchanged this long counts as finished when no stop button is seen
+PROMPT_MAX_ATTEMPTS = 2  # attempts per prompt before it is recorded as failed
+PROMPT_LOGIN_WAIT = 300  # max seconds the prompts wait for the login flow (captchas are solved by hand)
+
+# Prompt scheduling across logged-in windows (python main.py --accounts --prompts)
+PROMPT_RATE_PER_MINUTE = 6  # prompts one account may send per minute (token bucket rate)
+PROMPT_BURST = 2  # prompts an idle account may send back to back (token bucket size)
+THROTTLE_BACKOFF = 0.5  # an account's rate is multiplied by this after a throttling banner
+THROTTLE_RECOVERY = 0.1  # fraction of the full rate regained per answered prompt
+THROTTLE_COOLDOWN = 15  # seconds an account pauses after a throttling banner (doubles while repeated)
+THROTTLE_COOLDOWN_MAX = 600
+THROTTLE_MAX_REQUEUES = 5  # throttled sends of one prompt before it is recorded as failed
+
+# Response cache (identical prompts are answered without the page)
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_DIR = os.path.join(PROJECT_ROOT, 'response_cache')
+RESPONSE_CACHE_TTL = 7 * 24 * 3600  # seconds a cached answer stays valid
+RESPONSE_CACHE_MAX_BYTES = 256 * 1024 * 1024  # least recently used answers are evicted above this
+RESPONSE_CACHE_MEMORY_ENTRIES = 1024  # answers kept in the in-memory LRU
+
+# Transcript store (captured prompt/response pairs, append-only segments)
+TRANSCRIPTS_DIR = os.path.join(PROJECT_ROOT, 'transcripts')
+TRANSCRIPT_SEGMENT_BYTES = 64 * 1024 * 1024  # start a new segment after this size
+TRANSCRIPT_COMPRESS = True  # gzip each record (segments stay streamable .gz files)
+
+# Logging (buffered background writer, JSON lines, size-based rotation)
+LOG_FILE = os.path.join(PROJECT_ROOT, 'deepseek_error.log')
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+LOG_QUEUE_SIZE = 10000  # records beyond this are dropped, never blocking the caller
+LOG_BATCH_SIZE = 256
+LOG_FLUSH_INTERVAL = 0.2  # seconds
+
+# Timing spans (per-phase latency export)
+TIMING_SPANS_FILE = os.path.join(PROJECT_ROOT, 'timing_spans.jsonl')
+TIMING_PROM_FILE = os.path.join(PROJECT_ROOT, 'deepseek_timing.prom')
+TIMING_RESERVOIR_SIZE = 1024  # durations sampled per phase for the quantiles
+TIMING_FLUSH_EVERY = 256  # pending spans that trigger a flush
+
 # Login button detection
 LOGIN_BUTTON_SEARCH_TIMEOUT = 10  # seconds to wait for login button
-LOGIN_BUTTON_DETECTION_INTERVAL = 0.5  # how often to check for button in seconds
+
+# Login confirmation (typed outcome of the login click)
+LOGIN_CONFIRM_TIMEOUT = 10  # max seconds from the click to an outcome
+LOGIN_URL_KEYWORDS = ['sign_in', 'sign_up', 'login', 'register']  # paths still on the login flow
+LOGIN_ERROR_SELECTORS = [
+    '[role="alert"]',
+    '.ds-toast',
+    '.ds-notification',
+    '.ds-form-item__error'
+]
+LOGIN_ERROR_PATTERNS = ['incorrect', 'invalid', 'wrong', 'does not exist', 'not registered', 'failed']
+CAPTCHA_SELECTORS = [
+    'iframe[src*="captcha"]',
+    'iframe[src*="turnstile"]',
+    '[class*="captcha"]',
+    '[id*="captcha"]',
+    '[class*="turnstile"]'
+]
+
+# Login steps (checkpointed, a failed step is retried on its own)
+STEP_MAX_ATTEMPTS = 3  # attempts per step before the flow gives up
+STEP_BACKOFF_BASE = 0.5  # seconds before the first retry, doubled per retry
+STEP_BACKOFF_MAX = 4  # upper bound for the retry delay in seconds
+
+# Bridge calls (window.evaluate_js)
+EVALUATE_JS_TIMEOUT = 5  # max seconds a single evaluate_js call may take
+
+# Element readiness (MutationObserver based waits), calibrated values override the defaults
+ELEMENT_READY_TIMEOUT = _timing_profile.get('ELEMENT_READY_TIMEOUT', 10)  # max seconds to wait for an element to appear
+ELEMENT_READY_GRACE = _timing_profile.get('ELEMENT_READY_GRACE', 2)  # extra seconds to wait for the page to answer
+COOKIE_DISMISS_TIMEOUT = _timing_profile.get('COOKIE_DISMISS_TIMEOUT', 2)  # max seconds to wait for banner to close
+
+# Selector strategy engine
+SELECTOR_STATS_FILE = os.path.join(PROJECT_ROOT, 'selector_stats.json')
+SELECTOR_DEMOTE_AFTER_MISSES = 3  # consecutive misses before a method is tried last
+SELECTOR_STATS_SAVE_EVERY = 50  # probe results kept in memory before the stats file is rewritten
+
+# Single-pass DOM scan scoring (0-100)
+DOM_SCAN_EXIT_SCORE = 90  # stop walking once every target has a candidate this good
+DOM_SCAN_MIN_CLICK_SCORE = 60  # never click a candidate scoring below this
 
 # UI Elements selectors
 EMAIL_INPUT_SELECTORS = [
@@ -52,6 +169,8 @@ PASSWORD_INPUT_SELECTORS = [
 
 LOGIN_BUTTON_SELECTORS = [
     'button:contains("Log in")',
+    'div.ds-button:contains("Log in")',
+    '.ds-sign-up-form__register-button',
     'button[type="submit"]',
     'button.login-button',
     'a.login-button',
@@ -59,8 +178,42 @@ LOGIN_BUTTON_SELECTORS = [
     '/html/body/div[1]/div/div[1]/div[2]/div/div/div[2]/div/div[5]'
 ]
 
+CHAT_INPUT_SELECTORS = [
+    'textarea#chat-input',
+    'textarea[placeholder*="DeepSeek"]',
+    'div[contenteditable="true"]'
+]
+
+CHAT_SEND_BUTTON_SELECTORS = [
+    'div[role="button"][aria-label*="Send"]',
+    'button[aria-label*="Send"]',
+    'div._7436101',
+    'div[role="button"]:has(> svg)'
+]
+
+# Shown only while an answer is generating (the send button turns into stop)
+CHAT_STOP_BUTTON_SELECTORS = [
+    'div[role="button"][aria-label*="Stop"]',
+    'button[aria-label*="Stop"]'
+]
+
+# Rendered assistant answers, the last match is the newest
+ASSISTANT_MESSAGE_SELECTORS = [
+    'div.ds-markdown',
+    'div[class*="markdown"]'
+]
+
+# Banners telling that the account is sending too fast or the server is overloaded
+THROTTLE_BANNER_SELECTORS = [
+    '[role="alert"]',
+    '.ds-toast',
+    '.ds-notification'
+]
+THROTTLE_PATTERNS = ['too many', 'too frequent', 'rate limit', 'server is busy', 'try again later']
+
 COOKIE_BANNER_SELECTORS = [
     'div.cookie_banner-accept-essential-button',
+    'div.ds-button:contains("necessary")',
     'button.cookie-accept',
     'button[aria-label*="Accept"]',
     '/html/body/div[1]/div/div[2]/div[3]'
@@ -10,52 +10,138 @@ This application automates login to DeepSeek chat by:
 6. Clicking the login button
 """
 
+import argparse
+import os
 import sys
-import traceback
-from datetime import datetime
+from config import ACCOUNTS_FILE, ACCOUNT_CONCURRENCY
 from src.browser_manager import BrowserManager
+from src import logger
 
 
-def log_error(message):
-    """Log error to file for debugging exe issues"""
+log = logger.get_logger('main')
+
+
+def run_accounts(path, concurrency, limit=None, prompts_files=None):
+    """
+    Log in the accounts of an accounts file, several windows at a time
+    
+    A .jsonl file is read as a CredentialStore: only the profiles whose
+    session expired are logged in, and each result is recorded. With prompts
+    files, the logged-in windows then share them as one job per file.
+    """
+    from src.orchestrator import LoginOrchestrator, due_accounts, load_accounts
+    from src.credentials_store import CredentialStore
+    
+    store = CredentialStore(path) if path.endswith('.jsonl') else None
+    try:
+        accounts = due_accounts(store, limit) if store else load_accounts(path)[:limit]
+    except (OSError, ValueError) as e:
+        log.error(f"[ERROR] Cannot read accounts file {path}: {e}")
+        return 1
+    if store and not accounts:
+        log.info(f"[ACCOUNTS] Every session in {path} is still valid")
+        return 0
+    orchestrator = LoginOrchestrator(accounts, concurrency=concurrency, store=store,
+                                     keep_open=bool(prompts_files))
+    report = orchestrator.run(then=lambda runs: send_prompts(runs, prompts_files, orchestrator.clock))
+    return 0 if report and not report['failed'] else 1
+
+
+def send_prompts(runs, prompts_files, clock):
+    """
+    Send the prompts files from the logged-in windows of an accounts run
+    
+    The windows share the browser storage, so each send restores its
+    account's session under the storage gate. Every account keeps a progress
+    file in its session directory; prompts any account finished are skipped.
+    Prompt ids are prefixed with their file, so two files may use the same ids.
+    """
+    from config import TRANSCRIPTS_DIR, RESPONSE_CACHE_ENABLED
+    from src.prompt_queue import PromptQueue, read_prompts
+    from src.prompt_scheduler import PromptScheduler
+    from src.response_cache import ResponseCache
+    from src.timing import get_tracer
+    from src.transcript_store import TranscriptStore
+    
+    transcripts = TranscriptStore(TRANSCRIPTS_DIR)
+    cache = ResponseCache() if RESPONSE_CACHE_ENABLED else None
+    workers = []
+    for run in runs:
+        progress_dir = run.handler.session_cache.ensure_storage_dir()
+        workers.append((run.account['id'], PromptQueue(
+            run.handler.window, run.handler.event_bus, run.handler.strategy_engine, clock,
+            progress_file=os.path.join(progress_dir, 'prompts.progress.jsonl'),
+            transcripts=transcripts, account=run.account['username'], cache=cache,
+            storage=run.handler
+        )))
+    scheduler = PromptScheduler(workers, clock)
+    done = set()
+    for _, queue in workers:
+        done |= queue.completed()
     try:
-        with open('deepseek_error.log', 'a', encoding='utf-8') as f:
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            f.write(f"[{timestamp}] {message}\n")
-    except:
-        pass  # Silently fail if we can't write log
+        for prompts_file in prompts_files:
+            try:
+                items = [dict(item, id=f"{prompts_file}:{item['id']}") for item in read_prompts(prompts_file)]
+            except OSError as e:
+                log.error(f"[PROMPTS] Cannot read prompts file {prompts_file}: {e}")
+                continue
+            pending = [item for item in items if item['id'] not in done]
+            if len(pending) < len(items):
+                log.info(f"[PROMPTS] {prompts_file}: {len(items) - len(pending)} prompts already done")
+            scheduler.add_job(prompts_file, pending)
+        scheduler.run()
+    finally:
+        transcripts.close()
+        if cache is not None:
+            cache.close()
+        get_tracer().flush()
 
 
-def main_method():
+def main_method(argv=None):
     """Main entry point"""
+    parser = argparse.ArgumentParser(description='DeepSeek Chat Automation')
+    parser.add_argument('--accounts', nargs='?', const=ACCOUNTS_FILE,
+                        help='log in the accounts of a JSON (or JSON Lines) accounts file')
+    parser.add_argument('--concurrency', type=int, default=ACCOUNT_CONCURRENCY,
+                        help='windows logging in at the same time (with --accounts)')
+    parser.add_argument('--limit', type=int,
+                        help='log in at most this many accounts (with --accounts)')
+    parser.add_argument('--prompts', nargs='+', metavar='FILE',
+                        help='send the prompts of text or JSON Lines files once logged in '
+                             '(several files need --accounts, which shares them between the windows)')
+    args = parser.parse_args(argv)
+    
     try:
-        log_error("=== Application Starting ===")
-        print("=" * 60)
-        print("DeepSeek Chat Automation")
-        print("=" * 60)
+        log.debug("=== Application Starting ===")
+        log.info("=" * 60)
+        log.info("DeepSeek Chat Automation")
+        log.info("=" * 60)
+        
+        if args.accounts:
+            return run_accounts(args.accounts, args.concurrency, args.limit, args.prompts)
+        if args.prompts and len(args.prompts) > 1:
+            log.error("[ERROR] Several prompts files need --accounts")
+            return 2
         
-        manager = BrowserManager()
+        manager = BrowserManager(prompts_file=args.prompts[0] if args.prompts else None)
         success = manager.run()
         
         if not success:
-            log_error("[ERROR] Failed to start application")
-            print("\n[ERROR] Failed to start application")
+            log.error("\n[ERROR] Failed to start application")
             return 1
         
-        log_error("[SUCCESS] Application closed normally")
-        print("\n[SUCCESS] Application closed")
+        log.info("\n[SUCCESS] Application closed")
         return 0
         
     except KeyboardInterrupt:
-        log_error("[INFO] Application interrupted by user")
-        print("\n\n[INFO] Application interrupted by user")
+        log.info("\n\n[INFO] Application interrupted by user")
         return 0
     except Exception as e:
-        error_msg = f"[ERROR] Fatal error: {e}\n{traceback.format_exc()}"
-        log_error(error_msg)
-        print(f"\n[ERROR] Fatal error: {e}")
+        log.error(f"\n[ERROR] Fatal error: {e}", exc_info=True)
         return 1
+    finally:
+        logger.flush()
 
 
 if __name__ == '__main__':
-    main_method()
+    sys.exit(main_method())
@@ -0,0 +1,196 @@
+"""
+Bridge module - deadline-bounded, cancellable evaluate_js calls
+
+Bridge wraps a pywebview window so every evaluate_js call runs with a
+deadline, is timed as a span, and stops early once the flow's CancelToken
+is cancelled (for example when the page navigates and a new flow starts).
+"""
+import threading
+from config import EVALUATE_JS_TIMEOUT
+from .clock import REAL_CLOCK
+from .page_bundle import script_label
+from .timing import get_tracer, BRIDGE_CALL
+from .logger import get_logger
+
+
+log = get_logger(__name__)
+
+
+class BridgeTimeout(Exception):
+    """An evaluate_js call did not return before its deadline"""
+
+    def __init__(self, label, timeout):
+        super().__init__(f"evaluate_js ({label}) timed out after {timeout:g}s")
+        self.label = label
+        self.timeout = timeout
+
+
+class FlowCancelled(BaseException):
+    """
+    The flow was cancelled while a step was running
+
+    Derives from BaseException, like asyncio.CancelledError, so the
+    components' generic `except Exception` handlers let it propagate up
+    to the flow instead of treating it as an ordinary step failure.
+    """
+
+
+class CancelToken:
+    """Cancellation flag shared by every step of one flow"""
+
+    def __init__(self):
+        self.reason = None
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._waiters = set()
+
+    @property
+    def cancelled(self):
+        """True once cancel() was called"""
+        return self._cancelled.is_set()
+
+    def cancel(self, reason='cancelled'):
+        """
+        Cancel the flow and wake every step waiting on this token
+
+        Args:
+            reason: Short description recorded with the cancellation
+        """
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self.reason = reason
+            self._cancelled.set()
+            waiters = list(self._waiters)
+        for event in waiters:
+            event.set()
+
+    def add_waiter(self, event):
+        """Set `event` when the token is cancelled (immediately if it already is)"""
+        with self._lock:
+            self._waiters.add(event)
+            cancelled = self._cancelled.is_set()
+        if cancelled:
+            event.set()
+
+    def remove_waiter(self, event):
+        """Stop waking `event` on cancellation"""
+        with self._lock:
+            self._waiters.discard(event)
+
+    def raise_if_cancelled(self):
+        """Raise FlowCancelled if the token was cancelled"""
+        if self._cancelled.is_set():
+            raise FlowCancelled(self.reason)
+
+    def sleep(self, clock, seconds):
+        """
+        Sleep on `clock`, waking early if the token is cancelled
+
+        Args:
+            clock: Clock to sleep on
+            seconds: Time to sleep
+
+        Raises:
+            FlowCancelled: The token was cancelled before or during the sleep
+        """
+        event = threading.Event()
+        self.add_waiter(event)
+        try:
+            clock.wait(event, seconds)
+        finally:
+            self.remove_waiter(event)
+        self.raise_if_cancelled()
+
+
+class Bridge:
+    """Proxy around a pywebview window that bounds, times and cancels evaluate_js calls"""
+
+    def __init__(self, window, clock=None, timeout=EVALUATE_JS_TIMEOUT):
+        """
+        Initialize the bridge
+
+        Args:
+            window: pywebview window object
+            clock: Clock used for deadlines (real time by default)
+            timeout: Default per-call deadline in seconds
+        """
+        self.window = window
+        self.clock = clock or REAL_CLOCK
+        self.timeout = timeout
+        self.token = CancelToken()
+        self.tracer = get_tracer()
+
+    def new_flow(self):
+        """
+        Cancel the running flow and start a new one
+
+        Returns:
+            CancelToken of the new flow
+        """
+        self.token.cancel('superseded by a new page load')
+        self.token = CancelToken()
+        return self.token
+
+    def evaluate_js(self, script, callback=None, timeout=None):
+        """
+        Evaluate a script with a deadline
+
+        Args:
+            script: JavaScript source
+            callback: Optional pywebview callback for promise results
+            timeout: Deadline in seconds (defaults to the bridge timeout)
+
+        Returns:
+            The script result
+
+        Raises:
+            BridgeTimeout: The call did not return in time
+            FlowCancelled: The flow was cancelled before or during the call
+        """
+        token = self.token
+        token.raise_if_cancelled()
+        timeout = self.timeout if timeout is None else timeout
+        label = script_label(script)
+        outcome = {}
+        done = threading.Event()
+
+        def run():
+            try:
+                if callback is None:
+                    outcome['result'] = self.window.evaluate_js(script)
+                else:
+                    outcome['result'] = self.window.evaluate_js(script, callback)
+            except Exception as e:
+                outcome['error'] = e
+            finally:
+                done.set()
+
+        span = self.tracer.span(BRIDGE_CALL, call=label, bytes=len(script))
+        start = self.clock.now()
+        token.add_waiter(done)
+        try:
+            self.clock.spawn(run)
+            if 'result' in outcome or 'error' in outcome:
+                # Ran inline (simulated time): judge it by the time it consumed
+                finished = self.clock.now() - start <= timeout
+            else:
+                finished = self.clock.wait(done, timeout) and ('result' in outcome or 'error' in outcome)
+        finally:
+            token.remove_waiter(done)
+
+        if not finished and token.cancelled:
+            span.set(cancelled=True).end(ok=False)
+            raise FlowCancelled(token.reason)
+        if not finished:
+            span.set(timeout=True).end(ok=False)
+            log.warning(f"⏱️  evaluate_js ({label}) gave no answer within {timeout:g}s")
+            raise BridgeTimeout(label, timeout)
+        if 'error' in outcome:
+            span.end(ok=False)
+            raise outcome['error']
+        span.end()
+        return outcome['result']
+
+    def __getattr__(self, name):
+        return getattr(self.window, name)
@@ -2,52 +2,69 @@
 Browser manager module for creating and managing the webview window
 """
 import webview
-import traceback
 from config import (
     WINDOW_WIDTH,
     WINDOW_HEIGHT,
     MIN_WIDTH,
     MIN_HEIGHT,
     DEEPSEEK_URL,
-    WINDOW_TITLE
+    WINDOW_TITLE,
+    SESSION_CACHE_ENABLED,
+    COOKIE_CONSENT_PRESEED_ENABLED,
+    TRANSCRIPTS_DIR,
+    RESPONSE_CACHE_ENABLED,
+    PROMPT_LOGIN_WAIT
 )
 from .page_handler import PageHandler
 from .credentials_manager import CredentialsManager
+from .js_api import EventBus, JsApi
+from .session_cache import SessionCache
+from .consent_preseed import ConsentPreseed
+from .prompt_queue import PromptQueue, read_prompts
+from .response_cache import ResponseCache
+from .transcript_store import TranscriptStore
+from .timing import get_tracer, WINDOW_CREATION, PAGE_LOAD
+from .logger import get_logger
 
 
-def log_error(message):
-    """Log error to file for debugging"""
-    try:
-        from datetime import datetime
-        with open('deepseek_error.log', 'a', encoding='utf-8') as f:
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            f.write(f"[{timestamp}] {message}\n")
-    except:
-        pass
+log = get_logger(__name__)
 
 
 class BrowserManager:
     """Manage browser window creation and lifecycle"""
     
-    def __init__(self):
-        """Initialize browser manager"""
+    def __init__(self, prompts_file=None):
+        """
+        Initialize browser manager
+        
+        Args:
+            prompts_file: Prompts to send once logged in (see read_prompts)
+        """
+        self.prompts_file = prompts_file
+        self.prompt_queue = None
         self.window = None
         self.page_handler = None
+        self.event_bus = EventBus()
+        self.js_api = JsApi(self.event_bus)
+        self.session_cache = SessionCache() if SESSION_CACHE_ENABLED else None
+        self.consent_preseed = ConsentPreseed() if COOKIE_CONSENT_PRESEED_ENABLED else None
+        self.tracer = get_tracer()
+        self.page_load_span = None
     
     def check_credentials_file(self):
         """Check if credentials file exists, create template if not"""
         try:
-            log_error("[BrowserManager] Checking credentials file...")
+            log.debug("[BrowserManager] Checking credentials file...")
             credentials_manager = CredentialsManager()
             result = credentials_manager.create_template()
             if not result:
-                log_error("[BrowserManager] Credentials template check failed - please set up credentials.json")
-                print("Please set up credentials.json first")
+                log.debug("[BrowserManager] Credentials template check failed - please set up credentials.json")
+                log.info("Please set up credentials.json first")
                 return False
-            log_error("[BrowserManager] Credentials file check passed")
+            log.debug("[BrowserManager] Credentials file check passed")
             return True
         except Exception as e:
-            log_error(f"[BrowserManager] Error in check_credentials_file: {e}\n{traceback.format_exc()}")
+            log.error(f"[BrowserManager] Error in check_credentials_file: {e}", exc_info=True)
             return False
     
     def create_window(self):
@@ -58,72 +75,122 @@ class BrowserManager:
             window object if successful, None otherwise
         """
         try:
-            log_error("[BrowserManager] Creating webview window...")
-            self.window = webview.create_window(
-                WINDOW_TITLE,
-                DEEPSEEK_URL,
-                width=WINDOW_WIDTH,
-                height=WINDOW_HEIGHT,
-                min_size=(MIN_WIDTH, MIN_HEIGHT)
-            )
+            log.debug("[BrowserManager] Creating webview window...")
+            start_url = self.consent_preseed.start_url if self.consent_preseed else DEEPSEEK_URL
+            with self.tracer.span(WINDOW_CREATION):
+                self.window = webview.create_window(
+                    WINDOW_TITLE,
+                    start_url,
+                    width=WINDOW_WIDTH,
+                    height=WINDOW_HEIGHT,
+                    min_size=(MIN_WIDTH, MIN_HEIGHT),
+                    js_api=self.js_api
+                )
+            self.page_load_span = self.tracer.span(PAGE_LOAD, url=start_url)
             
-            log_error("[BrowserManager] Window created successfully")
+            log.debug("[BrowserManager] Window created successfully")
             
             # Initialize page handler
-            self.page_handler = PageHandler(self.window)
+            self.page_handler = PageHandler(
+                self.window,
+                self.event_bus,
+                self.session_cache,
+                self.consent_preseed
+            )
             
             # Register loaded event
             self.window.events.loaded += self.on_window_loaded
             
-            log_error("[BrowserManager] Page handler initialized")
+            log.debug("[BrowserManager] Page handler initialized")
             return self.window
         except Exception as e:
-            log_error(f"[BrowserManager] Error creating window: {e}\n{traceback.format_exc()}")
-            print(f"Error creating window: {e}")
+            log.error(f"[BrowserManager] Error creating window: {e}", exc_info=True)
             return None
     
     def on_window_loaded(self):
         """Handle window loaded event"""
+        if self.page_load_span:
+            # Only the first load counts; end() ignores later calls
+            self.page_load_span.end()
         if self.page_handler:
             self.page_handler.on_page_loaded()
     
+    def run_prompts(self):
+        """Send the prompts file through the chat once the login flow finished"""
+        if not self.page_handler.flow_done.wait(PROMPT_LOGIN_WAIT):
+            log.error(f"[PROMPTS] Login flow did not finish within {PROMPT_LOGIN_WAIT}s, prompts not sent")
+            return
+        status = self.page_handler.flow_result['status']
+        if status not in ('success', 'session'):
+            log.error(f"[PROMPTS] Not logged in ({status}), prompts not sent")
+            return
+        
+        cache = ResponseCache() if RESPONSE_CACHE_ENABLED else None
+        self.prompt_queue = PromptQueue(
+            self.page_handler.window,
+            self.event_bus,
+            self.page_handler.strategy_engine,
+            progress_file=self.prompts_file + '.progress.jsonl',
+            transcripts=TranscriptStore(TRANSCRIPTS_DIR),
+            account=self.page_handler.credentials_manager.get_username(),
+            cache=cache
+        )
+        try:
+            self.prompt_queue.run(read_prompts(self.prompts_file))
+        except OSError as e:
+            log.error(f"[PROMPTS] Cannot read prompts file {self.prompts_file}: {e}")
+        finally:
+            self.prompt_queue.transcripts.close()
+            if cache is not None:
+                cache.close()
+    
     def start(self):
         """Start the browser"""
         if self.window:
             try:
-                log_error("[BrowserManager] Starting webview...")
-                webview.start()
-                log_error("[BrowserManager] Webview started successfully")
+                log.debug("[BrowserManager] Starting webview...")
+                func = self.run_prompts if self.prompts_file else None
+                if self.session_cache:
+                    # Persistent profile keeps cookies between runs
+                    webview.start(
+                        func,
+                        private_mode=False,
+                        storage_path=self.session_cache.ensure_storage_dir()
+                    )
+                else:
+                    webview.start(func)
+                if self.page_handler:
+                    self.page_handler.strategy_engine.sync()
+                log.debug("[BrowserManager] Webview started successfully")
             except Exception as e:
-                log_error(f"[BrowserManager] Error starting webview: {e}\n{traceback.format_exc()}")
-                print(f"Error starting webview: {e}")
+                log.error(f"[BrowserManager] Error starting webview: {e}", exc_info=True)
         else:
-            log_error("[BrowserManager] Cannot start - window not created")
-            print("Window not created")
+            log.error("[BrowserManager] Cannot start - window not created")
     
     def run(self):
         """Run the browser manager"""
         try:
-            log_error("[BrowserManager] Starting run() method")
+            log.debug("[BrowserManager] Starting run() method")
             
             # Check credentials
-            log_error("[BrowserManager] Step 1: Checking credentials...")
+            log.debug("[BrowserManager] Step 1: Checking credentials...")
             if not self.check_credentials_file():
-                log_error("[BrowserManager] Credentials check failed, aborting")
+                log.error("[BrowserManager] Credentials check failed, aborting")
                 return False
             
             # Create window
-            log_error("[BrowserManager] Step 2: Creating window...")
+            log.debug("[BrowserManager] Step 2: Creating window...")
             if not self.create_window():
-                log_error("[BrowserManager] Window creation failed, aborting")
+                log.error("[BrowserManager] Window creation failed, aborting")
                 return False
             
             # Start browser
-            log_error("[BrowserManager] Step 3: Starting browser...")
+            log.debug("[BrowserManager] Step 3: Starting browser...")
             self.start()
+            self.tracer.flush()
             
-            log_error("[BrowserManager] Run completed successfully")
+            log.debug("[BrowserManager] Run completed successfully")
             return True
         except Exception as e:
-            log_error(f"[BrowserManager] Exception in run(): {e}\n{traceback.format_exc()}")
+            log.error(f"[BrowserManager] Exception in run(): {e}", exc_info=True)
             return False
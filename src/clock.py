@@ -0,0 +1,158 @@
+"""
+Clock module - real and simulated time for the automation flow
+
+Everything in the flow that sleeps, waits for an event, schedules a callback
+or starts a background step goes through a clock, so the same code can run in
+real time against a webview or in simulated time against a fake window.
+"""
+import heapq
+import itertools
+import threading
+import time
+
+
+class RealClock:
+    """Wall-clock time backed by time, threading.Event and threading.Timer"""
+
+    def now(self):
+        """Monotonic high-resolution time in seconds"""
+        return time.perf_counter()
+
+    def sleep(self, seconds):
+        """Block for the given number of seconds"""
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def wait(self, event, timeout):
+        """
+        Wait for a threading.Event
+
+        Args:
+            event: threading.Event to wait on
+            timeout: Maximum time to wait in seconds
+
+        Returns:
+            True if the event was set, False on timeout
+        """
+        return event.wait(timeout)
+
+    def call_later(self, delay, callback, *args):
+        """
+        Run a callback after a delay on a timer thread
+
+        Returns:
+            Handle with a cancel() method
+        """
+        timer = threading.Timer(delay, callback, args)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def spawn(self, target, *args):
+        """Run a step in a daemon thread"""
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        return thread
+
+
+class _ScheduledCall:
+    """Handle for a callback scheduled on a VirtualClock"""
+
+    def __init__(self, callback, args):
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """Prevent the callback from running"""
+        self.cancelled = True
+
+
+class VirtualClock:
+    """
+    Simulated time that advances instantly
+
+    sleep() and wait() jump straight to the next scheduled callback or the
+    deadline, and spawn() runs steps inline, so a whole flow is deterministic
+    and runs as fast as the Python code allows.
+    """
+
+    def __init__(self, start=0.0):
+        """
+        Initialize the clock
+
+        Args:
+            start: Initial simulated time in seconds
+        """
+        self._now = start
+        self._queue = []
+        self._sequence = itertools.count()
+        self._lock = threading.RLock()
+
+    def now(self):
+        """Simulated time in seconds"""
+        return self._now
+
+    def call_later(self, delay, callback, *args):
+        """
+        Schedule a callback at now + delay in simulated time
+
+        Returns:
+            Handle with a cancel() method
+        """
+        call = _ScheduledCall(callback, args)
+        with self._lock:
+            heapq.heappush(self._queue, (self._now + max(0.0, delay), next(self._sequence), call))
+        return call
+
+    def _run_next(self, deadline):
+        """
+        Run the earliest callback due at or before the deadline
+
+        Returns:
+            True if a callback was due, False otherwise
+        """
+        with self._lock:
+            if not self._queue or self._queue[0][0] > deadline:
+                return False
+            due, _, call = heapq.heappop(self._queue)
+            self._now = max(self._now, due)
+        if not call.cancelled:
+            call.callback(*call.args)
+        return True
+
+    def advance(self, seconds):
+        """Move time forward, running every callback that falls due"""
+        deadline = self._now + max(0.0, seconds)
+        while self._run_next(deadline):
+            pass
+        self._now = max(self._now, deadline)
+
+    def sleep(self, seconds):
+        """Advance simulated time instead of blocking"""
+        self.advance(seconds)
+
+    def wait(self, event, timeout):
+        """
+        Advance time until the event is set or the timeout passes
+
+        Args:
+            event: threading.Event to wait on
+            timeout: Maximum simulated time to wait in seconds
+
+        Returns:
+            True if the event was set, False on timeout
+        """
+        deadline = self._now + max(0.0, timeout)
+        while not event.is_set():
+            if not self._run_next(deadline):
+                self._now = max(self._now, deadline)
+                break
+        return event.is_set()
+
+    def spawn(self, target, *args):
+        """Run a step inline so simulated runs stay single-threaded"""
+        target(*args)
+
+
+REAL_CLOCK = RealClock()
@@ -0,0 +1,128 @@
+"""
+Cookie consent preseed module - stores the "essential only" choice before the app renders
+"""
+import json
+import os
+import threading
+from config import (
+    DEEPSEEK_URL,
+    CONSENT_BOOTSTRAP_URL,
+    COOKIE_CONSENT_LOCAL_STORAGE,
+    COOKIE_CONSENT_COOKIES,
+    CONSENT_STATS_FILE
+)
+from .logger import get_logger
+
+
+log = get_logger(__name__)
+
+
+# Consent paths recorded per page load
+PRESEED_PATH = 'preseed'
+FALLBACK_PATH = 'fallback'
+
+
+PRESEED_JS = """
+(function(spec) {
+    var keys = Object.keys(spec.local_storage);
+    for (var i = 0; i < keys.length; i++) {
+        window.localStorage.setItem(keys[i], spec.local_storage[keys[i]]);
+    }
+    var names = Object.keys(spec.cookies);
+    for (var j = 0; j < names.length; j++) {
+        document.cookie = names[j] + '=' + encodeURIComponent(spec.cookies[names[j]]) +
+                          '; path=/; max-age=31536000; SameSite=Lax';
+    }
+    if (location.href === spec.bootstrap_url) {
+        location.replace(spec.target_url);
+        return {bootstrap: true};
+    }
+    return {bootstrap: false};
+})(%s);
+"""
+
+
+class ConsentPreseed:
+    """
+    Write the consent state on a lightweight same-origin page, then open the app
+
+    The window starts on CONSENT_BOOTSTRAP_URL so localStorage and cookies for
+    the DeepSeek origin exist before the chat app first renders its banner.
+    """
+
+    def __init__(self, stats_file=CONSENT_STATS_FILE):
+        """
+        Initialize the preseed
+
+        Args:
+            stats_file: JSON file where preseed/fallback counts are persisted
+        """
+        self.stats_file = stats_file
+        self._lock = threading.Lock()
+
+    @property
+    def start_url(self):
+        """URL the window should open first"""
+        return CONSENT_BOOTSTRAP_URL
+
+    def handle_bootstrap(self, window):
+        """
+        Seed the consent state and leave the bootstrap page
+
+        Args:
+            window: pywebview window object
+
+        Returns:
+            True if this load was the bootstrap page (the app is now loading),
+            False for a normal app page load
+        """
+        spec = {
+            'local_storage': COOKIE_CONSENT_LOCAL_STORAGE,
+            'cookies': COOKIE_CONSENT_COOKIES,
+            'bootstrap_url': CONSENT_BOOTSTRAP_URL,
+            'target_url': DEEPSEEK_URL
+        }
+        try:
+            result = window.evaluate_js(PRESEED_JS % json.dumps(spec))
+        except Exception as e:
+            log.error(f"Error seeding cookie consent: {e}")
+            return False
+
+        if result and result.get('bootstrap'):
+            log.info("[COOKIE] Consent preseeded, opening DeepSeek...")
+            return True
+        return False
+
+    def record(self, path):
+        """
+        Record which consent path a page load took and log the hit rate
+
+        Args:
+            path: PRESEED_PATH if no banner rendered, FALLBACK_PATH if the detector ran
+        """
+        with self._lock:
+            stats = self.load_stats()
+            stats[path] = stats.get(path, 0) + 1
+            self.save_stats(stats)
+
+        total = stats.get(PRESEED_PATH, 0) + stats.get(FALLBACK_PATH, 0)
+        log.info(f"[COOKIE] Consent path: {path} "
+              f"(preseed hit rate {stats.get(PRESEED_PATH, 0)}/{total})")
+
+    def load_stats(self):
+        """Load the persisted path counts"""
+        try:
+            with open(self.stats_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def save_stats(self, stats):
+        """Persist the path counts"""
+        try:
+            tmp_file = self.stats_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(stats, f)
+            os.replace(tmp_file, self.stats_file)
+        except OSError as e:
+            log.warning(f"⚠️  Could not save consent stats: {e}")
@@ -4,15 +4,26 @@ Credentials management module
 import json
 import os
 from config import CREDENTIALS_FILE
+from .logger import get_logger
+
+
+log = get_logger(__name__)
 
 
 class CredentialsManager:
     """Manage credentials loading and validation"""
     
-    def __init__(self):
+    def __init__(self, username=None, password=None):
+        """
+        Initialize the manager
+        
+        Args:
+            username: Account username when not read from credentials.json
+            password: Account password when not read from credentials.json
+        """
         self.credentials = None
-        self.username = None
-        self.password = None
+        self.username = username
+        self.password = password
     
     def load_credentials(self):
         """Load credentials from JSON file"""
@@ -25,29 +36,29 @@ class CredentialsManager:
             
             return True
         except FileNotFoundError:
-            print(f"Error: {CREDENTIALS_FILE} file not found!")
+            log.error(f"Error: {CREDENTIALS_FILE} file not found!")
             return False
         except json.JSONDecodeError:
-            print(f"Error: {CREDENTIALS_FILE} is not valid JSON!")
+            log.error(f"Error: {CREDENTIALS_FILE} is not valid JSON!")
             return False
     
     def create_template(self):
         """Create a template credentials.json file"""
         if not os.path.exists(CREDENTIALS_FILE):
-            print(f"Creating {CREDENTIALS_FILE} template...")
+            log.info(f"Creating {CREDENTIALS_FILE} template...")
             with open(CREDENTIALS_FILE, 'w') as f:
                 json.dump({
                     "username": "your_email@example.com",
                     "password": "your_password"
                 }, f, indent=4)
-            print(f"Please edit {CREDENTIALS_FILE} with your credentials and run again")
+            log.info(f"Please edit {CREDENTIALS_FILE} with your credentials and run again")
             return False
         return True
     
     def validate_credentials(self):
         """Validate that username and password are provided"""
         if not self.username or not self.password:
-            print("Error: username or password is empty in credentials.json")
+            log.error("Error: username or password is empty in credentials.json")
             return False
         return True
     
@@ -0,0 +1,303 @@
+"""
+Credentials store module - many login profiles in a JSON Lines file
+
+Each line of the profiles file holds one profile:
+
+    {"id": "main", "username": "me@example.com", "password": "..."}
+
+The store never holds the whole file in memory. On first use it streams the
+file once and keeps only an id -> byte offset index, so a lookup seeks to one
+line and parses it. The index is rebuilt when the file's mtime or size
+changes, which picks up edits without a restart. Per-profile metadata (last
+attempt and success, assumed session expiry) is appended to a JSON Lines
+journal beside it, one line per update, that a batch runner uses to pick what
+to log in next. The journal is rewritten with one line per profile once it
+has grown to ACCOUNT_META_COMPACT_LINES lines.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from config import ACCOUNT_SESSION_TTL, ACCOUNT_META_COMPACT_LINES
+from .logger import get_logger
+
+
+log = get_logger(__name__)
+
+
+# Metadata fields kept per profile
+META_FIELDS = (
+    'last_attempt',
+    'last_status',
+    'last_success',
+    'session_expiry',
+    'failures',
+    'rejected'
+)
+
+
+def credentials_fingerprint(profile):
+    """Short hash of a profile's username and password (never stored in clear)"""
+    secret = f"{profile.get('username', '')}\0{profile.get('password', '')}"
+    return hashlib.sha256(secret.encode('utf-8')).hexdigest()[:16]
+
+
+class CredentialStore:
+    """Lazily indexed JSON Lines profile file with per-profile metadata"""
+
+    def __init__(self, path, meta_file=None):
+        """
+        Initialize the store (nothing is read until first use)
+
+        Args:
+            path: JSON Lines file with one profile per line
+            meta_file: JSON Lines journal of per-profile metadata (defaults to <path>.meta.jsonl)
+        """
+        self.path = path
+        self.meta_file = meta_file or path + '.meta.jsonl'
+        self._index = None
+        self._signature = None
+        self._meta = None
+        self._journal_lines = 0
+        self._lock = threading.RLock()
+
+    def _file_signature(self):
+        """(mtime, size) of the profiles file, None if it is missing"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def refresh(self):
+        """
+        Rebuild the index if the profiles file changed since it was read
+
+        Returns:
+            True if the index was (re)built
+        """
+        with self._lock:
+            signature = self._file_signature()
+            if self._index is not None and signature == self._signature:
+                return False
+            self._index = self._build_index() if signature else {}
+            self._signature = signature
+            return True
+
+    def _build_index(self):
+        """Stream the file once, keeping only each profile's byte offset"""
+        index = {}
+        offset = 0
+        with open(self.path, 'rb') as f:
+            for number, line in enumerate(f, 1):
+                start = offset
+                offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    profile_id = self._profile_id(json.loads(line))
+                except (ValueError, AttributeError):
+                    log.warning(f"⚠️  Skipping unreadable profile on line {number} of {self.path}")
+                    continue
+                if profile_id is None:
+                    log.warning(f"⚠️  Skipping profile without id or username on line {number}")
+                    continue
+                if profile_id in index:
+                    log.warning(f"⚠️  Duplicate profile {profile_id} on line {number}, the last one wins")
+                index[profile_id] = start
+        log.info(f"[STORE] Indexed {len(index)} profiles from {self.path}")
+        return index
+
+    @staticmethod
+    def _profile_id(profile):
+        profile_id = profile.get('id') or profile.get('username')
+        return str(profile_id) if profile_id else None
+
+    def __len__(self):
+        self.refresh()
+        with self._lock:
+            return len(self._index)
+
+    def __contains__(self, profile_id):
+        self.refresh()
+        with self._lock:
+            return profile_id in self._index
+
+    def ids(self):
+        """Profile ids in file order"""
+        self.refresh()
+        with self._lock:
+            return list(self._index)
+
+    def get(self, profile_id):
+        """
+        Read one profile
+
+        Args:
+            profile_id: Profile id (the username when the line has no id)
+
+        Returns:
+            dict with id, username, password and any other fields of the line,
+            None if the profile does not exist
+        """
+        self.refresh()
+        with self._lock:
+            offset = self._index.get(profile_id)
+            if offset is None:
+                return None
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                profile = json.loads(f.readline())
+        profile['id'] = profile_id
+        return profile
+
+    def stream(self):
+        """
+        Iterate over every profile without loading the file into memory
+
+        Yields:
+            Profile dicts in file order
+        """
+        for profile_id in self.ids():
+            profile = self.get(profile_id)
+            if profile:
+                yield profile
+
+    def _load_meta(self):
+        """Metadata of every profile, replayed from the journal on first use"""
+        if self._meta is None:
+            self._meta = {}
+            self._journal_lines = 0
+            damaged = 0
+            try:
+                with open(self.meta_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        self._journal_lines += 1
+                        try:
+                            record = json.loads(line)
+                            self._apply_meta(record['id'], record['fields'])
+                        except (ValueError, KeyError, TypeError, AttributeError):
+                            damaged += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                log.warning(f"⚠️  Ignoring unreadable profile metadata: {e}")
+            if damaged:
+                # A torn last line would swallow the next append, so rewrite the journal
+                log.warning(f"⚠️  Skipped {damaged} damaged profile metadata lines")
+                self._compact_meta()
+        return self._meta
+
+    def _apply_meta(self, profile_id, fields):
+        """Merge fields into a profile's metadata; None removes a field"""
+        entry = self._meta.setdefault(profile_id, {})
+        for key, value in fields.items():
+            if value is None:
+                entry.pop(key, None)
+            else:
+                entry[key] = value
+
+    def _append_meta(self, profile_id, fields):
+        """Append one update to the journal, compacting it once it has grown"""
+        try:
+            with open(self.meta_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'id': profile_id, 'fields': fields}, sort_keys=True) + '\n')
+            self._journal_lines += 1
+        except OSError as e:
+            log.warning(f"⚠️  Could not save profile metadata: {e}")
+            return
+        if self._journal_lines >= max(ACCOUNT_META_COMPACT_LINES, 2 * len(self._meta)):
+            self._compact_meta()
+
+    def _compact_meta(self):
+        """Rewrite the journal atomically with one line per profile"""
+        try:
+            tmp_file = self.meta_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                for profile_id, entry in sorted(self._meta.items()):
+                    f.write(json.dumps({'id': profile_id, 'fields': entry}, sort_keys=True) + '\n')
+            os.replace(tmp_file, self.meta_file)
+            self._journal_lines = len(self._meta)
+        except OSError as e:
+            log.warning(f"⚠️  Could not compact profile metadata: {e}")
+
+    def meta(self, profile_id):
+        """Metadata of one profile (empty dict if none was recorded)"""
+        with self._lock:
+            return dict(self._load_meta().get(profile_id, {}))
+
+    def update_meta(self, profile_id, **fields):
+        """
+        Update metadata fields of one profile and append them to the journal
+
+        Args:
+            profile_id: Profile id
+            **fields: Any of META_FIELDS; None removes a field
+        """
+        unknown = set(fields) - set(META_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown profile metadata: {', '.join(sorted(unknown))}")
+        with self._lock:
+            self._load_meta()
+            self._apply_meta(profile_id, fields)
+            self._append_meta(profile_id, fields)
+
+    def record_result(self, profile_id, status, now=None, session_ttl=ACCOUNT_SESSION_TTL):
+        """
+        Record the outcome of a login attempt
+
+        Args:
+            profile_id: Profile id
+            status: Flow result status (success, session, bad_credentials, captcha, timeout, failed)
+            now: Unix time of the attempt (defaults to now)
+            session_ttl: Seconds a fresh session is assumed to stay valid
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            failures = self.meta(profile_id).get('failures', 0)
+            fields = {'last_attempt': now, 'last_status': status}
+            if status in ('success', 'session'):
+                fields.update(last_success=now, session_expiry=now + session_ttl,
+                              failures=0, rejected=None)
+            else:
+                fields['failures'] = failures + 1
+                if status == 'bad_credentials':
+                    # Skipped until the profile's credentials change
+                    profile = self.get(profile_id)
+                    fields['rejected'] = credentials_fingerprint(profile) if profile else None
+            self.update_meta(profile_id, **fields)
+
+    def due(self, limit=None, now=None):
+        """
+        Pick the profiles to log in next
+
+        Profiles whose assumed session is still valid are skipped, as are
+        profiles whose credentials were rejected and have not changed since.
+        Profiles that never logged in come first, then the ones whose session
+        expired longest ago; fewer past failures break ties.
+
+        Args:
+            limit: Maximum number of ids to return
+            now: Unix time to compare session expiries with (defaults to now)
+
+        Returns:
+            List of profile ids
+        """
+        now = time.time() if now is None else now
+        candidates = []
+        for order, profile_id in enumerate(self.ids()):
+            meta = self.meta(profile_id)
+            if meta.get('session_expiry', 0) > now:
+                continue
+            if meta.get('rejected'):
+                profile = self.get(profile_id)
+                if profile is None or credentials_fingerprint(profile) == meta['rejected']:
+                    continue
+            never = 'last_success' not in meta
+            candidates.append((not never, meta.get('session_expiry', 0), meta.get('failures', 0), order, profile_id))
+        candidates.sort()
+        ids = [candidate[-1] for candidate in candidates]
+        return ids if limit is None else ids[:limit]
@@ -0,0 +1,73 @@
+"""
+DOM scan module - single-pass scored search for login page elements
+"""
+from config import DOM_SCAN_EXIT_SCORE, DOM_SCAN_MIN_CLICK_SCORE
+from .page_bundle import call_helper
+from .logger import get_logger
+
+
+log = get_logger(__name__)
+
+
+# Targets scored by the scan
+SCAN_TARGETS = ['login', 'cookie', 'email', 'password']
+
+
+class DomScanner:
+    """Score login, cookie, email and password candidates in one pass over the DOM"""
+
+    def __init__(self, window):
+        """
+        Initialize the scanner
+
+        Args:
+            window: pywebview window object
+        """
+        self.window = window
+
+    def scan(self, targets=None, click=None, min_click_score=DOM_SCAN_MIN_CLICK_SCORE):
+        """
+        Run the scored scan
+
+        Args:
+            targets: List of targets to score (defaults to all)
+            click: Target to click if its best candidate scores high enough
+            min_click_score: Minimum score required before clicking
+
+        Returns:
+            dict with one {found, score, method, text} entry per target, plus
+            visited, elapsed and clicked; None if the script failed
+        """
+        options = {
+            'targets': targets or SCAN_TARGETS,
+            'click': click,
+            'exit_score': DOM_SCAN_EXIT_SCORE,
+            'min_click_score': min_click_score
+        }
+        try:
+            return call_helper(self.window, 'scan', options)
+        except Exception as e:
+            log.error(f"Error scanning page: {e}")
+            return None
+
+    def click_best(self, target, min_click_score=DOM_SCAN_MIN_CLICK_SCORE):
+        """
+        Find and click the best candidate for a target
+
+        Args:
+            target: Target name (login or cookie)
+            min_click_score: Minimum score required before clicking
+
+        Returns:
+            dict with method, score and found keys
+        """
+        result = self.scan([target], click=target, min_click_score=min_click_score)
+        if not result:
+            return {'method': 'error', 'score': 0, 'found': False}
+
+        match = result.get(target, {})
+        return {
+            'method': match.get('method', 'not_found'),
+            'score': match.get('score', 0),
+            'found': bool(result.get('clicked'))
+        }
@@ -0,0 +1,180 @@
+"""
+Element readiness module - waits for page elements with an injected MutationObserver
+"""
+import itertools
+from config import ELEMENT_READY_TIMEOUT, ELEMENT_READY_GRACE
+from .js_api import ELEMENT_APPEARED, FIELD_FILLED
+from .page_bundle import call_helper
+from .logger import get_logger
+
+
+log = get_logger(__name__)
+
+
+# Targets understood by the readiness script
+COOKIE_TARGET = 'cookie'
+EMAIL_TARGET = 'email'
+PASSWORD_TARGET = 'password'
+LOGIN_TARGET = 'login'
+CHAT_TARGET = 'chat'
+SEND_TARGET = 'send'
+
+
+class ElementWaiter:
+    """Wait for login page elements to appear (or disappear) without fixed sleeps"""
+
+    def __init__(self, window, event_bus, strategy_engine):
+        """
+        Initialize the waiter
+
+        Args:
+            window: pywebview window object
+            event_bus: EventBus receiving events pushed through the js_api bridge
+            strategy_engine: StrategyEngine supplying ranked locator methods
+        """
+        self.window = window
+        self.event_bus = event_bus
+        self.strategy_engine = strategy_engine
+        self._watch_ids = itertools.count(1)
+
+    def watch(self, targets, absent=False, event=ELEMENT_APPEARED, timeout=ELEMENT_READY_TIMEOUT):
+        """
+        Inject a readiness observer without waiting for it
+
+        The page pushes `event` through the bridge once the targets match
+        (found=True) or the deadline passes (found=False).
+
+        Args:
+            targets: List of target names to watch
+            absent: True to wait for the targets to disappear
+            event: Event name the page emits when the watch resolves
+            timeout: Page-side deadline in seconds
+
+        Returns:
+            Watch id carried in the event payload, None if injection failed
+        """
+        return self._inject(next(self._watch_ids), targets, absent, event, timeout)
+
+    def _inject(self, watch_id, targets, absent, event, timeout):
+        """Inject the readiness script for an already allocated watch id"""
+        spec = {
+            'watch_id': watch_id,
+            'targets': list(targets),
+            'methods': {
+                target: self.strategy_engine.ranked_methods(target) for target in targets
+            },
+            'absent': absent,
+            'event': event,
+            'timeout_ms': int(timeout * 1000)
+        }
+        try:
+            call_helper(self.window, 'ready', spec)
+        except Exception as e:
+            log.error(f"Error injecting readiness observer: {e}")
+            return None
+        return watch_id
+
+    def _run(self, targets, absent, timeout, event=ELEMENT_APPEARED):
+        """
+        Inject the readiness observer and block until the page reports back
+
+        Args:
+            targets: List of target names to watch
+            absent: True to wait for the targets to disappear
+            timeout: Page-side deadline in seconds
+            event: Event name the page emits when the watch resolves
+
+        Returns:
+            dict of targets that matched, empty dict on timeout
+        """
+        # Listen before injecting: the page may answer before evaluate_js returns
+        watch_id = next(self._watch_ids)
+        expectation = self.event_bus.expect(
+            event,
+            lambda payload: payload.get('watch_id') == watch_id
+        )
+        if self._inject(watch_id, targets, absent, event, timeout) is None:
+            expectation.cancel()
+            return {}
+
+        # A Bridge window carries the flow's cancel token
+        result = expectation.wait(timeout + ELEMENT_READY_GRACE, getattr(self.window, 'token', None))
+        if result is None:
+            log.debug(f"[WAIT] Readiness observer did not answer for {', '.join(targets)}")
+            return {}
+
+        if result.get('found'):
+            log.debug(f"[WAIT] Ready: {', '.join(result.get('targets', {}))} "
+                  f"after {result.get('elapsed', 0)} ms")
+            return result.get('targets', {})
+        return {}
+
+    def watch_fields(self):
+        """
+        Install input listeners that push 'field_filled' once per field
+
+        Returns:
+            True if the listeners were installed
+        """
+        try:
+            call_helper(self.window, 'fields', FIELD_FILLED)
+            return True
+        except Exception as e:
+            log.error(f"Error installing field watcher: {e}")
+            return False
+
+    def page_state(self, targets):
+        """
+        Read which targets are shown and which fields are filled in one call
+
+        Args:
+            targets: List of target names to check
+
+        Returns:
+            dict with 'shown' (target -> bool) and 'filled' (field -> bool)
+        """
+        return call_helper(self.window, 'state', {
+            'methods': {
+                target: self.strategy_engine.ranked_methods(target) for target in targets
+            }
+        })
+
+    def wait_for_any(self, targets, timeout=ELEMENT_READY_TIMEOUT):
+        """
+        Wait until at least one of the targets is shown on the page
+
+        Args:
+            targets: List of target names (cookie, email, password, login, chat)
+            timeout: Maximum time to wait in seconds
+
+        Returns:
+            dict of targets present when the wait resolved, empty on timeout
+        """
+        return self._run(targets, False, timeout)
+
+    def wait_for(self, target, timeout=ELEMENT_READY_TIMEOUT):
+        """
+        Wait until a single target is shown on the page
+
+        Args:
+            target: Target name (cookie, email, password, login, chat)
+            timeout: Maximum time to wait in seconds
+
+        Returns:
+            True if the target appeared, False on timeout
+        """
+        return bool(self._run([target], False, timeout))
+
+    def wait_for_gone(self, target, timeout=ELEMENT_READY_TIMEOUT, event=ELEMENT_APPEARED):
+        """
+        Wait until a target is no longer shown on the page
+
+        Args:
+            target: Target name (cookie, email, password, login, chat)
+            timeout: Maximum time to wait in seconds
+            event: Event name the page emits when the watch resolves
+
+        Returns:
+            True if the target disappeared, False on timeout
+        """
+        return bool(self._run([target], True, timeout, event))
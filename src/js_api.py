@@ -0,0 +1,175 @@
+"""
+JavaScript to Python bridge - lets injected page scripts push events to Python callbacks
+"""
+import threading
+from .clock import REAL_CLOCK
+from .logger import get_logger
+
+
+log = get_logger(__name__)
+
+
+# Events pushed by injected page scripts
+ELEMENT_APPEARED = 'element_appeared'
+FIELD_FILLED = 'field_filled'
+LOGIN_OUTCOME = 'login_outcome'
+BANNER_DISMISSED = 'banner_dismissed'
+PROMPT_CHUNK = 'prompt_chunk'
+PROMPT_DONE = 'prompt_done'
+
+
+class Expectation:
+    """A pending wait for a single event, registered before the trigger is injected"""
+
+    def __init__(self, event_bus, event, predicate=None):
+        """
+        Initialize the expectation
+
+        Args:
+            event_bus: EventBus to listen on
+            event: Event name to wait for
+            predicate: Optional function(payload) that must return True to match
+        """
+        self.event_bus = event_bus
+        self.event = event
+        self.predicate = predicate
+        self.payload = None
+        self._done = threading.Event()
+        self.event_bus.subscribe(event, self._on_event)
+
+    def _on_event(self, payload):
+        """Record the first matching payload"""
+        if self._done.is_set():
+            return
+        if self.predicate and not self.predicate(payload):
+            return
+        self.payload = payload
+        self._done.set()
+
+    def wait(self, timeout, token=None):
+        """
+        Block until the event arrives
+
+        Args:
+            timeout: Maximum time to wait in seconds
+            token: Optional CancelToken that ends the wait early
+
+        Returns:
+            The event payload, or None on timeout
+
+        Raises:
+            FlowCancelled: The token was cancelled during the wait
+        """
+        if token:
+            token.add_waiter(self._done)
+        try:
+            self.event_bus.clock.wait(self._done, timeout)
+            if self.payload is not None:
+                return self.payload
+            if token:
+                token.raise_if_cancelled()
+            return None
+        finally:
+            if token:
+                token.remove_waiter(self._done)
+            self.cancel()
+
+    def cancel(self):
+        """Stop listening for the event"""
+        self.event_bus.unsubscribe(self.event, self._on_event)
+
+
+class EventBus:
+    """Dispatch events pushed from the page to Python callbacks"""
+
+    def __init__(self, clock=None):
+        """
+        Initialize the bus
+
+        Args:
+            clock: Clock used by expectations to wait (real time by default)
+        """
+        self.clock = clock or REAL_CLOCK
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, event, callback):
+        """
+        Register a callback for an event
+
+        Args:
+            event: Event name
+            callback: Function receiving the event payload
+        """
+        with self._lock:
+            self._subscribers.setdefault(event, []).append(callback)
+
+    def unsubscribe(self, event, callback):
+        """
+        Remove a previously registered callback
+
+        Args:
+            event: Event name
+            callback: Callback passed to subscribe()
+        """
+        with self._lock:
+            callbacks = self._subscribers.get(event, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def publish(self, event, payload=None):
+        """
+        Deliver an event to every subscriber
+
+        Args:
+            event: Event name
+            payload: Event data (dict from the page)
+        """
+        with self._lock:
+            callbacks = list(self._subscribers.get(event, []))
+        for callback in callbacks:
+            try:
+                callback(payload)
+            except Exception as e:
+                log.error(f"Error in {event} callback: {e}")
+
+    def expect(self, event, predicate=None):
+        """
+        Start listening for an event before triggering it
+
+        Args:
+            event: Event name
+            predicate: Optional function(payload) that must return True to match
+
+        Returns:
+            Expectation whose wait() returns the payload
+        """
+        return Expectation(self, event, predicate)
+
+
+class JsApi:
+    """
+    Object exposed to the page as window.pywebview.api
+
+    Only public methods are visible to JavaScript, so the bus is kept private.
+    """
+
+    def __init__(self, event_bus):
+        """
+        Initialize the API
+
+        Args:
+            event_bus: EventBus that receives the pushed events
+        """
+        self._event_bus = event_bus
+
+    def emit(self, event, payload=None):
+        """
+        Called from JavaScript to push an event to Python
+
+        Args:
+            event: Event name
+            payload: Event data
+        """
+        self._event_bus.publish(event, payload or {})
+        return True
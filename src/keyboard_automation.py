@@ -2,19 +2,111 @@
 Keyboard automation module for typing credentials
 """
 import keyboard
-import time
 from config import (
-    INITIAL_DELAY,
     FIELD_FOCUS_DELAY,
     TYPING_DELAY
 )
+from .clock import REAL_CLOCK
+from .page_bundle import call_helper
+from .selector_strategy import TARGET_SELECTORS, compile_selector
+from .timing import get_tracer, FIELD_FOCUS, TYPING
+from .logger import get_logger
+
+
+log = get_logger(__name__)
 
 
 class KeyboardAutomation:
     """Handle keyboard input automation"""
     
-    @staticmethod
-    def type_text(text, delay=0.1):
+    def __init__(self, strategy_engine=None, clock=None):
+        """
+        Initialize keyboard automation
+        
+        Args:
+            strategy_engine: Optional StrategyEngine used to locate and focus fields
+            clock: Clock used for typing and focus delays (real time by default)
+        """
+        self.strategy_engine = strategy_engine
+        self.clock = clock or REAL_CLOCK
+    
+    def field_methods(self, target):
+        """
+        Locator methods for a field, ranked when a strategy engine is set
+        
+        Args:
+            target: Target name ('email' or 'password')
+            
+        Returns:
+            List of compiled methods
+        """
+        if self.strategy_engine:
+            return self.strategy_engine.ranked_methods(target)
+        return [compile_selector(selector) for selector in TARGET_SELECTORS[target]]
+    
+    def focus_field(self, window, target):
+        """
+        Focus a form field, preferring the ranked strategy probe
+        
+        Args:
+            window: pywebview window object
+            target: Target name ('email' or 'password')
+        """
+        with get_tracer().span(FIELD_FOCUS, field=target) as span:
+            if self.strategy_engine:
+                result = self.strategy_engine.locate(target, 'focus', window)
+            else:
+                result = call_helper(
+                    window, 'probe', {'methods': self.field_methods(target), 'action': 'focus'}
+                ) or {}
+            span.set(method=result.get('method', 'unknown'))
+            span.ok = bool(result.get('found'))
+    
+    def inject_credentials(self, window, email, password):
+        """
+        Set both field values directly and verify them in a single call
+        
+        Uses the native input value setter and dispatches input/change
+        events, so no OS key events or window focus are needed.
+        
+        Args:
+            window: pywebview window object
+            email: Email address
+            password: Password
+            
+        Returns:
+            dict with emailFilled, passwordFilled and bothFilled
+        """
+        spec = {
+            'email_methods': self.field_methods('email'),
+            'password_methods': self.field_methods('password'),
+            'email': email,
+            'password': password
+        }
+        try:
+            log.info("Injecting credentials...")
+            return call_helper(window, 'inject', spec) or {}
+        except Exception as e:
+            log.error(f"Error injecting credentials: {e}")
+            return {'emailFilled': False, 'passwordFilled': False, 'bothFilled': False}
+    
+    def check_credentials(self, window):
+        """
+        Check whether the email and password fields hold a value
+        
+        Args:
+            window: pywebview window object
+            
+        Returns:
+            dict with emailFilled, passwordFilled and bothFilled
+        """
+        spec = {
+            'email_methods': self.field_methods('email'),
+            'password_methods': self.field_methods('password')
+        }
+        return call_helper(window, 'check', spec) or {}
+    
+    def type_text(self, text, delay=0.1):
         """
         Type text using keyboard module
         
@@ -23,15 +115,15 @@ class KeyboardAutomation:
             delay: Delay between characters
         """
         try:
-            keyboard.write(text)
-            time.sleep(TYPING_DELAY)
+            with get_tracer().span(TYPING, method='keyboard'):
+                keyboard.write(text)
+                self.clock.sleep(TYPING_DELAY)
         except Exception as e:
-            print(f"Error typing text: {e}")
+            log.error(f"Error typing text: {e}")
             return False
         return True
     
-    @staticmethod
-    def press_key(key):
+    def press_key(self, key):
         """
         Press a specific key
         
@@ -40,14 +132,13 @@ class KeyboardAutomation:
         """
         try:
             keyboard.press(key)
-            time.sleep(0.1)
+            self.clock.sleep(0.1)
         except Exception as e:
-            print(f"Error pressing key {key}: {e}")
+            log.error(f"Error pressing key {key}: {e}")
             return False
         return True
     
-    @staticmethod
-    def type_email(window, email):
+    def type_email(self, window, email):
         """
         Focus email field and type email
         
@@ -55,36 +146,19 @@ class KeyboardAutomation:
             window: pywebview window object
             email: Email address to type
         """
-        print("Focusing email field...")
-        focus_js = """
-        function focusEmailField() {
-            const emailInput = document.querySelector('input[type="text"]') || 
-                             document.querySelector('input[type="email"]') ||
-                             document.querySelector('input[placeholder*="email"]') ||
-                             document.evaluate('/html/body/div[1]/div/div[1]/div[2]/div/div/div[2]/div/div[2]/div[1]/div/input', document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
-            if (emailInput) {
-                emailInput.focus();
-                emailInput.select();
-                return true;
-            }
-            return false;
-        }
-        focusEmailField();
-        """
-        
+        log.info("Focusing email field...")
         try:
-            window.evaluate_js(focus_js)
-            time.sleep(FIELD_FOCUS_DELAY)
+            self.focus_field(window, 'email')
+            self.clock.sleep(FIELD_FOCUS_DELAY)
             
-            print(f"Typing email: {email}")
-            KeyboardAutomation.type_text(email)
+            log.info(f"Typing email: {email}")
+            self.type_text(email)
             return True
         except Exception as e:
-            print(f"Error typing email: {e}")
+            log.error(f"Error typing email: {e}")
             return False
     
-    @staticmethod
-    def type_password(window, password):
+    def type_password(self, window, password):
         """
         Focus password field and type password
         
@@ -92,28 +166,14 @@ class KeyboardAutomation:
             window: pywebview window object
             password: Password to type
         """
-        print("Focusing password field...")
-        focus_password_js = """
-        function focusPasswordField() {
-            const passwordInput = document.querySelector('input[type="password"]') ||
-                                document.evaluate('/html/body/div[1]/div/div[1]/div[2]/div/div/div[2]/div/div[3]/div[1]/div/input', document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
-            if (passwordInput) {
-                passwordInput.focus();
-                passwordInput.select();
-                return true;
-            }
-            return false;
-        }
-        focusPasswordField();
-        """
-        
+        log.info("Focusing password field...")
         try:
-            window.evaluate_js(focus_password_js)
-            time.sleep(FIELD_FOCUS_DELAY)
+            self.focus_field(window, 'password')
+            self.clock.sleep(FIELD_FOCUS_DELAY)
             
-            print("Typing password...")
-            KeyboardAutomation.type_text(password)
+            log.info("Typing password...")
+            self.type_text(password)
             return True
         except Exception as e:
-            print(f"Error typing password: {e}")
+            log.error(f"Error typing password: {e}")
             return False
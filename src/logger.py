@@ -0,0 +1,269 @@
+"""
+Logging module - buffered, asynchronous, structured logging for the whole application
+
+Callers only enqueue records; a background thread writes them in batches to a
+size-rotated JSON lines file and echoes console-level records to stdout.
+"""
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from config import (
+    LOG_FILE,
+    LOG_MAX_BYTES,
+    LOG_BACKUP_COUNT,
+    LOG_QUEUE_SIZE,
+    LOG_BATCH_SIZE,
+    LOG_FLUSH_INTERVAL
+)
+
+
+DEBUG = 'debug'
+INFO = 'info'
+WARNING = 'warning'
+ERROR = 'error'
+
+# Levels echoed to the console; debug records only go to the log file
+CONSOLE_LEVELS = (INFO, WARNING, ERROR)
+
+
+class LogWriter:
+    """Background writer with a bounded queue, batched flushes and size-based rotation"""
+
+    def __init__(self, path=LOG_FILE, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT,
+                 queue_size=LOG_QUEUE_SIZE, batch_size=LOG_BATCH_SIZE,
+                 flush_interval=LOG_FLUSH_INTERVAL):
+        """
+        Initialize and start the writer thread
+
+        Args:
+            path: Log file path
+            max_bytes: Rotate once the file would grow past this size
+            backup_count: Number of rotated files to keep (path.1 ... path.N)
+            queue_size: Maximum queued records; extra records are dropped
+            batch_size: Maximum records written per flush
+            flush_interval: Maximum seconds a record waits before being written
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.console_levels = CONSOLE_LEVELS
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._file_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, record):
+        """
+        Enqueue a record without blocking the caller
+
+        Args:
+            record: dict with ts, level, source and msg
+        """
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout=2.0):
+        """
+        Wait until every queued record has been written
+
+        Args:
+            timeout: Maximum seconds to wait
+        """
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def redirect(self, path):
+        """
+        Write records not yet written to another file (e.g. a benchmark's work directory)
+
+        Args:
+            path: New log file path
+        """
+        with self._file_lock:
+            self._close()
+            self.path = path
+
+    def _run(self):
+        """Drain the queue in batches until the process exits"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch):
+        """Write one batch to the console and the log file"""
+        markers = [item for item in batch if isinstance(item, threading.Event)]
+        records = [item for item in batch if not isinstance(item, threading.Event)]
+
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            records.append(_record(WARNING, 'logger', f"Dropped {dropped} log records (queue full)"))
+
+        try:
+            console = [r['msg'] for r in records if r['level'] in self.console_levels]
+            if console:
+                sys.stdout.write('\n'.join(console) + '\n')
+                sys.stdout.flush()
+        except Exception:
+            pass
+
+        try:
+            data = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records)
+            if data:
+                with self._file_lock:
+                    self._rotate_if_needed(len(data.encode('utf-8')))
+                    self._open().write(data)
+                    self._file.flush()
+        except Exception:
+            # Logging must never take the application down
+            with self._file_lock:
+                self._close()
+
+        for marker in markers:
+            marker.set()
+
+    def _open(self):
+        """Open the log file lazily"""
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        return self._file
+
+    def _close(self):
+        """Close the log file, ignoring errors"""
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
+
+    def _rotate_if_needed(self, incoming):
+        """Rotate path -> path.1 -> ... -> path.N when the next write would exceed max_bytes"""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size + incoming <= self.max_bytes:
+            return
+
+        self._close()
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+def _record(level, source, message):
+    """Build a structured log record"""
+    return {
+        'ts': round(time.time(), 3),
+        'level': level,
+        'source': source,
+        'thread': threading.current_thread().name,
+        'msg': message
+    }
+
+
+class Logger:
+    """Per-module front end that enqueues records on the shared writer"""
+
+    def __init__(self, source):
+        """
+        Initialize the logger
+
+        Args:
+            source: Name recorded with each message (usually the module name)
+        """
+        self.source = source
+
+    def log(self, level, message, exc_info=False, **fields):
+        """
+        Enqueue a message
+
+        Args:
+            level: debug, info, warning or error
+            message: Message text
+            exc_info: Append the current exception traceback
+            **fields: Extra structured fields stored with the record
+        """
+        record = _record(level, self.source, str(message))
+        if exc_info:
+            record['traceback'] = traceback.format_exc()
+        if fields:
+            record.update(fields)
+        get_writer().submit(record)
+
+    def debug(self, message, **fields):
+        """Log to the file only"""
+        self.log(DEBUG, message, **fields)
+
+    def info(self, message, **fields):
+        """Log to the file and the console"""
+        self.log(INFO, message, **fields)
+
+    def warning(self, message, **fields):
+        """Log a warning to the file and the console"""
+        self.log(WARNING, message, **fields)
+
+    def error(self, message, exc_info=False, **fields):
+        """Log an error to the file and the console"""
+        self.log(ERROR, message, exc_info=exc_info, **fields)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Get the process-wide log writer, starting it on first use"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = LogWriter()
+            atexit.register(_writer.flush)
+        return _writer
+
+
+def get_logger(source):
+    """
+    Get a logger for a module
+
+    Args:
+        source: Name recorded with each message
+
+    Returns:
+        Logger
+    """
+    return Logger(source)
+
+
+def flush():
+    """Block until all queued records are written"""
+    get_writer().flush()
@@ -1,115 +1,69 @@
 """
 Login button detection module for finding and clicking the login button
 """
-import time
-import threading
-import mouse
-from config import (
-    LOGIN_BUTTON_SEARCH_TIMEOUT,
-    LOGIN_BUTTON_DETECTION_INTERVAL
-)
+from config import LOGIN_BUTTON_SEARCH_TIMEOUT
+from .clock import REAL_CLOCK
+from .dom_scan import DomScanner
+from .element_waiter import ElementWaiter, LOGIN_TARGET
+from .timing import get_tracer, BUTTON_DETECTION, CLICK
+from .logger import get_logger
+
+
+log = get_logger(__name__)
 
 
 class LoginButtonDetector:
     """Detect and click the login button on the screen"""
     
-    def __init__(self, window):
+    def __init__(self, window, event_bus, strategy_engine, clock=None):
         """
         Initialize the detector
         
         Args:
             window: pywebview window object
+            event_bus: EventBus receiving events pushed by page scripts
+            strategy_engine: StrategyEngine ranking the config login selectors
+            clock: Clock used for delays (real time by default)
         """
         self.window = window
+        self.clock = clock or REAL_CLOCK
+        self.strategy_engine = strategy_engine
+        self.element_waiter = ElementWaiter(window, event_bus, strategy_engine)
+        self.dom_scanner = DomScanner(window)
         self.login_button_found = False
         self.login_button_coords = None
+        self.clicked_method = None
+        self.clicked_at = None
     
     def detect_button_position(self):
         """
-        Detect the login button position using XPath with fallbacks
+        Detect and click the login button
+        
+        Tries the ranked config selectors first and falls back to the
+        single scored DOM scan when none of them match.
         
         Returns:
-            dict with x, y, width, height if found, None otherwise
+            True if the button was found and clicked, False otherwise
         """
-        detect_js = """
-        (function() {
-            try {
-                console.log('=== LOGIN BUTTON DETECTION DEBUG ===');
-                
-                // Method 1: Direct XPath and click
-                var element = document.evaluate('/html/body/div[1]/div/div[1]/div[2]/div/div/div[2]/div/div[5]', document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
-                if (element) {
-                    element.click();
-                    console.log('[OK] Method 1 (XPath) - Element clicked successfully');
-                    return {method: 'xpath', found: true};
-                }
-                console.log('[FAIL] Method 1 (XPath) - Element not found');
-                
-                // Method 2: CSS - div.ds-button
-                var btn2 = document.querySelector('div.ds-button');
-                if (btn2) {
-                    btn2.click();
-                    console.log('[OK] Method 2 (CSS div.ds-button) - clicked');
-                    return {method: 'css_selector', found: true};
-                }
-                console.log('[FAIL] Method 2 - not found');
-                
-                // Method 3: Register button class
-                var btn3 = document.querySelector('.ds-sign-up-form__register-button');
-                if (btn3) {
-                    btn3.click();
-                    console.log('[OK] Method 3 (register-button class) - clicked');
-                    return {method: 'css_class', found: true};
-                }
-                console.log('[FAIL] Method 3 - not found');
-                
-                // Method 4: Search by text "Log in"
-                var allElements = document.querySelectorAll('*');
-                for (var i = 0; i < allElements.length; i++) {
-                    var text = allElements[i].textContent.toLowerCase().trim();
-                    if (text === 'log in') {
-                        allElements[i].click();
-                        console.log('[OK] Method 4 (exact text) - clicked');
-                        return {method: 'text_exact', found: true};
-                    }
-                }
-                console.log('[FAIL] Method 4 - not found');
-                
-                // Method 5: Keywords search
-                for (var i = 0; i < allElements.length; i++) {
-                    var text = allElements[i].textContent.toLowerCase();
-                    if ((text.includes('log') || text.includes('sign') || text.includes('login')) && text.length < 50) {
-                        allElements[i].click();
-                        console.log('[OK] Method 5 (keyword) - clicked');
-                        return {method: 'keyword', found: true};
-                    }
-                }
-                console.log('[FAIL] Method 5 - not found');
-                
-                console.log('[WARN] No login button found with any method');
-                return {method: 'not_found', found: false};
-                
-            } catch (e) {
-                console.error('Error:', e.message);
-                return {method: 'error', found: false, error: e.message};
-            }
-        })();
-        """
-        
         try:
-            result = self.window.evaluate_js(detect_js)
+            with get_tracer().span(CLICK) as span:
+                result = self.strategy_engine.locate(LOGIN_TARGET, 'click', self.window)
+                if not result.get('found'):
+                    result = self.dom_scanner.click_best(LOGIN_TARGET)
+                span.set(method=result.get('method', 'unknown'))
+                span.ok = bool(result.get('found'))
             if result and result.get('found'):
-                print(f"[SUCCESS] Login button found and clicked!")
-                print(f"   Method: {result.get('method', 'unknown')}")
+                log.info(f"[SUCCESS] Login button found and clicked!")
+                log.info(f"   Method: {result.get('method', 'unknown')}")
                 self.login_button_found = True
+                self.clicked_method = result.get('method', 'unknown')
+                self.clicked_at = self.clock.now()
                 return True
             else:
-                print("[ERROR] Login button not found")
+                log.error("[ERROR] Login button not found")
                 return False
         except Exception as e:
-            print(f"Error detecting button: {e}")
-            import traceback
-            traceback.print_exc()
+            log.error(f"Error detecting button: {e}", exc_info=True)
             return False
     
     def get_button_coordinates(self):
@@ -125,7 +79,9 @@ class LoginButtonDetector:
     def wait_for_button(self, timeout=LOGIN_BUTTON_SEARCH_TIMEOUT):
         """
         Wait for login button to appear and click it
-        DEPRECATED: Now clicking directly in JavaScript
+        
+        The page pushes an event when the button is rendered, so the
+        detection script runs once instead of on every poll interval.
         
         Args:
             timeout: Maximum time to wait in seconds
@@ -133,14 +89,15 @@ class LoginButtonDetector:
         Returns:
             True if found and clicked, False if timeout
         """
-        start_time = time.time()
+        with get_tracer().span(BUTTON_DETECTION) as span:
+            ready = self.element_waiter.wait_for(LOGIN_TARGET, timeout)
+            span.ok = ready
         
-        while time.time() - start_time < timeout:
-            if self.detect_button_position():
-                return True
-            time.sleep(LOGIN_BUTTON_DETECTION_INTERVAL)
+        # Without the ready event the markup may have changed; the scored scan still gets one try
+        if self.detect_button_position():
+            return True
         
-        print(f"⏱️  Timeout: Login button not found within {timeout} seconds")
+        log.warning(f"⏱️  Timeout: Login button not found within {timeout} seconds")
         return False
     
     def click_login_button(self):
@@ -154,34 +111,29 @@ class LoginButtonDetector:
     
     def auto_click_after_credentials(self, credentials_callback):
         """
-        Automatically click login button after credentials are entered
+        Click the login button once the credentials are validated
         
         Args:
             credentials_callback: Function that validates if credentials are entered
             
         Returns:
-            True if login was successful, False otherwise
+            True if the button was clicked, False otherwise; the outcome of
+            the click is confirmed separately (see LoginConfirmation)
         """
         try:
-            # Wait for button to appear
-            button_coords = self.wait_for_button()
-            if not button_coords:
-                print("Could not find login button")
-                return False
-            
-            # Validate credentials are entered
+            # Validate credentials before anything is clicked
             if not credentials_callback():
-                print("[ERROR] Credentials not properly entered")
+                log.error("[ERROR] Credentials not properly entered")
                 return False
             
-            print("[SUCCESS] Credentials validated, attempting to click login button...")
-            
-            # Wait a moment before clicking
-            time.sleep(0.5)
+            log.info("[SUCCESS] Credentials validated, attempting to click login button...")
             
-            # Click the button
-            return self.click_login_button()
+            # Waits for the button to render, then clicks it exactly once
+            if not self.wait_for_button():
+                log.error("Could not find login button")
+                return False
+            return True
             
         except Exception as e:
-            print(f"Error in auto_click_after_credentials: {e}")
+            log.error(f"Error in auto_click_after_credentials: {e}")
             return False
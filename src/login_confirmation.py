@@ -0,0 +1,134 @@
+"""
+Login confirmation module - typed outcome of the login click
+
+After the click an observer in the page watches for the authenticated state
+(chat input shown, or the URL leaving the login pages), an error toast or a
+captcha, and reports the first one through the bridge. A click on the wrong
+element therefore surfaces as a timeout right after the confirmation window
+instead of going unnoticed.
+"""
+import itertools
+from config import (
+    LOGIN_CONFIRM_TIMEOUT,
+    ELEMENT_READY_GRACE,
+    LOGIN_URL_KEYWORDS,
+    LOGIN_ERROR_SELECTORS,
+    LOGIN_ERROR_PATTERNS,
+    CAPTCHA_SELECTORS
+)
+from .clock import REAL_CLOCK
+from .element_waiter import PASSWORD_TARGET, CHAT_TARGET
+from .js_api import LOGIN_OUTCOME
+from .page_bundle import call_helper
+from .logger import get_logger
+
+
+log = get_logger(__name__)
+
+
+# Login outcomes
+SUCCESS = 'success'
+BAD_CREDENTIALS = 'bad_credentials'
+CAPTCHA = 'captcha'
+TIMEOUT = 'timeout'
+
+
+class LoginOutcome:
+    """Result of one login click"""
+
+    def __init__(self, outcome, elapsed, detail='', method=None, url=None):
+        """
+        Initialize the outcome
+
+        Args:
+            outcome: SUCCESS, BAD_CREDENTIALS, CAPTCHA or TIMEOUT
+            elapsed: Seconds from the click to the outcome (time to authenticated on success)
+            detail: What decided the outcome (chat/url, error text, captcha element)
+            method: Locator method that performed the click
+            url: Page URL when the outcome was reported
+        """
+        self.outcome = outcome
+        self.elapsed = elapsed
+        self.detail = detail
+        self.method = method
+        self.url = url
+
+    @property
+    def ok(self):
+        """True if the login went through"""
+        return self.outcome == SUCCESS
+
+    def __repr__(self):
+        return f"LoginOutcome({self.outcome!r}, {self.elapsed:.3f}s, {self.detail!r})"
+
+
+class LoginConfirmation:
+    """Watch the page after the login click and classify what happened"""
+
+    def __init__(self, window, event_bus, strategy_engine, clock=None):
+        """
+        Initialize the confirmation
+
+        Args:
+            window: pywebview window object
+            event_bus: EventBus receiving events pushed through the js_api bridge
+            strategy_engine: StrategyEngine supplying ranked locator methods
+            clock: Clock measuring the time to authenticated (real time by default)
+        """
+        self.window = window
+        self.event_bus = event_bus
+        self.strategy_engine = strategy_engine
+        self.clock = clock or REAL_CLOCK
+        self._watch_ids = itertools.count(1)
+
+    def wait(self, clicked_at, method=None, timeout=LOGIN_CONFIRM_TIMEOUT):
+        """
+        Block until the page reports the outcome of the click
+
+        Args:
+            clicked_at: Clock time the login click was dispatched
+            method: Locator method that performed the click
+            timeout: Maximum seconds from the click to an outcome
+
+        Returns:
+            LoginOutcome
+
+        Raises:
+            FlowCancelled: The flow was cancelled (e.g. the page navigated)
+        """
+        remaining = max(0.0, clicked_at + timeout - self.clock.now())
+        watch_id = next(self._watch_ids)
+        spec = {
+            'watch_id': watch_id,
+            'event': LOGIN_OUTCOME,
+            'timeout_ms': int(remaining * 1000),
+            'methods': {
+                target: self.strategy_engine.ranked_methods(target)
+                for target in (PASSWORD_TARGET, CHAT_TARGET)
+            },
+            'login_paths': LOGIN_URL_KEYWORDS,
+            'error_selectors': LOGIN_ERROR_SELECTORS,
+            'error_patterns': [pattern.lower() for pattern in LOGIN_ERROR_PATTERNS],
+            'captcha_selectors': CAPTCHA_SELECTORS
+        }
+
+        # Listen before injecting: the page may answer before evaluate_js returns
+        expectation = self.event_bus.expect(
+            LOGIN_OUTCOME,
+            lambda payload: payload.get('watch_id') == watch_id
+        )
+        try:
+            call_helper(self.window, 'confirm', spec)
+        except Exception as e:
+            expectation.cancel()
+            log.error(f"Error injecting login confirmation: {e}")
+            return LoginOutcome(TIMEOUT, self.clock.now() - clicked_at, 'not injected', method)
+
+        # A Bridge window carries the flow's cancel token
+        payload = expectation.wait(remaining + ELEMENT_READY_GRACE, getattr(self.window, 'token', None))
+        elapsed = self.clock.now() - clicked_at
+        if payload is None:
+            return LoginOutcome(TIMEOUT, elapsed, 'no answer', method)
+        return LoginOutcome(
+            payload.get('outcome', TIMEOUT), elapsed, payload.get('detail', ''), method, payload.get('url')
+        )
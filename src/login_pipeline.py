@@ -0,0 +1,282 @@
+"""
+Login pipeline module - login steps scheduled by dependency, with checkpoints and per-step retry
+
+Each step establishes one checkpoint and declares the checkpoints it really
+depends on. Steps whose dependencies are met run concurrently, so the flow
+takes as long as its longest dependency chain rather than the sum of all
+steps. When a step fails, it backs off, re-checks every checkpoint reached so
+far with a single page-state probe, and the flow resumes from the checkpoints
+that no longer hold instead of restarting.
+"""
+import threading
+from config import STEP_MAX_ATTEMPTS, STEP_BACKOFF_BASE, STEP_BACKOFF_MAX
+from .bridge import FlowCancelled
+from .element_waiter import COOKIE_TARGET, EMAIL_TARGET, PASSWORD_TARGET, CHAT_TARGET
+from .logger import get_logger
+
+
+log = get_logger(__name__)
+
+
+# Checkpoints, in flow order
+COOKIE_DISMISSED = 'cookie_dismissed'
+EMAIL_FILLED = 'email_filled'
+PASSWORD_FILLED = 'password_filled'
+BUTTON_CLICKED = 'button_clicked'
+AUTHENTICATED = 'authenticated'
+
+# Targets read by the checkpoint probe
+PROBE_TARGETS = [COOKIE_TARGET, EMAIL_TARGET, PASSWORD_TARGET, CHAT_TARGET]
+
+
+def _shown(state, target):
+    return bool(state.get('shown', {}).get(target))
+
+
+def _filled(state, field):
+    return bool(state.get('filled', {}).get(field))
+
+
+# Whether a reached checkpoint still holds, judged from one page-state probe.
+# Once the chat is shown the form is gone, so the field checkpoints count as held.
+CHECKPOINT_HOLDS = {
+    COOKIE_DISMISSED: lambda state: not _shown(state, COOKIE_TARGET),
+    EMAIL_FILLED: lambda state: _filled(state, EMAIL_TARGET) or _shown(state, CHAT_TARGET),
+    PASSWORD_FILLED: lambda state: _filled(state, PASSWORD_TARGET) or _shown(state, CHAT_TARGET),
+    BUTTON_CLICKED: lambda state: _shown(state, CHAT_TARGET) or not _shown(state, PASSWORD_TARGET),
+    AUTHENTICATED: lambda state: _shown(state, CHAT_TARGET) and not _shown(state, PASSWORD_TARGET)
+}
+
+
+class Step:
+    """One pipeline step, the checkpoint it establishes and the checkpoints it needs"""
+
+    def __init__(self, checkpoint, run, after=(), required=True):
+        """
+        Initialize the step
+
+        Args:
+            checkpoint: Checkpoint name reached when run() succeeds
+            run: Function returning True on success
+            after: Checkpoints that must be reached (or skipped) before the step runs
+            required: False to continue the flow when the step runs out of attempts
+        """
+        self.checkpoint = checkpoint
+        self.run = run
+        self.after = tuple(after)
+        self.required = required
+        self.holds = CHECKPOINT_HOLDS.get(checkpoint)
+
+
+class LoginPipeline:
+    """Run steps as their dependencies are met, recording checkpoints and retrying only what failed"""
+
+    def __init__(self, steps, probe, clock, token, max_attempts=STEP_MAX_ATTEMPTS,
+                 backoff_base=STEP_BACKOFF_BASE, backoff_max=STEP_BACKOFF_MAX):
+        """
+        Initialize the pipeline
+
+        Args:
+            steps: List of Step in flow order
+            probe: Function returning the page state ({'shown', 'filled'})
+            clock: Clock used to start steps, back off and time checkpoints
+            token: CancelToken of the flow
+            max_attempts: Attempts per step before the pipeline gives up
+            backoff_base: Delay before the first retry in seconds
+            backoff_max: Upper bound for the retry delay in seconds
+        """
+        self.steps = steps
+        self.probe = probe
+        self.clock = clock
+        self.token = token
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.checkpoints = {}
+        self.failures = {}
+        self.skipped = set()
+        self.running = set()
+        self.started = None
+        self.stopped = None
+        self._lock = threading.RLock()
+        self._changed = threading.Event()
+
+    def mark(self, checkpoint):
+        """
+        Record a checkpoint as reached
+
+        Steps may mark later checkpoints they establish as a side effect
+        (e.g. one injection filling both fields).
+
+        Args:
+            checkpoint: Checkpoint name
+        """
+        with self._lock:
+            if checkpoint in self.checkpoints:
+                return
+            started = self.clock.now() if self.started is None else self.started
+            elapsed = self.clock.now() - started
+            self.checkpoints[checkpoint] = elapsed
+        log.info(f"[CHECKPOINT] {checkpoint} after {elapsed * 1000:.0f} ms")
+
+    def abort(self, reason):
+        """
+        Stop the flow without further retries (e.g. the credentials were rejected)
+
+        Args:
+            reason: Why the flow cannot succeed
+        """
+        log.error(f"[STEP] Login flow stopped: {reason}")
+        self.stopped = reason
+
+    def reached(self, checkpoint):
+        """Check if a checkpoint was recorded"""
+        return checkpoint in self.checkpoints
+
+    def _settled(self, checkpoint):
+        """Reached, or given up on by an optional step"""
+        return checkpoint in self.checkpoints or checkpoint in self.skipped
+
+    def ready(self):
+        """Steps not reached, skipped or running whose dependencies are settled"""
+        with self._lock:
+            return [
+                step for step in self.steps
+                if not self._settled(step.checkpoint) and step.checkpoint not in self.running
+                and all(self._settled(dependency) for dependency in step.after)
+            ]
+
+    def dependents(self, checkpoint):
+        """Checkpoints that depend on `checkpoint`, directly or transitively"""
+        found = set()
+        pending = [checkpoint]
+        while pending:
+            current = pending.pop()
+            for step in self.steps:
+                if current in step.after and step.checkpoint not in found:
+                    found.add(step.checkpoint)
+                    pending.append(step.checkpoint)
+        return found
+
+    def backoff(self, attempt):
+        """Delay before retry number `attempt` (1-based), doubling up to backoff_max"""
+        return min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+
+    def recheck(self, failed):
+        """
+        Re-validate every recorded checkpoint with one page-state probe
+
+        Checkpoints that no longer hold are dropped together with the
+        checkpoints depending on them, so the pipeline resumes from there.
+        If the page shows the failed step's own checkpoint as reached (e.g.
+        the click went through although the step reported a failure), it is
+        marked instead of being run again.
+
+        Args:
+            failed: Step that just failed
+        """
+        try:
+            state = self.probe()
+        except FlowCancelled:
+            raise
+        except Exception as e:
+            log.warning(f"⚠️  Checkpoint probe failed, keeping checkpoints: {e}")
+            return
+        if not state:
+            return
+
+        with self._lock:
+            invalid = set()
+            for step in self.steps:
+                if (self.reached(step.checkpoint) and step.checkpoint not in invalid
+                        and step.holds and not step.holds(state)):
+                    log.info(f"[CHECKPOINT] {step.checkpoint} no longer holds, resuming there")
+                    invalid.add(step.checkpoint)
+                    invalid |= self.dependents(step.checkpoint)
+            for checkpoint in invalid:
+                self.checkpoints.pop(checkpoint, None)
+
+            if (not self._settled(failed.checkpoint) and failed.holds and failed.holds(state)
+                    and all(self.reached(dependency) for dependency in failed.after)):
+                log.info(f"[CHECKPOINT] {failed.checkpoint} already holds on the page")
+                self.mark(failed.checkpoint)
+
+    def _attempt(self, step):
+        """Run one attempt of a step, backing off and re-checking after a failure"""
+        try:
+            try:
+                ok = step.run()
+            except FlowCancelled:
+                raise
+            except Exception as e:
+                log.error(f"[STEP] {step.checkpoint} raised: {e}")
+                ok = False
+
+            if ok:
+                self.mark(step.checkpoint)
+                return
+
+            if self.stopped:
+                return
+            with self._lock:
+                failures = self.failures.get(step.checkpoint, 0) + 1
+                self.failures[step.checkpoint] = failures
+            if failures >= self.max_attempts:
+                if step.required:
+                    log.error(f"[STEP] {step.checkpoint} failed after {failures} attempts, giving up")
+                    self.stopped = step.checkpoint
+                else:
+                    log.warning(f"⚠️  {step.checkpoint} failed after {failures} attempts, continuing anyway")
+                    with self._lock:
+                        self.skipped.add(step.checkpoint)
+                return
+
+            delay = self.backoff(failures)
+            log.warning(f"⚠️  {step.checkpoint} failed (attempt {failures}/{self.max_attempts}), "
+                        f"retrying in {delay:g}s")
+            self.token.sleep(self.clock, delay)
+            self.recheck(step)
+        except FlowCancelled:
+            pass  # run() re-raises from the token
+        finally:
+            with self._lock:
+                self.running.discard(step.checkpoint)
+            self._changed.set()
+
+    def run(self):
+        """
+        Run every step until each checkpoint is reached
+
+        Steps are started on the clock as soon as their dependencies are
+        settled, so independent steps overlap.
+
+        Returns:
+            True if every required checkpoint was reached, False if a required
+            step ran out of attempts
+
+        Raises:
+            FlowCancelled: The flow was cancelled
+        """
+        self.started = self.clock.now()
+        self.token.add_waiter(self._changed)
+        try:
+            while True:
+                self._changed.clear()
+                self.token.raise_if_cancelled()
+                if self.stopped:
+                    return False
+                with self._lock:
+                    if all(self._settled(step.checkpoint) for step in self.steps):
+                        return True
+                    ready = self.ready()
+                    self.running.update(step.checkpoint for step in ready)
+                    idle = not ready and not self.running
+                if idle:
+                    log.error("[STEP] No step can run, unmet dependencies")
+                    return False
+                for step in ready:
+                    self.clock.spawn(self._attempt, step)
+                if not ready:
+                    self.clock.wait(self._changed, None)
+        finally:
+            self.token.remove_waiter(self._changed)
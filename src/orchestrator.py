@@ -0,0 +1,371 @@
+"""
+Login orchestrator module - logs in many accounts with several windows in one webview loop
+
+Every account gets its own window, EventBus, PageHandler and session
+directory. At most ACCOUNT_CONCURRENCY windows log in at the same time and
+page loads are staggered by ACCOUNT_STAGGER seconds. Credentials are entered
+by value injection only: OS key events go to whichever window has focus, so
+they cannot be used with several windows.
+
+All windows of one webview loop share the browser's localStorage and cookies
+for an origin, and pywebview has no per-window profile. The loop runs in
+private mode so nothing outlives it, each account's session is kept in its
+own SessionCache directory, and a StorageGate gives one window at a time the
+shared storage: from its page load through the session check, and from its
+login click until its session was saved. The holder wipes the storage before
+the next window may load, so page loads and session checks run one account
+at a time while cookie banners and form filling overlap. Windows kept open
+after their login no longer have their session in storage; whatever they do
+next takes the gate again and restores it (see PageHandler.restore_storage).
+"""
+import json
+import os
+import re
+import threading
+from collections import deque
+import webview
+from config import (
+    DEEPSEEK_URL,
+    WINDOW_TITLE,
+    WINDOW_WIDTH,
+    WINDOW_HEIGHT,
+    MIN_WIDTH,
+    MIN_HEIGHT,
+    ACCOUNTS_STORAGE_DIR,
+    ACCOUNT_CONCURRENCY,
+    ACCOUNT_STAGGER,
+    ACCOUNT_LOGIN_TIMEOUT,
+    ACCOUNT_STORAGE_WAIT,
+    COOKIE_CONSENT_PRESEED_ENABLED
+)
+from .clock import REAL_CLOCK
+from .consent_preseed import ConsentPreseed
+from .credentials_manager import CredentialsManager
+from .js_api import EventBus, JsApi
+from .login_confirmation import SUCCESS
+from .page_handler import PageHandler
+from .selector_strategy import StrategyEngine
+from .session_cache import SessionCache, StorageGate
+from .timing import get_tracer
+from .logger import get_logger
+
+
+log = get_logger(__name__)
+
+
+def load_accounts(path):
+    """
+    Read the accounts file
+
+    Args:
+        path: JSON file with a list of {"id", "username", "password"}
+
+    Returns:
+        List of account dicts; entries without username or password are skipped
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    accounts = []
+    for index, entry in enumerate(entries):
+        if not entry.get('username') or not entry.get('password'):
+            log.warning(f"⚠️  Skipping account #{index + 1}: username or password missing")
+            continue
+        accounts.append({
+            'id': str(entry.get('id') or entry['username']),
+            'username': entry['username'],
+            'password': entry['password']
+        })
+    return accounts
+
+
+def due_accounts(store, limit=None):
+    """
+    Accounts of a CredentialStore that need a login, most urgent first
+
+    Args:
+        store: CredentialStore
+        limit: Maximum number of accounts
+
+    Returns:
+        List of account dicts; profiles without username or password are skipped
+    """
+    accounts = []
+    for profile_id in store.due():
+        profile = store.get(profile_id)
+        if not profile or not profile.get('username') or not profile.get('password'):
+            log.warning(f"⚠️  Skipping account {profile_id}: username or password missing")
+            continue
+        accounts.append({
+            'id': profile_id,
+            'username': profile['username'],
+            'password': profile['password']
+        })
+        if limit is not None and len(accounts) >= limit:
+            break
+    return accounts
+
+
+def storage_dir_for(account_id, root=ACCOUNTS_STORAGE_DIR):
+    """Session directory of one account (the id made safe as a directory name)"""
+    return os.path.join(root, re.sub(r'[^A-Za-z0-9._@-]', '_', account_id))
+
+
+class AccountRun:
+    """One account's window, handler and result"""
+
+    def __init__(self, account, window, handler, started):
+        self.account = account
+        self.window = window
+        self.handler = handler
+        self.started = started
+        self.finished = None
+        self.result = None
+
+    @property
+    def status(self):
+        """Final status, 'timeout' when the account never finished"""
+        return (self.result or {}).get('status', 'timeout')
+
+
+class LoginOrchestrator:
+    """Log in a list of accounts with a concurrency limit and staggered page loads"""
+
+    def __init__(self, accounts, concurrency=ACCOUNT_CONCURRENCY, stagger=ACCOUNT_STAGGER,
+                 timeout=ACCOUNT_LOGIN_TIMEOUT, storage_root=ACCOUNTS_STORAGE_DIR,
+                 clock=None, create_window=None, store=None, keep_open=False):
+        """
+        Initialize the orchestrator
+
+        Args:
+            accounts: List of account dicts (id, username, password)
+            concurrency: Maximum windows logging in at the same time
+            stagger: Minimum seconds between two page loads
+            timeout: Seconds before an unfinished account counts as timed out
+            storage_root: Directory holding one session directory per account
+            clock: Clock for staggering and timeouts (real time by default)
+            create_window: Window factory(title, url, js_api) (webview.create_window by default)
+            store: CredentialStore recording each account's result (optional)
+            keep_open: Leave the logged-in windows open after schedule() (e.g. to send prompts)
+        """
+        self.accounts = list(accounts)
+        self.concurrency = max(1, concurrency)
+        self.stagger = stagger
+        self.timeout = timeout
+        self.storage_root = storage_root
+        self.clock = clock or REAL_CLOCK
+        self.create_window = create_window or self._create_webview_window
+        self.store = store
+        self.keep_open = keep_open
+        # Shared by all windows so the preseed and selector stats files have a single writer
+        self.consent_preseed = ConsentPreseed() if COOKIE_CONSENT_PRESEED_ENABLED else None
+        self.strategy_engine = StrategyEngine()
+        self.storage_gate = StorageGate(self.clock)
+        self.tracer = get_tracer()
+        self.runs = []
+        self.started = None
+        self.finished = None
+        self._pending = deque(self.accounts)
+        self._last_launch = None
+        self._changed = threading.Event()
+        self._lock = threading.Lock()
+
+    def _create_webview_window(self, title, url, js_api):
+        return webview.create_window(
+            title,
+            url,
+            width=WINDOW_WIDTH,
+            height=WINDOW_HEIGHT,
+            min_size=(MIN_WIDTH, MIN_HEIGHT),
+            js_api=js_api
+        )
+
+    def launch(self, account):
+        """
+        Open a window for one account and start watching its flow
+
+        Args:
+            account: Account dict
+
+        Returns:
+            AccountRun
+        """
+        # The new page boots with whatever session is in the shared storage
+        if not self.storage_gate.acquire(account['username'], ACCOUNT_STORAGE_WAIT):
+            log.warning(f"⚠️  Shared storage still held by {self.storage_gate.holder}, taking it over")
+            self.storage_gate.take_over(account['username'])
+        event_bus = EventBus(self.clock)
+        start_url = self.consent_preseed.start_url if self.consent_preseed else DEEPSEEK_URL
+        window = self.create_window(f"{WINDOW_TITLE} - {account['id']}", start_url, JsApi(event_bus))
+        handler = PageHandler(
+            window,
+            event_bus,
+            SessionCache(storage_dir_for(account['id'], self.storage_root)),
+            self.consent_preseed,
+            self.clock,
+            credentials_manager=CredentialsManager(account['username'], account['password']),
+            input_mode='inject_only',
+            storage_gate=self.storage_gate,
+            strategy_engine=self.strategy_engine
+        )
+        window.events.loaded += handler.on_page_loaded
+
+        run = AccountRun(account, window, handler, self.clock.now())
+        with self._lock:
+            self.runs.append(run)
+        self._last_launch = run.started
+        log.info(f"[ACCOUNTS] Started {account['id']} ({len(self.runs)}/{len(self.accounts)})")
+        self.clock.spawn(self._watch, run)
+        return run
+
+    def _watch(self, run):
+        """Wait for one account's flow to finish (or time out) and record its result"""
+        if not self.clock.wait(run.handler.flow_done, self.timeout):
+            # Stop the abandoned flow so it neither clicks nor keeps the storage
+            run.handler.window.token.cancel('account timed out')
+            run.handler.release_storage()
+        with self._lock:
+            run.finished = self.clock.now()
+            run.result = run.handler.flow_result
+        if self.store is not None:
+            self.store.record_result(run.account['id'], run.status)
+        outcome = run.handler.login_outcome
+        elapsed = f", authenticated {outcome.elapsed:.1f}s after click" if outcome and outcome.ok else ''
+        log.info(f"[ACCOUNTS] {run.account['id']}: {run.status} "
+                 f"in {run.finished - run.started:.1f}s{elapsed}")
+        self._changed.set()
+
+    def logged_in(self):
+        """Runs that ended logged in"""
+        with self._lock:
+            return [run for run in self.runs if run.status in (SUCCESS, 'session')]
+
+    def _kept(self, run):
+        """True if the run's window stays open after the logins"""
+        return self.keep_open and run.status in (SUCCESS, 'session')
+
+    def _active(self):
+        """Runs still logging in"""
+        with self._lock:
+            return [run for run in self.runs if run.finished is None]
+
+    def schedule(self):
+        """
+        Launch the pending accounts and wait until every account finished
+
+        Finished windows are closed only after the next one was opened,
+        because the webview loop ends once its last window is gone.
+        """
+        if self.started is None:
+            self.started = self.clock.now()
+        done = []
+        while True:
+            self._changed.clear()
+            while self._pending and len(self._active()) < self.concurrency:
+                if self._last_launch is not None:
+                    wait = self._last_launch + self.stagger - self.clock.now()
+                    if wait > 0:
+                        self.clock.sleep(wait)
+                self.launch(self._pending.popleft())
+
+            with self._lock:
+                finished = [run for run in self.runs if run.finished is not None and run not in done]
+            if finished and (self._pending or self._active()):
+                for run in finished:
+                    if not self._kept(run):
+                        self._close(run)
+                done.extend(finished)
+
+            if not self._pending and not self._active():
+                break
+            self.clock.wait(self._changed, self.timeout)
+
+        self.finished = self.clock.now()
+        report = self.report()
+        self.print_report(report)
+        for run in self.runs:
+            if run not in done and not self._kept(run):
+                self._close(run)
+        return report
+
+    def _close(self, run):
+        try:
+            run.window.destroy()
+        except Exception as e:
+            log.warning(f"⚠️  Could not close window of {run.account['id']}: {e}")
+
+    def report(self):
+        """
+        Summarize per-account results and throughput
+
+        Returns:
+            dict with 'accounts' (per-account results), 'succeeded', 'failed',
+            'elapsed' (seconds) and 'logins_per_minute'
+        """
+        accounts = []
+        for run in self.runs:
+            outcome = run.handler.login_outcome
+            accounts.append({
+                'id': run.account['id'],
+                'status': run.status,
+                'detail': (run.result or {}).get('detail', ''),
+                'duration': (run.finished or self.clock.now()) - run.started,
+                'time_to_authenticated': outcome.elapsed if outcome and outcome.ok else None
+            })
+        succeeded = sum(1 for entry in accounts if entry['status'] in (SUCCESS, 'session'))
+        elapsed = ((self.finished or self.clock.now()) - self.started) if self.started is not None else 0.0
+        return {
+            'accounts': accounts,
+            'succeeded': succeeded,
+            'failed': len(accounts) - succeeded,
+            'elapsed': elapsed,
+            'logins_per_minute': succeeded / elapsed * 60 if elapsed > 0 else 0.0
+        }
+
+    def print_report(self, report):
+        """Log the per-account results and the aggregate throughput"""
+        log.info("=" * 60)
+        for entry in report['accounts']:
+            authenticated = entry['time_to_authenticated']
+            authenticated = f"{authenticated:6.1f}s" if authenticated is not None else '      -'
+            log.info(f"  {entry['id']:<32} {entry['status']:<16} {entry['duration']:6.1f}s "
+                     f"{authenticated}  {entry['detail']}")
+        log.info(f"[ACCOUNTS] {report['succeeded']} logged in, {report['failed']} failed "
+                 f"in {report['elapsed']:.1f}s ({report['logins_per_minute']:.1f} logins/minute)")
+        log.info("=" * 60)
+
+    def run(self, then=None):
+        """
+        Open the windows in one webview loop and log every account in
+
+        Args:
+            then: Optional function(runs) called with the logged-in runs before
+                  their windows close (needs keep_open)
+
+        Returns:
+            The report dict, None if there was nothing to do
+        """
+        if not self._pending:
+            log.error("[ACCOUNTS] No accounts to log in")
+            return None
+        self.started = self.clock.now()
+        result = {}
+
+        def schedule():
+            result['report'] = self.schedule()
+            self.tracer.flush()
+            if not self.keep_open:
+                return
+            runs = self.logged_in()
+            try:
+                if then is not None and runs:
+                    then(runs)
+            finally:
+                for run in runs:
+                    self._close(run)
+
+        # webview.start() needs a window before the loop starts
+        self.launch(self._pending.popleft())
+        webview.start(schedule, private_mode=True)
+        self.strategy_engine.sync()
+        self.tracer.flush()
+        return result.get('report')
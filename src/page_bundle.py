@@ -0,0 +1,712 @@
+"""
+Page helper bundle - one versioned script installed per document as window.__dsAuto
+
+The locator, readiness, login confirmation, probe, scan, credential and prompt helpers are injected once;
+every step then calls them through a small evaluate_js call. Resolved
+elements are cached per target until a MutationObserver sees them removed.
+A call that finds no bundle (or an older version) after a navigation
+installs it and retries, so the bundle is re-injected on every new document.
+"""
+import hashlib
+import json
+import re
+from .logger import get_logger
+
+
+log = get_logger(__name__)
+
+
+# Returned by a helper call when the document has no (matching) bundle yet
+MISSING_KEY = '__dsMissing'
+
+
+BUNDLE_SOURCE = """
+(function(version) {
+    if (window.__dsAuto && window.__dsAuto.version === version) return true;
+    var ds = {version: version};
+
+    // Push an event to Python; pywebview exposes the api once 'pywebviewready' fired
+    function emit(name, payload) {
+        function send() { window.pywebview.api.emit(name, payload); }
+        if (window.pywebview && window.pywebview.api && window.pywebview.api.emit) {
+            send();
+        } else {
+            window.addEventListener('pywebviewready', send, {once: true});
+        }
+    }
+
+    // Resolve one compiled locator method to an element
+    function locate(method) {
+        try {
+            if (method.kind === 'xpath') {
+                return document.evaluate(method.value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+            }
+            if (method.kind === 'text') {
+                var candidates = document.querySelectorAll(method.value);
+                for (var i = 0; i < candidates.length; i++) {
+                    if ((candidates[i].textContent || '').toLowerCase().indexOf(method.text) >= 0) {
+                        return candidates[i];
+                    }
+                }
+                return null;
+            }
+            return document.querySelector(method.value);
+        } catch (e) {
+            return null;
+        }
+    }
+
+    function shown(el) {
+        return el && el.getClientRects().length > 0 ? el : null;
+    }
+
+    // Locator cache: target -> {el, method}, dropped once its subtree leaves the document
+    var cache = {};
+    new MutationObserver(function(records) {
+        for (var r = 0; r < records.length; r++) {
+            var removed = records[r].removedNodes;
+            for (var n = 0; n < removed.length; n++) {
+                for (var target in cache) {
+                    var el = cache[target].el;
+                    if (removed[n] === el || (removed[n].contains && removed[n].contains(el))) {
+                        delete cache[target];
+                    }
+                }
+            }
+        }
+    }).observe(document.documentElement, {childList: true, subtree: true});
+
+    // Cached entry for a target while its element is connected and shown
+    function cached(target) {
+        var entry = target && cache[target];
+        if (!entry) return null;
+        if (!entry.el.isConnected) {
+            delete cache[target];
+            return null;
+        }
+        return shown(entry.el) ? entry : null;
+    }
+
+    // First shown element matched by a ranked method list, served from the cache when possible
+    function resolve(target, methods) {
+        var entry = cached(target);
+        if (entry) return entry.el;
+        for (var i = 0; i < methods.length; i++) {
+            var el = shown(locate(methods[i]));
+            if (el) {
+                cache[target] = {el: el, method: methods[i].id};
+                return el;
+            }
+        }
+        return null;
+    }
+
+    function filled(target, methods) {
+        var input = resolve(target, methods);
+        if (input) return !!(input.value && input.value.trim().length > 0);
+        return hasValue(methods);
+    }
+
+    function hasValue(methods) {
+        for (var i = 0; i < methods.length; i++) {
+            var input = locate(methods[i]);
+            if (input && input.value && input.value.trim().length > 0) return true;
+        }
+        return false;
+    }
+
+    // Readiness watch: emits spec.event once the targets match or the deadline passes
+    ds.ready = function(spec) {
+        function probe() {
+            var hits = {};
+            var any = false;
+            for (var i = 0; i < spec.targets.length; i++) {
+                var present = !!resolve(spec.targets[i], spec.methods[spec.targets[i]]);
+                if (spec.absent ? !present : present) {
+                    hits[spec.targets[i]] = true;
+                    any = true;
+                }
+            }
+            return any ? hits : null;
+        }
+
+        var start = Date.now();
+        var hits = probe();
+        if (hits) {
+            emit(spec.event, {watch_id: spec.watch_id, found: true, targets: hits, elapsed: 0});
+            return true;
+        }
+
+        var scheduled = false;
+        var observer = new MutationObserver(function() {
+            // Coalesce mutation bursts into a single probe
+            if (scheduled) return;
+            scheduled = true;
+            setTimeout(function() {
+                scheduled = false;
+                var found = probe();
+                if (found) finish(true, found);
+            }, 0);
+        });
+        var timer = setTimeout(function() { finish(false, {}); }, spec.timeout_ms);
+
+        function finish(found, targets) {
+            observer.disconnect();
+            clearTimeout(timer);
+            emit(spec.event, {
+                watch_id: spec.watch_id,
+                found: found,
+                targets: targets,
+                elapsed: Date.now() - start
+            });
+        }
+
+        observer.observe(document.documentElement, {
+            childList: true,
+            subtree: true,
+            attributes: true,
+            attributeFilter: ['class', 'style', 'hidden']
+        });
+        return true;
+    };
+
+    function anyShown(selectors) {
+        for (var i = 0; i < selectors.length; i++) {
+            var candidates;
+            try { candidates = document.querySelectorAll(selectors[i]); } catch (e) { continue; }
+            for (var j = 0; j < candidates.length; j++) {
+                if (shown(candidates[j])) return candidates[j];
+            }
+        }
+        return null;
+    }
+
+    // Text of the first visible banner containing one of the (lowercase) patterns
+    function banner(selectors, patterns) {
+        for (var i = 0; i < selectors.length; i++) {
+            var candidates;
+            try { candidates = document.querySelectorAll(selectors[i]); } catch (e) { continue; }
+            for (var j = 0; j < candidates.length; j++) {
+                if (!shown(candidates[j])) continue;
+                var text = (candidates[j].textContent || '').trim();
+                var lower = text.toLowerCase();
+                for (var p = 0; p < patterns.length; p++) {
+                    if (lower.indexOf(patterns[p]) >= 0) return text.slice(0, 120);
+                }
+            }
+        }
+        return null;
+    }
+
+    // Login confirmation: emits spec.event with the typed outcome of the click
+    ds.confirm = function(spec) {
+        var startUrl = location.href;
+
+        function leftLogin() {
+            if (location.href === startUrl) return false;
+            var path = location.pathname.toLowerCase();
+            for (var i = 0; i < spec.login_paths.length; i++) {
+                if (path.indexOf(spec.login_paths[i]) >= 0) return false;
+            }
+            return true;
+        }
+
+        function probe() {
+            if (resolve('chat', spec.methods.chat) && !resolve('password', spec.methods.password)) {
+                return {outcome: 'success', detail: 'chat'};
+            }
+            if (leftLogin()) return {outcome: 'success', detail: 'url'};
+            var captcha = anyShown(spec.captcha_selectors);
+            if (captcha) return {outcome: 'captcha', detail: captcha.tagName.toLowerCase()};
+            var error = banner(spec.error_selectors, spec.error_patterns);
+            if (error) return {outcome: 'bad_credentials', detail: error};
+            return null;
+        }
+
+        var start = Date.now();
+        var observer = null;
+        var timer = null;
+        var scheduled = false;
+
+        function finish(result) {
+            if (observer) observer.disconnect();
+            if (timer) clearTimeout(timer);
+            emit(spec.event, {
+                watch_id: spec.watch_id,
+                outcome: result.outcome,
+                detail: result.detail,
+                url: location.href,
+                elapsed: Date.now() - start
+            });
+        }
+
+        var result = probe();
+        if (result) {
+            finish(result);
+            return true;
+        }
+        observer = new MutationObserver(function() {
+            if (scheduled) return;
+            scheduled = true;
+            setTimeout(function() {
+                scheduled = false;
+                var found = probe();
+                if (found) finish(found);
+            }, 0);
+        });
+        timer = setTimeout(function() { finish({outcome: 'timeout', detail: ''}); }, spec.timeout_ms);
+        observer.observe(document.documentElement, {
+            childList: true,
+            subtree: true,
+            characterData: true,
+            attributes: true,
+            attributeFilter: ['class', 'style', 'hidden']
+        });
+        return true;
+    };
+
+    // Report the first typed value of each field through `event`
+    ds.fields = function(event) {
+        if (window.__dsFieldWatch) return true;
+        window.__dsFieldWatch = true;
+        var reported = {};
+        document.addEventListener('input', function(e) {
+            var input = e.target;
+            if (!input || input.tagName !== 'INPUT' || !input.value) return;
+            var field = input.type === 'password' ? 'password' : 'email';
+            if (reported[field]) return;
+            reported[field] = true;
+            emit(event, {field: field, length: input.value.length});
+        }, true);
+        return true;
+    };
+
+    function act(el, action) {
+        if (action === 'click') {
+            el.click();
+        } else if (action === 'focus') {
+            el.focus();
+            if (el.select) el.select();
+        }
+    }
+
+    // Try ranked methods in order, timing each, and act on the winner
+    ds.probe = function(probe) {
+        var start = performance.now();
+        var entry = cached(probe.target);
+        if (entry) {
+            act(entry.el, probe.action);
+            return {found: true, method: entry.method, ms: 0, tried: [], cached: true,
+                    elapsed: performance.now() - start};
+        }
+        var tried = [];
+        for (var i = 0; i < probe.methods.length; i++) {
+            var t0 = performance.now();
+            var el = shown(locate(probe.methods[i]));
+            var ms = performance.now() - t0;
+            if (el) {
+                if (probe.target) cache[probe.target] = {el: el, method: probe.methods[i].id};
+                act(el, probe.action);
+                return {found: true, method: probe.methods[i].id, ms: ms, tried: tried,
+                        elapsed: performance.now() - start};
+            }
+            tried.push({id: probe.methods[i].id, ms: ms});
+        }
+        return {found: false, method: 'not_found', tried: tried, elapsed: performance.now() - start};
+    };
+
+    // Single-pass scored search for login page elements
+    ds.scan = function(options) {
+        var start = Date.now();
+        var targets = options.targets;
+        var best = {};
+        var SKIP = {SCRIPT: true, STYLE: true, NOSCRIPT: true, TEMPLATE: true, SVG: true};
+
+        function consider(target, el, score, method, text) {
+            if (!el || targets.indexOf(target) < 0) return;
+            var current = best[target];
+            if (current && current.score >= score) return;
+            if (!shown(el)) return;
+            best[target] = {el: el, score: score, method: method, text: text || ''};
+        }
+
+        function done() {
+            for (var i = 0; i < targets.length; i++) {
+                if (!best[targets[i]] || best[targets[i]].score < options.exit_score) return false;
+            }
+            return true;
+        }
+
+        // Nearest ancestor a user could click, bounded so text deep in a layout does not climb to <body>
+        function clickable(el) {
+            for (var depth = 0; el && depth < 6; depth++, el = el.parentElement) {
+                if (el.tagName === 'BUTTON' || el.tagName === 'A' ||
+                    el.getAttribute('role') === 'button' ||
+                    el.classList.contains('ds-button') || el.onclick) {
+                    return el;
+                }
+            }
+            return null;
+        }
+
+        // Cheap pre-checks: known XPath/CSS locations score before any walking
+        var prechecks = [
+            ['login', 'xpath', {kind: 'xpath', value: '/html/body/div[1]/div/div[1]/div[2]/div/div/div[2]/div/div[5]'}, 100],
+            ['login', 'css_class', {kind: 'css', value: '.ds-sign-up-form__register-button'}, 100],
+            ['cookie', 'css_class', {kind: 'css', value: '.cookie_banner-accept-essential-button'}, 100],
+            ['cookie', 'xpath', {kind: 'xpath', value: '/html/body/div[1]/div/div[2]/div[3]'}, 95],
+            ['email', 'css_selector', {kind: 'css', value: 'input[type="email"]'}, 100],
+            ['email', 'css_selector', {kind: 'css', value: 'input[placeholder*="email"]'}, 95],
+            ['password', 'css_selector', {kind: 'css', value: 'input[type="password"]'}, 100]
+        ];
+        for (var p = 0; p < prechecks.length; p++) {
+            if (targets.indexOf(prechecks[p][0]) >= 0) {
+                consider(prechecks[p][0], locate(prechecks[p][2]), prechecks[p][3], prechecks[p][1]);
+            }
+        }
+
+        function scoreInput(input) {
+            var type = (input.getAttribute('type') || 'text').toLowerCase();
+            if (type === 'password') {
+                consider('password', input, 100, 'input_type');
+            } else if (type === 'email') {
+                consider('email', input, 100, 'input_type');
+            } else if (type === 'text' || type === 'tel') {
+                var hint = ((input.placeholder || '') + ' ' + (input.name || '') + ' ' +
+                            (input.autocomplete || '')).toLowerCase();
+                var hinted = /mail|phone|user|login|account/.test(hint);
+                consider('email', input, hinted ? 90 : 60, 'input_hint');
+            }
+        }
+
+        function scoreText(parent, text) {
+            var target = clickable(parent);
+            var el = target || parent;
+            var penalty = target ? 0 : 30;
+
+            if (text === 'log in' || text === 'login' || text === 'sign in') {
+                consider('login', el, 90 - penalty, 'text_exact', text);
+            } else if (/\\b(log ?in|sign ?in)\\b/.test(text)) {
+                consider('login', el, 60 - penalty, 'keyword', text);
+            }
+
+            if (text.indexOf('necessary') >= 0 || text.indexOf('essential') >= 0) {
+                var score = text.indexOf('only') >= 0 ? 90 : 70;
+                consider('cookie', el, score - penalty, 'button_text', text);
+            }
+        }
+
+        var visited = 0;
+        if (!done()) {
+            var walker = document.createTreeWalker(
+                document.body || document.documentElement,
+                NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT,
+                {acceptNode: function(node) {
+                    return SKIP[node.nodeName.toUpperCase()] ? NodeFilter.FILTER_REJECT : NodeFilter.FILTER_ACCEPT;
+                }}
+            );
+            var node;
+            while ((node = walker.nextNode())) {
+                visited++;
+                if (node.nodeType === 1) {
+                    if (node.tagName === 'INPUT') scoreInput(node);
+                    else continue;
+                } else {
+                    // Only the node's own text is read, so the pass stays linear
+                    var raw = node.nodeValue;
+                    if (raw.length > 80) continue;
+                    var text = raw.trim().toLowerCase();
+                    if (!text) continue;
+                    scoreText(node.parentElement, text);
+                }
+                if (done()) break;
+            }
+        }
+
+        var result = {visited: visited, elapsed: Date.now() - start, clicked: false};
+        for (var i = 0; i < targets.length; i++) {
+            var match = best[targets[i]];
+            result[targets[i]] = match ?
+                {found: true, score: match.score, method: match.method, text: match.text} :
+                {found: false, score: 0, method: 'not_found'};
+        }
+
+        var click = options.click && best[options.click];
+        if (click && click.score >= options.min_click_score) {
+            click.el.click();
+            result.clicked = true;
+        }
+        return result;
+    };
+
+    // Check whether the email and password fields hold a value
+    ds.check = function(spec) {
+        var emailFilled = filled('email', spec.email_methods);
+        var passwordFilled = filled('password', spec.password_methods);
+        return {emailFilled: emailFilled, passwordFilled: passwordFilled,
+                bothFilled: emailFilled && passwordFilled};
+    };
+
+    // Snapshot of every target in one call: shown per target, value per field
+    ds.state = function(spec) {
+        var state = {shown: {}, filled: {}};
+        for (var target in spec.methods) {
+            var el = resolve(target, spec.methods[target]);
+            state.shown[target] = !!el;
+            if (target === 'email' || target === 'password') {
+                state.filled[target] = !!(el && el.value && el.value.trim().length > 0);
+            }
+        }
+        return state;
+    };
+
+    // Set both field values through the native setter and verify them
+    ds.inject = function(spec) {
+        // Frameworks like React track the value through the prototype setter,
+        // so assigning input.value directly would be ignored on the next render
+        var setter = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set;
+
+        function fill(input, value) {
+            input.focus();
+            setter.call(input, value);
+            input.dispatchEvent(new Event('input', {bubbles: true}));
+            input.dispatchEvent(new Event('change', {bubbles: true}));
+        }
+
+        var emailInput = resolve('email', spec.email_methods);
+        var passwordInput = resolve('password', spec.password_methods);
+        if (!emailInput || !passwordInput) {
+            return {emailFilled: false, passwordFilled: false, bothFilled: false,
+                    emailFound: !!emailInput, passwordFound: !!passwordInput};
+        }
+
+        fill(emailInput, spec.email);
+        fill(passwordInput, spec.password);
+        passwordInput.blur();
+
+        var emailFilled = emailInput.value === spec.email;
+        var passwordFilled = passwordInput.value === spec.password;
+        return {emailFilled: emailFilled, passwordFilled: passwordFilled,
+                bothFilled: emailFilled && passwordFilled,
+                emailFound: true, passwordFound: true};
+    };
+
+    // Newest element of the first selector that matches anything
+    function lastMatch(selectors) {
+        for (var i = 0; i < selectors.length; i++) {
+            var found;
+            try { found = document.querySelectorAll(selectors[i]); } catch (e) { continue; }
+            if (found.length) return {el: found[found.length - 1], count: found.length};
+        }
+        return {el: null, count: 0};
+    }
+
+    function enabled(el) {
+        var className = typeof el.className === 'string' ? el.className : '';
+        return !el.disabled && el.getAttribute('aria-disabled') !== 'true' && className.indexOf('disabled') < 0;
+    }
+
+    // Prompt submission: set the chat input, click send once it is enabled,
+    // push the text appended to the new answer through spec.chunk_event and
+    // emit spec.event when the answer finished generating (or a throttling
+    // or error banner showed up)
+    ds.submit = function(spec) {
+        var input = resolve('chat', spec.methods.chat);
+        if (!input) return {submitted: false, reason: 'no chat input'};
+        var limited = banner(spec.throttle_selectors, spec.throttle_patterns);
+        if (limited) return {submitted: false, reason: 'throttled', detail: limited};
+
+        var before = lastMatch(spec.message_selectors).count;
+        input.focus();
+        if (input.isContentEditable) {
+            input.textContent = spec.prompt;
+        } else {
+            // Same native setter trick as ds.inject, for textarea or input
+            var proto = input.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+            Object.getOwnPropertyDescriptor(proto, 'value').set.call(input, spec.prompt);
+        }
+        input.dispatchEvent(new Event('input', {bubbles: true}));
+
+        var start = Date.now();
+        var sent = false;
+        var sawStop = false;
+        var streamed = '';
+        var seq = 0;
+        var method = null;
+        var observer = null;
+        var timer = null;
+        var settle = null;
+        var scheduled = false;
+        var finished = false;
+        var detail = null;
+
+        function finish(outcome) {
+            if (finished) return;
+            finished = true;
+            observer.disconnect();
+            clearTimeout(timer);
+            clearTimeout(settle);
+            emit(spec.event, {
+                watch_id: spec.watch_id,
+                outcome: outcome,
+                chunks: seq,
+                length: streamed.length,
+                method: method,
+                detail: detail,
+                url: location.href,
+                elapsed: Date.now() - start
+            });
+        }
+
+        function send() {
+            var button = resolve('send', spec.methods.send);
+            if (!button || !enabled(button)) return;
+            method = cache.send ? cache.send.method : null;
+            button.click();
+            sent = true;
+            clearTimeout(timer);
+            timer = setTimeout(function() { finish('timeout'); }, spec.timeout_ms);
+        }
+
+        // Only the new text crosses the bridge; a re-render that changed
+        // already sent text resends the answer from the first difference
+        function stream(text) {
+            var offset = streamed.length;
+            if (text.slice(0, offset) !== streamed) {
+                offset = 0;
+                while (offset < streamed.length && text.charCodeAt(offset) === streamed.charCodeAt(offset)) offset++;
+            }
+            emit(spec.chunk_event, {
+                watch_id: spec.watch_id,
+                seq: seq++,
+                offset: offset,
+                text: text.slice(offset)
+            });
+            streamed = text;
+        }
+
+        function check() {
+            if (finished) return;
+            detail = banner(spec.throttle_selectors, spec.throttle_patterns);
+            if (detail) {
+                finish('throttled');
+                return;
+            }
+            if (!sent) {
+                send();
+                return;
+            }
+            var generating = !!anyShown(spec.stop_selectors);
+            if (generating) sawStop = true;
+            var latest = lastMatch(spec.message_selectors);
+            if (latest.count <= before) return;
+            var text = latest.el.textContent || '';
+            if (text !== streamed) {
+                stream(text);
+                // Without a stop button the answer counts as finished once it stops changing
+                clearTimeout(settle);
+                settle = setTimeout(function() {
+                    if (!anyShown(spec.stop_selectors)) finish('done');
+                }, spec.settle_ms);
+            }
+            if (sawStop && !generating) finish('done');
+        }
+
+        observer = new MutationObserver(function() {
+            if (scheduled) return;
+            scheduled = true;
+            setTimeout(function() {
+                scheduled = false;
+                check();
+            }, 0);
+        });
+        observer.observe(document.documentElement, {
+            childList: true,
+            subtree: true,
+            characterData: true,
+            attributes: true,
+            attributeFilter: ['class', 'style', 'hidden', 'disabled', 'aria-disabled']
+        });
+        timer = setTimeout(function() { finish('not_sent'); }, spec.send_timeout_ms);
+        check();
+        return {submitted: true};
+    };
+
+    window.__dsAuto = ds;
+    return true;
+})(__DS_VERSION__);
+"""
+
+# Any change to the bundle source changes its version, so stale copies are replaced
+BUNDLE_VERSION = hashlib.sha1(BUNDLE_SOURCE.encode('utf-8')).hexdigest()[:12]
+BUNDLE_JS = BUNDLE_SOURCE.replace('__DS_VERSION__', json.dumps(BUNDLE_VERSION))
+
+CALL_JS = """(function(call) {
+    var ds = window.__dsAuto;
+    if (!ds || ds.version !== call.version) return {%s: true};
+    return ds[call.name](call.arg);
+})(%%s);""" % MISSING_KEY
+
+
+CALL_PREFIX = CALL_JS.partition('%s')[0]
+CALL_NAME_PATTERN = re.compile(r'"name": "(\w+)"')
+
+
+def script_label(script):
+    """
+    Short label for a script, used to tag bridge timings
+
+    Args:
+        script: JavaScript source passed to evaluate_js
+
+    Returns:
+        The helper name for helper calls, 'bundle' for the bundle, 'script' otherwise
+    """
+    if script.startswith(CALL_PREFIX):
+        match = CALL_NAME_PATTERN.search(script, len(CALL_PREFIX))
+        return match.group(1) if match else 'call'
+    if script is BUNDLE_JS or script == BUNDLE_JS:
+        return 'bundle'
+    return 'script'
+
+
+def install(window):
+    """
+    Install the helper bundle in the current document
+
+    Safe to call repeatedly: the bundle returns early when the same
+    version is already installed.
+
+    Args:
+        window: pywebview window object
+
+    Returns:
+        True if the bundle was installed (or already present)
+    """
+    try:
+        return bool(window.evaluate_js(BUNDLE_JS))
+    except Exception as e:
+        log.error(f"Error installing page helpers: {e}")
+        return False
+
+
+def call_helper(window, name, arg=None):
+    """
+    Call a bundle helper, installing the bundle first if the document lacks it
+
+    Args:
+        window: pywebview window object
+        name: Helper name (ready, confirm, fields, probe, scan, check, state, inject, submit)
+        arg: JSON-serializable argument passed to the helper
+
+    Returns:
+        The helper's return value
+    """
+    script = CALL_JS % json.dumps({'version': BUNDLE_VERSION, 'name': name, 'arg': arg})
+    result = window.evaluate_js(script)
+    if isinstance(result, dict) and result.get(MISSING_KEY):
+        # New document (navigation or reload) or an older bundle version
+        log.debug(f"[BUNDLE] Installing page helpers v{BUNDLE_VERSION}")
+        install(window)
+        result = window.evaluate_js(script)
+    return result
@@ -1,120 +1,196 @@
 """
 Page handler module for managing page load events and automation flows
 """
-import time
 import threading
-import mouse
-from config import COOKIE_HANDLER_DELAY, COOKIE_PROCESSING_DELAY
+from config import ACCOUNT_STORAGE_WAIT, COOKIE_DISMISS_TIMEOUT, ELEMENT_READY_GRACE, INPUT_MODE
 from .credentials_manager import CredentialsManager
+from .element_waiter import (
+    ElementWaiter,
+    COOKIE_TARGET,
+    EMAIL_TARGET,
+    PASSWORD_TARGET,
+    CHAT_TARGET
+)
+from .bridge import Bridge, FlowCancelled
+from .consent_preseed import PRESEED_PATH, FALLBACK_PATH
+from .dom_scan import DomScanner
+from .js_api import BANNER_DISMISSED, FIELD_FILLED
 from .keyboard_automation import KeyboardAutomation
 from .login_button_detector import LoginButtonDetector
+from .login_confirmation import LoginConfirmation, SUCCESS, BAD_CREDENTIALS, CAPTCHA
+from .login_pipeline import (
+    LoginPipeline,
+    Step,
+    PROBE_TARGETS,
+    COOKIE_DISMISSED,
+    EMAIL_FILLED,
+    PASSWORD_FILLED,
+    BUTTON_CLICKED,
+    AUTHENTICATED
+)
+from .page_bundle import install as install_page_helpers
+from .selector_strategy import StrategyEngine
+from .timing import get_tracer, COOKIE_DETECTION, TYPING, LOGIN_CONFIRMATION
+from .logger import get_logger
+
+
+log = get_logger(__name__)
 
 
 class PageHandler:
     """Handle page load events and automation flows"""
     
-    def __init__(self, window):
+    def __init__(self, window, event_bus, session_cache=None, consent_preseed=None, clock=None,
+                 credentials_manager=None, input_mode=INPUT_MODE, storage_gate=None, strategy_engine=None):
         """
         Initialize page handler
         
         Args:
             window: pywebview window object
+            event_bus: EventBus receiving events pushed by page scripts
+            session_cache: Optional SessionCache used to skip the login flow
+            consent_preseed: Optional ConsentPreseed that stores the cookie choice up front
+            clock: Clock for waits and background steps (defaults to the bus clock)
+            credentials_manager: CredentialsManager holding the account to log in
+                                 (defaults to one loaded from credentials.json)
+            input_mode: 'inject', 'inject_only' or 'keyboard' (see INPUT_MODE)
+            storage_gate: Optional StorageGate shared with the other windows of the loop
+            strategy_engine: Optional StrategyEngine shared with the other windows
+                             (defaults to one bound to this window)
         """
-        self.window = window
-        self.credentials_manager = CredentialsManager()
-        self.keyboard_automation = KeyboardAutomation()
-        self.login_detector = LoginButtonDetector(window)
+        self.event_bus = event_bus
+        self.clock = clock or event_bus.clock
+        # Every component talks to the page through the deadline-bounded bridge
+        self.window = Bridge(window, self.clock)
+        self.session_cache = session_cache
+        self.session_restore_attempted = False
+        self.consent_preseed = consent_preseed
+        self.storage_gate = storage_gate
+        self.tracer = get_tracer()
+        self.confirmation_span = None
+        self.login_outcome = None
+        self.pipeline = None
+        self.input_mode = input_mode
+        # Set once the flow reached a final result (logged in or given up)
+        self.flow_done = threading.Event()
+        self.flow_result = None
+        self.strategy_engine = strategy_engine or StrategyEngine(self.window)
+        self.keyboard_automation = KeyboardAutomation(self.strategy_engine, self.clock)
+        self.login_detector = LoginButtonDetector(
+            self.window, event_bus, self.strategy_engine, self.clock
+        )
+        self.element_waiter = ElementWaiter(self.window, event_bus, self.strategy_engine)
+        self.login_confirmation = LoginConfirmation(
+            self.window, event_bus, self.strategy_engine, self.clock
+        )
+        self.dom_scanner = DomScanner(self.window)
         
         # Load credentials
-        if not self.credentials_manager.load_credentials():
-            print("Failed to load credentials")
+        if credentials_manager:
+            self.credentials_manager = credentials_manager
+        else:
+            self.credentials_manager = CredentialsManager()
+            if not self.credentials_manager.load_credentials():
+                log.error("Failed to load credentials")
     
-    def handle_cookie_banner(self):
-        """Handle cookie banner - multiple detection methods"""
-        js_code = """
-        (function() {
-            try {
-                console.log('=== COOKIE DETECTION DEBUG ===');
-                
-                // Method 1: Direct XPath and click
-                var element = document.evaluate('/html/body/div[1]/div/div[2]/div[3]', document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
-                if (element) {
-                    element.click();
-                    console.log('[OK] Method 1 (XPath) - Element clicked successfully');
-                    return {method: 'xpath', found: true};
-                }
-                console.log('[FAIL] Method 1 (XPath) - Element not found');
-                
-                // Method 2: CSS Selector - div.ds-button
-                var elem2 = document.querySelector('div.ds-button');
-                if (elem2) {
-                    elem2.click();
-                    console.log('[OK] Method 2 (CSS div.ds-button) - clicked');
-                    return {method: 'css_selector', found: true};
-                }
-                console.log('[FAIL] Method 2 - not found');
-                
-                // Method 3: Cookie banner class
-                var elem3 = document.querySelector('.cookie_banner-accept-essential-button');
-                if (elem3) {
-                    elem3.click();
-                    console.log('[OK] Method 3 (cookie_banner class) - clicked');
-                    return {method: 'css_class', found: true};
-                }
-                console.log('[FAIL] Method 3 - not found');
-                
-                // Method 4: Button with "necessary" text
-                var buttons = document.querySelectorAll('button');
-                for (var i = 0; i < buttons.length; i++) {
-                    var text = buttons[i].textContent.toLowerCase();
-                    if (text.includes('necessary') || text.includes('only')) {
-                        buttons[i].click();
-                        console.log('[OK] Method 4 (button text) - clicked');
-                        return {method: 'button_text', found: true};
-                    }
-                }
-                console.log('[FAIL] Method 4 - no button with necessary text');
-                
-                // Method 5: Any DIV with "necessary" text
-                var allDivs = document.querySelectorAll('div');
-                for (var i = 0; i < allDivs.length; i++) {
-                    var text = allDivs[i].textContent.toLowerCase();
-                    if (text.includes('necessary') && text.length < 100) {
-                        allDivs[i].click();
-                        console.log('[OK] Method 5 (div text) - clicked');
-                        return {method: 'div_text', found: true};
-                    }
-                }
-                console.log('[FAIL] Method 5 - no div with necessary text');
-                
-                console.log('[WARN] No cookie banner found with any method');
-                return {method: 'not_found', found: false};
-                
-            } catch (e) {
-                console.error('Error:', e.message);
-                return {method: 'error', found: false, error: e.message};
-            }
-        })();
+    def finish_flow(self, status, detail=''):
+        """
+        Record the final result of the flow
+        
+        Args:
+            status: 'session', a login outcome (success, bad_credentials,
+                    captcha, timeout), 'cancelled' or 'failed'
+            detail: What decided the result
+        """
+        self.release_storage()
+        self.strategy_engine.sync()
+        self.flow_result = {'status': status, 'detail': detail}
+        self.flow_done.set()
+    
+    def claim_storage(self, timeout=ACCOUNT_STORAGE_WAIT):
         """
+        Take the shared storage gate before the page may write a session
         
+        Args:
+            timeout: Maximum seconds to wait for the other windows
+            
+        Returns:
+            True if the gate is held (or there is none), False on timeout
+        """
+        if not self.storage_gate:
+            return True
+        holder = self.credentials_manager.get_username()
+        if self.storage_gate.acquire(holder, timeout, self.window.token):
+            return True
+        log.warning(f"⚠️  Shared storage still held by {self.storage_gate.holder}")
+        return False
+    
+    def restore_storage(self, timeout=ACCOUNT_STORAGE_WAIT):
+        """
+        Take the shared storage gate and put this account's saved session back
+        
+        A window kept open after its login had its session wiped when it
+        released the gate; this writes the snapshot into the live page (no
+        reload) for as long as the gate is held. Pair with release_storage().
+        
+        Args:
+            timeout: Maximum seconds to wait for the other windows
+            
+        Returns:
+            True if the session is in storage (or there is no gate), False otherwise
+        """
+        if not self.storage_gate:
+            return True
+        if not self.claim_storage(timeout):
+            return False
+        if self.session_cache and self.session_cache.restore(self.window):
+            return True
+        self.release_storage()
+        return False
+    
+    def release_storage(self):
+        """Wipe this account's state from the shared storage and release the gate"""
+        if not self.storage_gate:
+            return
+        holder = self.credentials_manager.get_username()
+        if self.storage_gate.holder != holder:
+            return
+        try:
+            if self.window.token.cancelled:
+                # The flow is over; the wipe still has to reach the page
+                self.window.new_flow()
+            if self.session_cache:
+                self.session_cache.wipe(self.window)
+        finally:
+            self.storage_gate.release(holder)
+    
+    def handle_cookie_banner(self):
+        """Handle cookie banner - ranked config selectors, then the scored scan"""
         try:
-            print("[COOKIE] Detecting cookie banner (trying all methods)...")
-            result = self.window.evaluate_js(js_code)
+            log.info("[COOKIE] Detecting cookie banner...")
+            with self.tracer.span(COOKIE_DETECTION) as span:
+                result = self.strategy_engine.locate(COOKIE_TARGET, 'click', self.window)
+                if not result.get('found'):
+                    result = self.dom_scanner.click_best(COOKIE_TARGET)
+                span.set(method=result.get('method', 'unknown'))
+                span.ok = bool(result.get('found'))
             
             if result and result.get('found'):
-                print(f"[SUCCESS] Cookie banner clicked!")
-                print(f"   Method: {result.get('method', 'unknown')}")
-                time.sleep(COOKIE_PROCESSING_DELAY)
-                time.sleep(1.0)
+                log.info(f"[SUCCESS] Cookie banner clicked!")
+                log.info(f"   Method: {result.get('method', 'unknown')}")
+                # Continue as soon as the banner is gone instead of sleeping
+                if not self.element_waiter.wait_for_gone(
+                    COOKIE_TARGET, COOKIE_DISMISS_TIMEOUT, BANNER_DISMISSED
+                ):
+                    log.warning("⚠️  Cookie banner still visible")
+                    return False
                 return True
             else:
-                print("⚠️  Cookie banner not found with any method")
+                log.warning("⚠️  Cookie banner not found")
                 return True  # Continue anyway
                 
         except Exception as e:
-            print(f"⚠️  Error: {e}")
-            import traceback
-            traceback.print_exc()
+            log.warning(f"⚠️  Error: {e}", exc_info=True)
             return False
     
     def validate_credentials_entered(self):
@@ -124,111 +200,330 @@ class PageHandler:
         Returns:
             True if both email and password fields have content, False otherwise
         """
-        check_js = """
-        function validateCredentialsEntered() {
-            const emailInputs = [
-                document.querySelector('input[type="text"]'),
-                document.querySelector('input[type="email"]'),
-                document.querySelector('input[placeholder*="email"]')
-            ];
-            
-            const passwordInputs = [
-                document.querySelector('input[type="password"]')
-            ];
-            
-            let emailHasValue = false;
-            let passwordHasValue = false;
-            
-            for (let input of emailInputs) {
-                if (input && input.value && input.value.trim().length > 0) {
-                    emailHasValue = true;
-                    break;
-                }
-            }
-            
-            for (let input of passwordInputs) {
-                if (input && input.value && input.value.trim().length > 0) {
-                    passwordHasValue = true;
-                    break;
-                }
-            }
-            
-            return {
-                emailFilled: emailHasValue,
-                passwordFilled: passwordHasValue,
-                bothFilled: emailHasValue && passwordHasValue
-            };
-        }
-        return validateCredentialsEntered();
-        """
-        
         try:
-            result = self.window.evaluate_js(check_js)
+            result = self.keyboard_automation.check_credentials(self.window)
             if result:
-                print(f"📝 Email field filled: {result.get('emailFilled', False)}")
-                print(f"📝 Password field filled: {result.get('passwordFilled', False)}")
+                log.info(f"📝 Email field filled: {result.get('emailFilled', False)}")
+                log.info(f"📝 Password field filled: {result.get('passwordFilled', False)}")
                 return result.get('bothFilled', False)
             return False
         except Exception as e:
-            print(f"Error validating credentials: {e}")
+            log.error(f"Error validating credentials: {e}")
             return False
     
     def on_page_loaded(self):
         """Handle page loaded event"""
-        time.sleep(COOKIE_HANDLER_DELAY)
+        # A new document supersedes whatever flow ran on the previous one
+        token = self.window.new_flow()
+        continues = False
+        try:
+            continues = self.run_page_flow()
+        except FlowCancelled as e:
+            log.info(f"[FLOW] Page flow cancelled: {e}")
+            self.flow_cancelled(token, e)
+            continues = True
+        except Exception as e:
+            log.error(f"[ERROR] Page flow failed: {e}")
+            self.finish_flow('failed', str(e))
+        finally:
+            # Every way out of the flow reports a result, so nobody waits on flow_done forever
+            if not continues and not self.flow_done.is_set():
+                self.finish_flow('failed', 'page flow ended without a result')
+    
+    def flow_cancelled(self, token, error):
+        """
+        Finish a cancelled flow, unless a newer page load took it over
+        
+        Args:
+            token: CancelToken of the cancelled flow
+            error: The FlowCancelled raised
+        """
+        if token is self.window.token:
+            self.finish_flow('cancelled', str(error))
+    
+    def run_page_flow(self):
+        """
+        Prepare the freshly loaded page and start the login steps
         
-        # Handle cookie banner
-        self.handle_cookie_banner()
+        Returns:
+            True if the flow goes on after this call (another page load or
+            the login thread reports the result), False if it ended here
+        """
+        # The bootstrap page only seeds cookie consent and navigates away
+        if self.consent_preseed and self.consent_preseed.handle_bootstrap(self.window):
+            return True
+        
+        # Install the helper bundle for this document before the first step
+        install_page_helpers(self.window)
+        
+        # Wait until the page has rendered the banner, the login form or the chat
+        ready = self.element_waiter.wait_for_any([COOKIE_TARGET, EMAIL_TARGET, CHAT_TARGET])
         
-        # Start credential entry in a separate thread
+        # A valid or restored session skips the login flow entirely
+        if self.check_session(ready):
+            return True
+        # Other windows may use the storage until this one clicks login
+        self.release_storage()
+        
+        # With a working preseed the cookie banner never renders
+        banner_shown = bool(ready.get(COOKIE_TARGET) or not ready)
+        if self.consent_preseed:
+            self.consent_preseed.record(FALLBACK_PATH if banner_shown else PRESEED_PATH)
+        
+        # Report typed fields through the bridge
+        self.element_waiter.watch_fields()
+        
+        # Run the login steps in a separate thread
         if self.credentials_manager.is_valid():
-            print("[AUTH] Starting credential entry automation...")
-            threading.Thread(
-                target=self.enter_credentials_and_login,
-                daemon=True
-            ).start()
+            log.info("[AUTH] Starting credential entry automation...")
+            self.clock.spawn(self.enter_credentials_and_login, banner_shown)
+            return True
+        log.error("[ERROR] Credentials are not valid")
+        self.finish_flow('failed', 'invalid credentials')
+        return False
+    
+    def check_session(self, ready):
+        """
+        Use the session cache to decide whether the login flow can be skipped
+        
+        Args:
+            ready: Targets reported by the readiness observer
+            
+        Returns:
+            True if logged in (or reloading with a restored session), False otherwise
+        """
+        if not self.session_cache:
+            return False
+        
+        if ready.get(CHAT_TARGET) and not ready.get(EMAIL_TARGET):
+            log.info("[SESSION] Already logged in, skipping login flow")
+            self.session_cache.save(self.window)
+            self.finish_flow('session')
+            return True
+        
+        if not self.session_restore_attempted and self.session_cache.has_snapshot():
+            self.session_restore_attempted = True
+            if self.session_cache.restore(self.window):
+                log.info("[SESSION] Reloading with restored session...")
+                self.window.evaluate_js('location.reload();')
+                return True
+        elif self.session_restore_attempted and self.session_cache.has_snapshot():
+            log.info("[SESSION] Saved session expired, logging in")
+            self.session_cache.clear()
+        
+        return False
+    
+    def save_session(self):
+        """Save the session once the chat view is ready"""
+        try:
+            if self.element_waiter.wait_for(CHAT_TARGET):
+                self.session_cache.save(self.window)
+        except FlowCancelled:
+            log.info("[SESSION] Page changed before the session could be saved")
+    
+    def on_login_outcome(self, outcome):
+        """
+        Record the outcome of a login click
+        
+        Args:
+            outcome: LoginOutcome reported by the confirmation
+        """
+        self.login_outcome = outcome
+        if self.confirmation_span:
+            self.confirmation_span.set(outcome=outcome.outcome, method=outcome.method)
+            self.confirmation_span.end(ok=outcome.ok)
+            self.confirmation_span = None
+            self.tracer.flush()
+        
+        if outcome.outcome == SUCCESS:
+            log.info(f"[SUCCESS] Authenticated {outcome.elapsed * 1000:.0f} ms after click "
+                     f"(detected by {outcome.detail})")
+        elif outcome.outcome == BAD_CREDENTIALS:
+            log.error(f"[ERROR] Login rejected: {outcome.detail}")
+        elif outcome.outcome == CAPTCHA:
+            log.error(f"[ERROR] Captcha shown after login click ({outcome.detail}), solve it in the window")
         else:
-            print("[ERROR] Credentials are not valid")
+            log.warning(f"⚠️  No login reaction {outcome.elapsed:.1f}s after clicking "
+                        f"{outcome.method} - wrong element or slow page")
+    
+    def inject_credentials(self, email, password):
+        """
+        Fill both fields by direct value injection
+        
+        Args:
+            email: Email address
+            password: Password
+            
+        Returns:
+            True if both fields were filled and verified, False otherwise
+        """
+        if not self.element_waiter.wait_for(EMAIL_TARGET):
+            log.error("[ERROR] Email field did not appear")
+            return False
+        if not self.element_waiter.wait_for(PASSWORD_TARGET):
+            log.error("[ERROR] Password field did not appear")
+            return False
+        
+        with self.tracer.span(TYPING, method='inject') as span:
+            result = self.keyboard_automation.inject_credentials(self.window, email, password)
+            span.ok = bool(result.get('bothFilled'))
+        if result.get('bothFilled'):
+            return True
+        
+        log.warning(f"⚠️  Injection not verified (email: {result.get('emailFilled', False)}, "
+              f"password: {result.get('passwordFilled', False)})")
+        return False
+    
+    def type_field(self, target, text):
+        """
+        Fill one field with OS-level keyboard typing
+        
+        Args:
+            target: EMAIL_TARGET or PASSWORD_TARGET
+            text: Text to type
+            
+        Returns:
+            True if the field was typed, False otherwise
+        """
+        name = 'Email' if target == EMAIL_TARGET else 'Password'
+        if not self.element_waiter.wait_for(target):
+            log.error(f"[ERROR] {name} field did not appear")
+            return False
+        filled = self.event_bus.expect(
+            FIELD_FILLED, lambda payload: payload.get('field') == target
+        )
+        if target == EMAIL_TARGET:
+            success = self.keyboard_automation.type_email(self.window, text)
+        else:
+            success = self.keyboard_automation.type_password(self.window, text)
+        if not success:
+            filled.cancel()
+            log.error(f"[ERROR] Failed to enter {target}")
+            return False
+        if filled.wait(ELEMENT_READY_GRACE, self.window.token) is None:
+            log.warning(f"⚠️  Page did not report the {target} field as filled")
+        
+        log.info(f"[SUCCESS] {name} entered")
+        return True
     
-    def enter_credentials_and_login(self):
-        """Enter credentials and attempt to login"""
+    def fill_email(self):
+        """
+        Fill the email field; injection fills the password in the same call
+        
+        Returns:
+            True if the email field was filled
+        """
+        email = self.credentials_manager.get_username()
+        password = self.credentials_manager.get_password()
+        if self.input_mode != 'keyboard' and self.inject_credentials(email, password):
+            log.info("[SUCCESS] Credentials injected")
+            self.pipeline.mark(PASSWORD_FILLED)
+            return True
+        if self.input_mode == 'inject_only':
+            # OS key events go to the focused window, which may be another account's
+            return False
+        if self.input_mode == 'inject':
+            log.info("[INFO] Falling back to typing")
+        return self.type_field(EMAIL_TARGET, email)
+    
+    def fill_password(self):
+        """Type the password field (injected again in inject_only mode)"""
+        password = self.credentials_manager.get_password()
+        if self.input_mode == 'inject_only':
+            return self.inject_credentials(self.credentials_manager.get_username(), password)
+        return self.type_field(PASSWORD_TARGET, password)
+    
+    def click_login(self):
+        """
+        Wait for the login button and click it once the fields are verified
+        
+        Returns:
+            True if the button was clicked
+        """
+        # The login writes this account's session into the shared storage
+        if not self.claim_storage():
+            return False
+        log.info("[INFO] Waiting for login button to become ready...")
+        clicked = self.login_detector.auto_click_after_credentials(
+            self.validate_credentials_entered
+        )
+        if clicked:
+            self.confirmation_span = self.tracer.span(LOGIN_CONFIRMATION)
+        return clicked
+    
+    def confirm_login(self):
+        """
+        Wait for the typed outcome of the login click
+        
+        Bad credentials and captchas end the flow, since clicking again
+        cannot fix them; a timeout is retried from the click.
+        
+        Returns:
+            True if the login went through
+        """
+        outcome = self.login_confirmation.wait(
+            self.login_detector.clicked_at, self.login_detector.clicked_method
+        )
+        self.on_login_outcome(outcome)
+        if not outcome.ok:
+            # No session was written; let the other windows go before a retry
+            self.release_storage()
+        if outcome.outcome in (BAD_CREDENTIALS, CAPTCHA):
+            self.pipeline.abort(outcome.outcome)
+        return outcome.ok
+    
+    def enter_credentials_and_login(self, banner_shown=True):
+        """
+        Run the login steps, overlapping independent ones and retrying a
+        failed step from its checkpoint
+        
+        Args:
+            banner_shown: False if the page rendered without a cookie banner
+        """
+        token = self.window.token
         try:
             # Get credentials
             email = self.credentials_manager.get_username()
             password = self.credentials_manager.get_password()
             
             if not email or not password:
-                print("[ERROR] Missing email or password")
-                return
-            
-            # Type email
-            success = self.keyboard_automation.type_email(self.window, email)
-            if not success:
-                print("[ERROR] Failed to enter email")
-                return
-            
-            print("[SUCCESS] Email entered")
-            time.sleep(0.5)
-            
-            # Type password
-            success = self.keyboard_automation.type_password(self.window, password)
-            if not success:
-                print("[ERROR] Failed to enter password")
+                log.error("[ERROR] Missing email or password")
+                self.finish_flow('failed', 'missing credentials')
                 return
             
-            print("[SUCCESS] Password entered")
-            
-            # Wait 1 second after typing password (async wait, no validation check)
-            print("[INFO] Waiting 1 second for form to process...")
-            time.sleep(1.0)
+            # Injection sets values under the banner; OS typing needs the
+            # banner gone so its click cannot steal focus mid-word. The banner
+            # may cover the login button, so the click always waits for it.
+            fill_after = [COOKIE_DISMISSED] if self.input_mode == 'keyboard' else []
+            self.pipeline = LoginPipeline(
+                [
+                    Step(COOKIE_DISMISSED, self.handle_cookie_banner, required=False),
+                    Step(EMAIL_FILLED, self.fill_email, after=fill_after),
+                    Step(PASSWORD_FILLED, self.fill_password, after=[EMAIL_FILLED]),
+                    Step(BUTTON_CLICKED, self.click_login, after=[COOKIE_DISMISSED, PASSWORD_FILLED]),
+                    Step(AUTHENTICATED, self.confirm_login, after=[BUTTON_CLICKED])
+                ],
+                lambda: self.element_waiter.page_state(PROBE_TARGETS),
+                self.clock,
+                self.window.token
+            )
+            if not banner_shown:
+                log.info("[COOKIE] No cookie banner rendered, skipping")
+                self.pipeline.mark(COOKIE_DISMISSED)
             
-            print("[SUCCESS] All credentials entered successfully!")
-            print("[INFO] Attempting to locate and click login button...")
+            if self.pipeline.run():
+                log.info("[SUCCESS] Login flow completed")
+                if self.session_cache:
+                    self.save_session()
             
-            # Try to auto-click login button (no validation, just click)
-            self.login_detector.auto_click_after_credentials(
-                lambda: True  # Always return True, skip validation check
-            )
+            if self.login_outcome:
+                self.finish_flow(self.login_outcome.outcome, self.login_outcome.detail)
+            else:
+                self.finish_flow('failed', f"stopped at {self.pipeline.stopped}")
             
+        except FlowCancelled as e:
+            log.info(f"[FLOW] Login flow cancelled: {e}")
+            self.flow_cancelled(token, e)
         except Exception as e:
-            print(f"Error during credential entry and login: {e}")
+            log.error(f"Error during credential entry and login: {e}")
+            self.finish_flow('failed', str(e))
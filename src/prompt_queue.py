@@ -0,0 +1,483 @@
+"""
+Prompt queue module - sends a batch of prompts through the logged-in chat window
+
+Each prompt is set in the chat input and sent by one helper call; an observer
+in the page then streams the answer through the bridge and reports once it
+stopped generating, so the next prompt follows without fixed sleeps. Finished
+items are appended to a progress file, and a later run skips the prompt ids
+recorded there as answered, which resumes the batch after a crash even if
+prompts were added, removed or reordered in between.
+"""
+import itertools
+import json
+import os
+import re
+import time
+from config import (
+    ACCOUNT_STORAGE_WAIT,
+    PROMPT_RESPONSE_TIMEOUT,
+    PROMPT_SEND_TIMEOUT,
+    PROMPT_SETTLE_MS,
+    PROMPT_MAX_ATTEMPTS,
+    ELEMENT_READY_GRACE,
+    CHAT_STOP_BUTTON_SELECTORS,
+    ASSISTANT_MESSAGE_SELECTORS,
+    THROTTLE_BANNER_SELECTORS,
+    THROTTLE_PATTERNS
+)
+from .bridge import FlowCancelled
+from .clock import REAL_CLOCK
+from .element_waiter import CHAT_TARGET, SEND_TARGET
+from .js_api import PROMPT_CHUNK, PROMPT_DONE
+from .page_bundle import call_helper
+from .response_cache import cache_key
+from .response_stream import ResponseStream
+from .timing import get_tracer, quantile, PROMPT_RESPONSE
+from .logger import get_logger
+
+
+log = get_logger(__name__)
+
+
+# Prompt outcomes
+DONE = 'done'
+TIMEOUT = 'timeout'
+NOT_SENT = 'not_sent'
+THROTTLED = 'throttled'
+
+# Hex digits of the prompt hash used as the id of a prompt without one
+PROMPT_ID_LENGTH = 16
+
+# Conversation id in the chat URL (https://chat.deepseek.com/a/chat/s/<id>)
+CONVERSATION_PATTERN = re.compile(r'/chat/s/([\w-]+)')
+
+
+def conversation_id_from(url):
+    """Conversation id of a chat URL, None if the URL has none"""
+    match = CONVERSATION_PATTERN.search(url or '')
+    return match.group(1) if match else None
+
+
+def read_prompts(path):
+    """
+    Stream prompts from a file
+
+    Prompts without an id get one derived from their text (and mode), with
+    the occurrence appended from the second copy on ("<hash>-2"), so ids stay
+    put when other lines are added, removed or moved.
+
+    Args:
+        path: JSON Lines file of {"id", "prompt"} objects (.jsonl),
+              otherwise a text file with one prompt per line
+
+    Yields:
+        dicts with id, prompt and (from .jsonl lines that have one) a mode
+        dict of flags the answer depends on; blank lines are skipped
+    """
+    structured = path.endswith('.jsonl')
+    occurrences = {}
+
+    def content_id(prompt, mode=None):
+        key = cache_key(prompt, mode)[:PROMPT_ID_LENGTH]
+        occurrences[key] = occurrences.get(key, 0) + 1
+        return key if occurrences[key] == 1 else f"{key}-{occurrences[key]}"
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if not structured:
+                yield {'id': content_id(line), 'prompt': line}
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                log.warning(f"⚠️  Skipping unreadable prompt on line {number} of {path}")
+                continue
+            if not entry.get('prompt'):
+                log.warning(f"⚠️  Skipping line {number} of {path}: prompt missing")
+                continue
+            item = {'id': str(entry.get('id') or content_id(entry['prompt'], entry.get('mode'))),
+                    'prompt': entry['prompt']}
+            if entry.get('mode'):
+                item['mode'] = entry['mode']
+            yield item
+
+
+class PromptResult:
+    """Outcome of one prompt"""
+
+    def __init__(self, index, prompt_id, outcome, latency, first_token=None, response='', attempts=1,
+                 tokens_per_second=None, conversation_id=None, cached=False, detail=None, sent_at=None):
+        """
+        Initialize the result
+
+        Args:
+            index: Position of the prompt in the batch
+            prompt_id: Prompt id
+            outcome: DONE, TIMEOUT, NOT_SENT or THROTTLED
+            latency: Seconds from send to the finished answer
+            first_token: Seconds from send to the first answer text
+            response: Answer text
+            attempts: Attempts used
+            tokens_per_second: Approximate generation speed after the first token
+            conversation_id: Chat conversation the answer belongs to
+            cached: True if the answer came from the response cache
+            detail: Reason reported by the page (e.g. the throttling banner text)
+            sent_at: Unix time the last attempt was sent (or the cache answered)
+        """
+        self.index = index
+        self.prompt_id = prompt_id
+        self.outcome = outcome
+        self.latency = latency
+        self.first_token = first_token
+        self.response = response
+        self.attempts = attempts
+        self.tokens_per_second = tokens_per_second
+        self.conversation_id = conversation_id
+        self.cached = cached
+        self.detail = detail
+        self.sent_at = sent_at
+
+    @property
+    def ok(self):
+        """True if the answer finished generating"""
+        return self.outcome == DONE
+
+    def to_dict(self):
+        """Progress record (without the answer text)"""
+        return {
+            'index': self.index,
+            'id': self.prompt_id,
+            'outcome': self.outcome,
+            'latency': round(self.latency, 3),
+            'first_token': round(self.first_token, 3) if self.first_token is not None else None,
+            'tokens_per_second': round(self.tokens_per_second, 1) if self.tokens_per_second is not None else None,
+            'attempts': self.attempts,
+            'cached': self.cached
+        }
+
+    def __repr__(self):
+        return f"PromptResult({self.prompt_id!r}, {self.outcome!r}, {self.latency:.3f}s)"
+
+
+class PromptQueue:
+    """Send prompts one after the other and record per-prompt latency"""
+
+    def __init__(self, window, event_bus, strategy_engine, clock=None, progress_file=None,
+                 timeout=PROMPT_RESPONSE_TIMEOUT, max_attempts=PROMPT_MAX_ATTEMPTS,
+                 transcripts=None, account=None, cache=None, storage=None):
+        """
+        Initialize the queue
+
+        Args:
+            window: Logged-in pywebview window (a Bridge carries the flow's cancel token)
+            event_bus: EventBus receiving events pushed through the js_api bridge
+            strategy_engine: StrategyEngine supplying ranked locator methods
+            clock: Clock measuring latency (real time by default)
+            progress_file: JSON Lines file of finished items, used to resume (optional)
+            timeout: Maximum seconds from send to a finished answer
+            max_attempts: Attempts per prompt before it is recorded as failed
+            transcripts: TranscriptStore receiving every prompt/response pair (optional)
+            account: Account name recorded with each transcript
+            cache: ResponseCache answering repeated prompts without the page (optional)
+            storage: PageHandler of a window sharing the browser storage with
+                     others (optional); its session is restored for each send
+        """
+        self.window = window
+        self.event_bus = event_bus
+        self.strategy_engine = strategy_engine
+        self.clock = clock or REAL_CLOCK
+        self.progress_file = progress_file
+        self.timeout = timeout
+        self.max_attempts = max(1, max_attempts)
+        self.transcripts = transcripts
+        self.account = account
+        self.cache = cache
+        self.storage = storage
+        self.tracer = get_tracer()
+        self.results = []
+        self.resumed = 0
+        self.started = None
+        self.finished = None
+        self._watch_ids = itertools.count(1)
+
+    def completed(self):
+        """
+        Prompt ids recorded as answered in the progress file
+
+        Failed items are recorded too, but are sent again by the next run.
+
+        Returns:
+            Set of ids of the prompts that already finished
+        """
+        done = set()
+        if not self.progress_file:
+            return done
+        try:
+            with open(self.progress_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        if record['outcome'] == DONE:
+                            done.add(record['id'])
+                    except (ValueError, KeyError, TypeError):
+                        # A crash can leave a torn last line
+                        continue
+        except FileNotFoundError:
+            pass
+        return done
+
+    def _record(self, result):
+        """Append one finished item to the progress file"""
+        if not self.progress_file:
+            return
+        try:
+            with open(self.progress_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(result.to_dict()) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            log.warning(f"⚠️  Could not record prompt progress: {e}")
+
+    def stream(self, prompt):
+        """
+        Send one prompt and return its answer as it renders
+
+        Args:
+            prompt: Prompt text
+
+        Returns:
+            ResponseStream yielding the text appended to the answer; its
+            outcome is NOT_SENT when the prompt could not be submitted and
+            THROTTLED when a throttling banner was shown
+        """
+        watch_id = next(self._watch_ids)
+        spec = {
+            'watch_id': watch_id,
+            'event': PROMPT_DONE,
+            'chunk_event': PROMPT_CHUNK,
+            'prompt': prompt,
+            'timeout_ms': int(self.timeout * 1000),
+            'send_timeout_ms': int(PROMPT_SEND_TIMEOUT * 1000),
+            'settle_ms': PROMPT_SETTLE_MS,
+            'methods': {
+                target: self.strategy_engine.ranked_methods(target)
+                for target in (CHAT_TARGET, SEND_TARGET)
+            },
+            'stop_selectors': CHAT_STOP_BUTTON_SELECTORS,
+            'message_selectors': ASSISTANT_MESSAGE_SELECTORS,
+            'throttle_selectors': THROTTLE_BANNER_SELECTORS,
+            'throttle_patterns': THROTTLE_PATTERNS
+        }
+
+        # Listen before injecting: the first chunks may arrive before evaluate_js returns
+        stream = ResponseStream(
+            self.event_bus,
+            watch_id,
+            self.clock.now(),
+            PROMPT_SEND_TIMEOUT + self.timeout + ELEMENT_READY_GRACE,
+            getattr(self.window, 'token', None)
+        )
+        try:
+            submitted = call_helper(self.window, 'submit', spec)
+        except Exception as e:
+            log.error(f"Error submitting prompt: {e}")
+            submitted = None
+        submitted = submitted or {}
+        if not submitted.get('submitted'):
+            reason = submitted.get('reason', 'no answer')
+            log.warning(f"⚠️  Prompt not submitted: {reason}")
+            stream.abort(THROTTLED if reason == THROTTLED else NOT_SENT, submitted.get('detail'))
+        return stream
+
+    def cached(self, index, item):
+        """
+        Answer one batch item from the response cache without the page
+
+        Args:
+            index: Position of the item in the batch
+            item: dict with id and prompt
+
+        Returns:
+            PromptResult, None if the cache has no answer
+        """
+        if self.cache is None:
+            return None
+        started = self.clock.now()
+        sent_at = time.time()
+        entry = self.cache.get(item['prompt'], item.get('mode'))
+        if entry is None:
+            return None
+        return PromptResult(index, item['id'], DONE, self.clock.now() - started,
+                            response=entry['response'], attempts=0,
+                            conversation_id=entry.get('conversation_id'), cached=True,
+                            sent_at=sent_at)
+
+    def send(self, index, item):
+        """
+        Send one batch item through the page, retrying when it was not sent or timed out
+
+        A throttled item is not retried: sending again right away would only
+        prolong the throttling, so the caller decides when to resend it.
+
+        Args:
+            index: Position of the item in the batch
+            item: dict with id and prompt
+
+        Returns:
+            PromptResult
+        """
+        # Another window's send may hold the storage for up to one full answer
+        wait = ACCOUNT_STORAGE_WAIT + PROMPT_SEND_TIMEOUT + self.timeout
+        if self.storage is not None and not self.storage.restore_storage(wait):
+            return PromptResult(index, item['id'], NOT_SENT, 0.0, attempts=0,
+                                detail='session could not be restored')
+        span = self.tracer.span(PROMPT_RESPONSE, prompt=item['id'])
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                # Wall time for the transcript; latencies stay on the (possibly simulated) clock
+                sent_at = time.time()
+                stream = self.stream(item['prompt'])
+                stream.read()
+                if stream.outcome in (DONE, THROTTLED):
+                    break
+                log.warning(f"⚠️  Prompt {item['id']}: {stream.outcome} (attempt {attempt}/{self.max_attempts})")
+        finally:
+            if self.storage is not None:
+                self.storage.release_storage()
+        span.set(outcome=stream.outcome, attempts=attempt, first_token=stream.first_token,
+                 tokens_per_second=stream.tokens_per_second)
+        span.end(ok=stream.outcome == DONE)
+        conversation_id = conversation_id_from(stream.url)
+        if self.cache is not None and stream.outcome == DONE:
+            self.cache.put(item['prompt'], stream.text, item.get('mode'), conversation_id=conversation_id)
+        return PromptResult(index, item['id'], stream.outcome, stream.latency, stream.first_token,
+                            stream.text, attempt, stream.tokens_per_second, conversation_id,
+                            detail=stream.detail, sent_at=sent_at)
+
+    def run_one(self, index, item):
+        """
+        Answer one batch item from the cache, or else send it (see send())
+
+        Args:
+            index: Position of the item in the batch
+            item: dict with id and prompt
+
+        Returns:
+            PromptResult
+        """
+        return self.cached(index, item) or self.send(index, item)
+
+    def _transcribe(self, item, result):
+        """Append a prompt/response pair to the transcript store"""
+        if self.transcripts is None:
+            return
+        try:
+            self.transcripts.record_exchange(
+                result.conversation_id,
+                self.account,
+                item['prompt'],
+                result.response,
+                sent_at=result.sent_at,
+                prompt_id=item['id'],
+                outcome=result.outcome,
+                latency=result.latency,
+                first_token=result.first_token,
+                tokens_per_second=result.tokens_per_second,
+                cached=result.cached
+            )
+        except OSError as e:
+            log.warning(f"⚠️  Could not store transcript of prompt {item['id']}: {e}")
+
+    def collect(self, item, result, on_result=None):
+        """
+        Keep the result of one item: transcript, progress record and log line
+
+        Args:
+            item: dict with id and prompt
+            result: PromptResult of run_one
+            on_result: Optional function(item, PromptResult) called afterwards
+        """
+        self.results.append(result)
+        # Transcript before progress: a crash in between repeats the prompt rather than losing it
+        self._transcribe(item, result)
+        self._record(result)
+        source = 'cache' if result.cached else f"{result.latency:.1f}s"
+        log.info(f"[PROMPTS] #{result.index} {item['id']}: {result.outcome} ({source})")
+        if on_result:
+            on_result(item, result)
+
+    def run(self, prompts, on_result=None):
+        """
+        Send every prompt not finished by an earlier run
+
+        Args:
+            prompts: Iterable of dicts with id and prompt (see read_prompts)
+            on_result: Optional function(item, PromptResult) called per finished prompt
+
+        Returns:
+            The report dict (see report())
+        """
+        skip = self.completed()
+        self.started = self.clock.now()
+        try:
+            for index, item in enumerate(prompts):
+                if item['id'] in skip:
+                    self.resumed += 1
+                    continue
+                self.collect(item, self.run_one(index, item), on_result)
+        except FlowCancelled as e:
+            log.warning(f"[PROMPTS] Batch interrupted: {e}; the next run resumes after the last finished prompt")
+        self.finished = self.clock.now()
+        report = self.report()
+        self.print_report(report)
+        return report
+
+    def report(self):
+        """
+        Summarize throughput and latency
+
+        Returns:
+            dict with 'completed', 'failed', 'resumed' (skipped as already done),
+            'cached' (answered from the response cache), 'elapsed' (seconds),
+            'prompts_per_minute', latency quantiles and the median tokens/second
+            of the answers the page produced, plus the cache counters as 'cache'
+        """
+        answered = [result for result in self.results if result.ok and not result.cached]
+        latencies = sorted(result.latency for result in answered)
+        first_tokens = sorted(result.first_token for result in answered if result.first_token is not None)
+        speeds = sorted(result.tokens_per_second for result in answered if result.tokens_per_second is not None)
+        cached = sum(1 for result in self.results if result.cached)
+        completed = len(latencies) + cached
+        elapsed = ((self.finished or self.clock.now()) - self.started) if self.started is not None else 0.0
+        return {
+            'completed': completed,
+            'failed': len(self.results) - completed,
+            'resumed': self.resumed,
+            'cached': cached,
+            'elapsed': elapsed,
+            'prompts_per_minute': completed / elapsed * 60 if elapsed > 0 else 0.0,
+            'latency_p50': quantile(latencies, 0.5),
+            'latency_p95': quantile(latencies, 0.95),
+            'first_token_p50': quantile(first_tokens, 0.5),
+            'tokens_per_second_p50': quantile(speeds, 0.5),
+            'cache': self.cache.stats() if self.cache is not None else None
+        }
+
+    def print_report(self, report):
+        """Log the batch throughput and latency"""
+        log.info("=" * 60)
+        log.info(f"[PROMPTS] {report['completed']} answered, {report['failed']} failed, "
+                 f"{report['resumed']} already done, in {report['elapsed']:.1f}s "
+                 f"({report['prompts_per_minute']:.1f} prompts/minute)")
+        log.info(f"[PROMPTS] Latency p50 {report['latency_p50']:.2f}s, p95 {report['latency_p95']:.2f}s, "
+                 f"first token p50 {report['first_token_p50']:.2f}s, "
+                 f"{report['tokens_per_second_p50']:.1f} tokens/s p50")
+        if report['cache'] is not None:
+            cache = report['cache']
+            log.info(f"[PROMPTS] {report['cached']} answered from cache "
+                     f"({cache['memory_hits']} memory, {cache['disk_hits']} disk hits, {cache['misses']} misses, "
+                     f"{cache['entries']} entries, {cache['bytes'] / 1024:.0f} KB)")
+        log.info("=" * 60)
@@ -0,0 +1,431 @@
+"""
+Prompt scheduler module - shares prompt jobs between logged-in windows within per-account rate limits
+
+Each account has a token bucket that refills at PROMPT_RATE_PER_MINUTE and
+holds up to PROMPT_BURST tokens, and a window only sends when its account
+has a token. When the page shows a throttling or error banner, the account's
+rate is multiplied by THROTTLE_BACKOFF and the account pauses for a cooldown
+that doubles while the banners continue; every answered prompt then wins
+back THROTTLE_RECOVERY of the full rate. A throttled account slows down on
+its own instead of stalling every window. Prompts the response cache
+answers never reach the server and are handed out without a token.
+
+Jobs (one per prompts file) are served round robin, one prompt per job in
+turn, so a long job cannot starve a short one. The time each prompt waited
+for a window is recorded as a prompt_wait span, tagged with the queue depth
+at dispatch.
+"""
+import threading
+from collections import deque
+from config import (
+    PROMPT_RATE_PER_MINUTE,
+    PROMPT_BURST,
+    PROMPT_RESPONSE_TIMEOUT,
+    THROTTLE_BACKOFF,
+    THROTTLE_RECOVERY,
+    THROTTLE_COOLDOWN,
+    THROTTLE_COOLDOWN_MAX,
+    THROTTLE_MAX_REQUEUES
+)
+from .bridge import FlowCancelled
+from .clock import REAL_CLOCK
+from .prompt_queue import PromptResult, NOT_SENT, THROTTLED
+from .timing import get_tracer, quantile, PROMPT_WAIT
+from .logger import get_logger
+
+
+log = get_logger(__name__)
+
+
+# Refill rounding tolerance: 0.9999999 tokens count as one instead of waiting a few ulps
+TOKEN_EPSILON = 1e-9
+
+
+class TokenBucket:
+    """Send budget of one account, adapting its rate to throttling"""
+
+    def __init__(self, rate=PROMPT_RATE_PER_MINUTE / 60, burst=PROMPT_BURST, clock=None,
+                 backoff=THROTTLE_BACKOFF, recovery=THROTTLE_RECOVERY,
+                 cooldown=THROTTLE_COOLDOWN, cooldown_max=THROTTLE_COOLDOWN_MAX):
+        """
+        Start with a full bucket
+
+        Args:
+            rate: Tokens per second at full speed (the ceiling)
+            burst: Bucket size
+            clock: Clock the refill is measured with (real time by default)
+            backoff: Rate multiplier applied on throttling
+            recovery: Fraction of the full rate regained per answered prompt
+            cooldown: Seconds of pause after the first throttling in a row
+            cooldown_max: Longest pause in seconds
+        """
+        self.clock = clock or REAL_CLOCK
+        self.ceiling = rate
+        self.rate = rate
+        self.burst = burst
+        self.backoff = backoff
+        self.recovery = recovery
+        self.cooldown = cooldown
+        self.cooldown_max = cooldown_max
+        self.tokens = float(burst)
+        # Refill time; set in the future while the account pauses
+        self.updated = self.clock.now()
+        self.sent = 0
+        self.throttles = 0
+        self._streak = 0
+
+    def _refill(self):
+        now = self.clock.now()
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+        return now
+
+    def delay(self):
+        """Seconds until a token is available, 0.0 if one is"""
+        now = self._refill()
+        wait = max(0.0, self.updated - now)
+        if self.tokens < 1 - TOKEN_EPSILON:
+            wait += (1 - self.tokens) / self.rate
+        return wait
+
+    def take(self):
+        """
+        Spend a token
+
+        Returns:
+            True if a token was available, False (nothing spent) otherwise
+        """
+        if self.delay() > 0:
+            return False
+        self.tokens = max(0.0, self.tokens - 1)
+        self.sent += 1
+        return True
+
+    def throttled(self):
+        """
+        Cut the rate and pause the account
+
+        Returns:
+            Seconds of pause (doubling with every throttling in a row)
+        """
+        now = self._refill()
+        self._streak += 1
+        self.throttles += 1
+        self.rate = max(self.ceiling * self.recovery, self.rate * self.backoff)
+        pause = min(self.cooldown_max, self.cooldown * 2 ** (self._streak - 1))
+        # One token waits at the end of the pause to probe whether the limit lifted
+        self.tokens = 1.0
+        self.updated = now + pause
+        return pause
+
+    def succeeded(self):
+        """Win back part of the full rate after an answered prompt"""
+        self._refill()
+        self._streak = 0
+        self.rate = min(self.ceiling, self.rate + self.ceiling * self.recovery)
+
+
+class Worker:
+    """One logged-in window and the account it belongs to"""
+
+    def __init__(self, account, queue):
+        self.account = account
+        self.queue = queue
+        self.busy = False
+        self.closed = False
+
+
+class Job:
+    """Prompts of one submitter, sent in order"""
+
+    def __init__(self, job_id, on_result=None):
+        self.id = job_id
+        self.on_result = on_result
+        self.pending = deque()
+        self.results = []
+        self.throttled = 0
+
+
+class Ticket:
+    """One queued prompt and the span timing its wait"""
+
+    def __init__(self, index, item, enqueued, span, requeues=0):
+        self.index = index
+        self.item = item
+        self.enqueued = enqueued
+        self.span = span
+        self.requeues = requeues
+        # Cached answer, looked up once before the prompt waits for a token
+        self.looked_up = False
+        self.hit = None
+
+
+class PromptScheduler:
+    """Dispatch prompt jobs to windows, fairly between jobs and within each account's rate"""
+
+    def __init__(self, workers, clock=None, rate=PROMPT_RATE_PER_MINUTE / 60, burst=PROMPT_BURST,
+                 max_requeues=THROTTLE_MAX_REQUEUES):
+        """
+        Initialize the scheduler
+
+        Args:
+            workers: List of (account id, PromptQueue) pairs, one per logged-in
+                     window; windows of the same account share its bucket
+            clock: Clock for rates, pauses and waits (real time by default)
+            rate: Prompts per second one account may send at full speed
+            burst: Prompts an idle account may send back to back
+            max_requeues: Throttled sends of one prompt before it counts as failed
+        """
+        self.clock = clock or REAL_CLOCK
+        self.workers = [Worker(account, queue) for account, queue in workers]
+        self.buckets = {}
+        for worker in self.workers:
+            if worker.account not in self.buckets:
+                self.buckets[worker.account] = TokenBucket(rate, burst, self.clock)
+        self.max_requeues = max_requeues
+        self.tracer = get_tracer()
+        self.jobs = []
+        self.waits = []
+        self.max_depth = 0
+        self.started = None
+        self.finished = None
+        self._turns = deque()
+        self._changed = threading.Event()
+        self._lock = threading.Lock()
+
+    def _ticket(self, job, index, item, requeues=0):
+        span = self.tracer.span(PROMPT_WAIT, job=job.id, prompt=item['id'])
+        return Ticket(index, item, self.clock.now(), span, requeues)
+
+    def _depth(self):
+        return sum(len(job.pending) for job in self.jobs)
+
+    def add_job(self, job_id, prompts, on_result=None):
+        """
+        Queue a job
+
+        Args:
+            job_id: Job name (e.g. the prompts file)
+            prompts: Iterable of dicts with id and prompt (see read_prompts)
+            on_result: Optional function(item, PromptResult) called per finished prompt
+
+        Returns:
+            Job
+        """
+        job = Job(job_id, on_result)
+        with self._lock:
+            for index, item in enumerate(prompts):
+                job.pending.append(self._ticket(job, index, item))
+            self.jobs.append(job)
+            self._turns.append(job)
+            self.max_depth = max(self.max_depth, self._depth())
+        log.info(f"[SCHEDULER] Job {job_id}: {len(job.pending)} prompts queued")
+        self._changed.set()
+        return job
+
+    def stats(self):
+        """
+        Current queue and account state
+
+        Returns:
+            dict with 'depth' (queued prompts), 'jobs' (queued per job),
+            'busy' (windows sending) and per-account 'accounts' state
+        """
+        with self._lock:
+            return {
+                'depth': self._depth(),
+                'jobs': {job.id: len(job.pending) for job in self.jobs},
+                'busy': sum(1 for worker in self.workers if worker.busy),
+                'accounts': {
+                    account: {
+                        'rate_per_minute': bucket.rate * 60,
+                        'tokens': bucket.tokens,
+                        'sent': bucket.sent,
+                        'throttles': bucket.throttles
+                    }
+                    for account, bucket in self.buckets.items()
+                }
+            }
+
+    def _peek_ticket(self):
+        """Prompt _next_ticket() returns next, left in its queue"""
+        for job in self._turns:
+            if job.pending:
+                return job.pending[0]
+        return None
+
+    def _next_ticket(self):
+        """Next prompt, one job after the other"""
+        for _ in range(len(self._turns)):
+            job = self._turns[0]
+            self._turns.rotate(-1)
+            if job.pending:
+                return job, job.pending.popleft()
+        return None, None
+
+    def _dispatch(self):
+        """
+        Hand a prompt to every idle window whose account has a token
+
+        A prompt the response cache answers never reaches the server, so it
+        is handed out without a token.
+
+        Returns:
+            Seconds until the next token of an idle window, None if no idle
+            window is waiting for one
+        """
+        next_wait = None
+        with self._lock:
+            for worker in self.workers:
+                if worker.busy or worker.closed or not self._depth():
+                    continue
+                ticket = self._peek_ticket()
+                if not ticket.looked_up:
+                    ticket.hit = worker.queue.cached(ticket.index, ticket.item)
+                    ticket.looked_up = True
+                if ticket.hit is None:
+                    bucket = self.buckets[worker.account]
+                    delay = bucket.delay()
+                    if delay > 0:
+                        next_wait = delay if next_wait is None else min(next_wait, delay)
+                        continue
+                    bucket.take()
+                job, ticket = self._next_ticket()
+                worker.busy = True
+                self.waits.append(self.clock.now() - ticket.enqueued)
+                ticket.span.set(account=worker.account, depth=self._depth()).end()
+                # call_later rather than spawn: a VirtualClock runs spawned steps
+                # inline, which would serve the windows one after another
+                self.clock.call_later(0, self._serve, worker, job, ticket)
+        return next_wait
+
+    def _serve(self, worker, job, ticket):
+        """Send one prompt from a window and feed the outcome back to its account's bucket"""
+        item = ticket.item
+        try:
+            result = ticket.hit or worker.queue.send(ticket.index, item)
+        except FlowCancelled as e:
+            log.warning(f"⚠️  [SCHEDULER] Window of {worker.account} closed ({e}), prompt {item['id']} requeued")
+            with self._lock:
+                worker.closed = True
+                worker.busy = False
+                job.pending.appendleft(self._ticket(job, ticket.index, item, ticket.requeues))
+            self._changed.set()
+            return
+        except Exception as e:
+            log.error(f"[SCHEDULER] Error sending prompt {item['id']} from {worker.account}: {e}")
+            result = PromptResult(ticket.index, item['id'], NOT_SENT, 0.0, detail=str(e))
+
+        bucket = self.buckets[worker.account]
+        requeued = False
+        with self._lock:
+            if result.outcome == THROTTLED:
+                pause = bucket.throttled()
+                job.throttled += 1
+                if ticket.requeues < self.max_requeues:
+                    job.pending.appendleft(self._ticket(job, ticket.index, item, ticket.requeues + 1))
+                    requeued = True
+            elif result.ok and not result.cached:
+                bucket.succeeded()
+
+        if result.outcome == THROTTLED:
+            log.warning(f"⚠️  [SCHEDULER] {worker.account} throttled ({result.detail or 'banner'}): "
+                        f"pausing {pause:.0f}s, rate now {bucket.rate * 60:.1f}/minute")
+        if not requeued:
+            worker.queue.collect(item, result, job.on_result)
+            with self._lock:
+                job.results.append(result)
+        with self._lock:
+            worker.busy = False
+        self._changed.set()
+
+    def run(self):
+        """
+        Send every queued prompt
+
+        Returns once every job finished or no window is left open.
+
+        Returns:
+            The report dict (see report()), None without windows
+        """
+        if not self.workers:
+            log.error("[SCHEDULER] No logged-in window to send prompts from")
+            return None
+        self.started = self.clock.now()
+        while True:
+            self._changed.clear()
+            wait = self._dispatch()
+            with self._lock:
+                busy = any(worker.busy for worker in self.workers)
+                available = any(not worker.closed for worker in self.workers)
+                pending = self._depth()
+            if not busy and (not pending or not available):
+                break
+            self.clock.wait(self._changed, wait if wait is not None else PROMPT_RESPONSE_TIMEOUT)
+
+        self.finished = self.clock.now()
+        report = self.report()
+        self.print_report(report)
+        self.tracer.flush()
+        return report
+
+    def report(self):
+        """
+        Summarize throughput, queueing and throttling
+
+        Returns:
+            dict with 'completed', 'failed', 'unsent' (still queued when the
+            windows closed), 'cached', 'throttled' (throttling banners seen),
+            'elapsed' (seconds), 'prompts_per_minute', 'wait_p50' and
+            'wait_p95' (seconds queued), 'max_depth', and per-job 'jobs' and
+            per-account 'accounts' breakdowns
+        """
+        with self._lock:
+            jobs = {}
+            for job in self.jobs:
+                completed = sum(1 for result in job.results if result.ok)
+                jobs[job.id] = {
+                    'completed': completed,
+                    'failed': len(job.results) - completed,
+                    'throttled': job.throttled
+                }
+            results = [result for job in self.jobs for result in job.results]
+            waits = sorted(self.waits)
+            unsent = self._depth()
+            accounts = {
+                account: {'sent': bucket.sent, 'throttles': bucket.throttles, 'rate_per_minute': bucket.rate * 60}
+                for account, bucket in self.buckets.items()
+            }
+        completed = sum(1 for result in results if result.ok)
+        elapsed = ((self.finished or self.clock.now()) - self.started) if self.started is not None else 0.0
+        return {
+            'completed': completed,
+            'failed': len(results) - completed,
+            'unsent': unsent,
+            'cached': sum(1 for result in results if result.cached),
+            'throttled': sum(entry['throttled'] for entry in jobs.values()),
+            'elapsed': elapsed,
+            'prompts_per_minute': completed / elapsed * 60 if elapsed > 0 else 0.0,
+            'wait_p50': quantile(waits, 0.5),
+            'wait_p95': quantile(waits, 0.95),
+            'max_depth': self.max_depth,
+            'jobs': jobs,
+            'accounts': accounts
+        }
+
+    def print_report(self, report):
+        """Log the per-job and per-account results and the aggregate throughput"""
+        log.info("=" * 60)
+        for job_id, entry in report['jobs'].items():
+            log.info(f"  job {job_id:<30} {entry['completed']:>5} answered {entry['failed']:>4} failed "
+                     f"{entry['throttled']:>4} throttled")
+        for account, entry in report['accounts'].items():
+            log.info(f"  account {account:<26} {entry['sent']:>5} sent {entry['throttles']:>4} throttled "
+                     f"{entry['rate_per_minute']:6.1f}/minute")
+        log.info(f"[SCHEDULER] {report['completed']} answered, {report['failed']} failed, "
+                 f"{report['unsent']} unsent, {report['throttled']} throttled, in {report['elapsed']:.1f}s "
+                 f"({report['prompts_per_minute']:.1f} prompts/minute)")
+        log.info(f"[SCHEDULER] Queue wait p50 {report['wait_p50']:.1f}s, p95 {report['wait_p95']:.1f}s, "
+                 f"max depth {report['max_depth']}")
+        log.info("=" * 60)
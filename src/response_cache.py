@@ -0,0 +1,244 @@
+"""
+Response cache module - answers to identical prompts served without the page
+
+Entries are content addressed: the key is a hash of the normalized prompt and
+its mode flags, and each entry is one small JSON file named after its key.
+An in-memory LRU of recent entries sits in front of the directory. Entries
+expire after RESPONSE_CACHE_TTL seconds, and the least recently used files
+are removed once the directory grows past RESPONSE_CACHE_MAX_BYTES. Uses are
+tracked in memory and written to the files' mtimes in batches (on the next
+put and on close), so recency survives restarts without a disk write per hit.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from config import (
+    RESPONSE_CACHE_DIR,
+    RESPONSE_CACHE_TTL,
+    RESPONSE_CACHE_MAX_BYTES,
+    RESPONSE_CACHE_MEMORY_ENTRIES
+)
+from .logger import get_logger
+
+
+log = get_logger(__name__)
+
+
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_prompt(prompt):
+    """Unicode-normalize a prompt and collapse its whitespace (case is kept)"""
+    return WHITESPACE.sub(' ', unicodedata.normalize('NFC', prompt)).strip()
+
+
+def cache_key(prompt, mode=None):
+    """
+    Content address of a prompt
+
+    Args:
+        prompt: Prompt text
+        mode: Optional dict of mode flags the answer depends on
+
+    Returns:
+        Hex sha256 of the normalized prompt and the sorted mode flags
+    """
+    material = json.dumps([normalize_prompt(prompt), mode or {}], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Two-level (memory LRU, then disk) prompt -> response cache"""
+
+    def __init__(self, directory=RESPONSE_CACHE_DIR, ttl=RESPONSE_CACHE_TTL,
+                 max_bytes=RESPONSE_CACHE_MAX_BYTES, memory_entries=RESPONSE_CACHE_MEMORY_ENTRIES):
+        """
+        Open (or create) a cache
+
+        Args:
+            directory: Directory holding one file per entry
+            ttl: Seconds an entry stays valid
+            max_bytes: Size of the directory above which old entries are evicted
+            memory_entries: Entries kept in the in-memory LRU
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'expired': 0, 'evicted': 0}
+        self._memory = OrderedDict()
+        self._sizes = {}
+        self._used = {}
+        self._dirty = set()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def _scan(self):
+        """Learn the size and last use of every entry on disk"""
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                key = name[:-len('.json')]
+                self._sizes[key] = stat.st_size
+                self._used[key] = stat.st_mtime
+                self._bytes += stat.st_size
+
+    @property
+    def hits(self):
+        """Lookups answered from memory or disk"""
+        return self.counters['memory_hits'] + self.counters['disk_hits']
+
+    def stats(self):
+        """Counters plus the current number of entries and bytes on disk"""
+        with self._lock:
+            return dict(self.counters, entries=len(self._sizes), bytes=self._bytes)
+
+    def get(self, prompt, mode=None):
+        """
+        Look up the answer to a prompt
+
+        Args:
+            prompt: Prompt text
+            mode: Optional dict of mode flags
+
+        Returns:
+            The cached entry dict (response, created and any stored metadata),
+            None on a miss
+        """
+        key = cache_key(prompt, mode)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry['created'] <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self._touch(key, now)
+                    self.counters['memory_hits'] += 1
+                    return entry
+                self._remove(key)
+                self.counters['expired'] += 1
+                self.counters['misses'] += 1
+                return None
+            if key not in self._sizes:
+                self.counters['misses'] += 1
+                return None
+
+        entry = self._read(key)
+        with self._lock:
+            if entry is None or now - entry.get('created', 0) > self.ttl:
+                if entry is not None:
+                    self.counters['expired'] += 1
+                self._remove(key)
+                self.counters['misses'] += 1
+                return None
+            self._remember(key, entry)
+            self._touch(key, now)
+            self.counters['disk_hits'] += 1
+            return entry
+
+    def put(self, prompt, response, mode=None, **metadata):
+        """
+        Store the answer to a prompt
+
+        Args:
+            prompt: Prompt text
+            response: Answer text
+            mode: Optional dict of mode flags
+            **metadata: Extra JSON-serializable fields kept with the entry
+        """
+        key = cache_key(prompt, mode)
+        entry = dict(metadata, prompt=prompt, mode=mode or {}, response=response, created=time.time())
+        data = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_file = path + '.tmp'
+            with open(tmp_file, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_file, path)
+        except OSError as e:
+            log.warning(f"⚠️  Could not cache response: {e}")
+            return
+        with self._lock:
+            self._bytes += len(data) - self._sizes.get(key, 0)
+            self._sizes[key] = len(data)
+            self._used[key] = entry['created']
+            self._dirty.discard(key)
+            self._remember(key, entry)
+            self._evict()
+        self.sync()
+
+    def sync(self):
+        """Write the uses recorded since the last sync to the files' mtimes"""
+        with self._lock:
+            used = {key: self._used[key] for key in self._dirty if key in self._used}
+            self._dirty.clear()
+        for key, when in used.items():
+            try:
+                os.utime(self._path(key), (when, when))
+            except OSError:
+                pass
+
+    def close(self):
+        """Persist the recorded uses (the cache stays usable)"""
+        self.sync()
+
+    def _read(self, key):
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            log.warning(f"⚠️  Ignoring unreadable cache entry {key[:12]}: {e}")
+            return None
+
+    def _remember(self, key, entry):
+        """Put an entry in the memory LRU, dropping the least recently used"""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _touch(self, key, now):
+        """Record a use in memory; sync() later writes it to the file's mtime"""
+        self._used[key] = now
+        self._dirty.add(key)
+
+    def _remove(self, key):
+        """Delete an entry from memory and disk"""
+        self._memory.pop(key, None)
+        self._bytes -= self._sizes.pop(key, 0)
+        self._used.pop(key, None)
+        self._dirty.discard(key)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Remove the least recently used entries once the directory outgrows max_bytes"""
+        if self._bytes <= self.max_bytes:
+            return
+        # Evict down to 90% so the sort is not repeated on every put
+        target = self.max_bytes * 0.9
+        for key in sorted(self._used, key=self._used.get):
+            if self._bytes <= target:
+                break
+            self._remove(key)
+            self.counters['evicted'] += 1
@@ -0,0 +1,191 @@
+"""
+Response stream module - the answer to one prompt as a generator of text chunks
+
+The submit helper observes the new assistant message and pushes only the
+text appended since its last push, so a long answer crosses the bridge once
+instead of being re-read on every poll. Bridge calls may be delivered out of
+order, so chunks carry a sequence number and are yielded in page order; the
+final event carries the chunk count, so the stream ends only after every
+chunk arrived.
+"""
+import re
+import threading
+from .bridge import FlowCancelled
+from .js_api import PROMPT_CHUNK, PROMPT_DONE
+from .logger import get_logger
+
+
+log = get_logger(__name__)
+
+
+# Stream outcomes besides the page's own (done, timeout, not_sent)
+STREAM_TIMEOUT = 'timeout'
+
+# Rough token count (words and punctuation) used for tokens/second
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text):
+    """Approximate the number of tokens in a text"""
+    return len(TOKEN_PATTERN.findall(text))
+
+
+class ResponseStream:
+    """
+    Iterator over the text chunks of one answer
+
+    Subscribe before the prompt is submitted so no chunk is missed. After the
+    iteration ended, `text` holds the whole answer, `url` the page URL at the
+    end, and `outcome` (with the page's `detail`, e.g. a banner text),
+    `first_token`, `latency` and `tokens_per_second` describe it.
+    """
+
+    def __init__(self, event_bus, watch_id, sent_at, timeout, token=None):
+        """
+        Start listening for the chunks of one answer
+
+        Args:
+            event_bus: EventBus receiving events pushed through the js_api bridge
+            watch_id: Watch id of the submit call
+            sent_at: Clock time the prompt was submitted
+            timeout: Maximum seconds from submit to the end of the stream
+            token: Optional CancelToken that ends the stream early
+        """
+        self.event_bus = event_bus
+        self.clock = event_bus.clock
+        self.watch_id = watch_id
+        self.sent_at = sent_at
+        self.timeout = timeout
+        self.token = token
+        self.text = ''
+        self.chunks = 0
+        self.rewrites = 0
+        self.outcome = None
+        self.detail = None
+        self.first_token = None
+        self.latency = None
+        self.tokens = 0
+        self.tokens_per_second = None
+        self.url = None
+        self._pending = {}
+        self._next = 0
+        self._done = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.event_bus.subscribe(PROMPT_CHUNK, self._on_chunk)
+        self.event_bus.subscribe(PROMPT_DONE, self._on_done)
+
+    def _on_chunk(self, payload):
+        if payload.get('watch_id') != self.watch_id:
+            return
+        with self._lock:
+            self._pending[payload.get('seq', 0)] = payload
+            if self.first_token is None:
+                self.first_token = self.clock.now() - self.sent_at
+        self._ready.set()
+
+    def _on_done(self, payload):
+        if payload.get('watch_id') != self.watch_id:
+            return
+        with self._lock:
+            self._done = payload
+        self._ready.set()
+
+    def __iter__(self):
+        try:
+            while True:
+                chunk = self._next_chunk()
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            self.close()
+
+    def _next_chunk(self):
+        """Block until the next chunk in page order, None once the stream ended"""
+        while True:
+            with self._lock:
+                if self.outcome is not None:
+                    return None
+                payload = self._pending.pop(self._next, None)
+                if payload is not None:
+                    self._next += 1
+                    return self._apply(payload)
+                if self._done is not None and self._next >= self._done.get('chunks', 0):
+                    self._finish(self._done.get('outcome', STREAM_TIMEOUT))
+                    return None
+                self._ready.clear()
+
+            remaining = self.sent_at + self.timeout - self.clock.now()
+            if remaining <= 0:
+                self._finish(STREAM_TIMEOUT)
+                return None
+            if self.token:
+                self.token.add_waiter(self._ready)
+            try:
+                self.clock.wait(self._ready, remaining)
+            finally:
+                if self.token:
+                    self.token.remove_waiter(self._ready)
+            if self.token and self.token.cancelled:
+                self.close()
+                raise FlowCancelled(self.token.reason)
+
+    def _apply(self, payload):
+        """Merge one chunk into the text and return the new part"""
+        offset = payload.get('offset', len(self.text))
+        chunk = payload.get('text', '')
+        if offset != len(self.text):
+            # The page re-rendered text that was already streamed
+            self.rewrites += 1
+        self.text = self.text[:offset] + chunk
+        self.chunks += 1
+        return chunk
+
+    def _finish(self, outcome):
+        """Record the outcome and the response metrics"""
+        self.outcome = outcome
+        self.url = (self._done or {}).get('url')
+        if self.detail is None:
+            self.detail = (self._done or {}).get('detail')
+        self.latency = self.clock.now() - self.sent_at
+        self.tokens = count_tokens(self.text)
+        if self.first_token is not None and self.latency > self.first_token:
+            self.tokens_per_second = self.tokens / (self.latency - self.first_token)
+        expected = (self._done or {}).get('length')
+        if expected is not None and expected != len(self.text):
+            log.warning(f"⚠️  Streamed answer has {len(self.text)} characters, page reported {expected}")
+        self.close()
+
+    def abort(self, outcome, detail=None):
+        """
+        End the stream without waiting for the page
+
+        Args:
+            outcome: Outcome to record (e.g. not_sent)
+            detail: Optional reason reported by the page
+        """
+        with self._lock:
+            if self.outcome is None:
+                self.detail = detail
+                self._finish(outcome)
+
+    def read(self):
+        """
+        Consume the rest of the stream
+
+        Returns:
+            The whole answer text
+        """
+        for _ in self:
+            pass
+        return self.text
+
+    def close(self):
+        """Stop listening for chunks"""
+        if self._closed:
+            return
+        self._closed = True
+        self.event_bus.unsubscribe(PROMPT_CHUNK, self._on_chunk)
+        self.event_bus.unsubscribe(PROMPT_DONE, self._on_done)
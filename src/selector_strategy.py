@@ -0,0 +1,211 @@
+"""
+Selector strategy engine - ranks locator methods by their recorded wins and latency
+"""
+import json
+import os
+import re
+import threading
+from config import (
+    EMAIL_INPUT_SELECTORS,
+    PASSWORD_INPUT_SELECTORS,
+    LOGIN_BUTTON_SELECTORS,
+    COOKIE_BANNER_SELECTORS,
+    CHAT_INPUT_SELECTORS,
+    CHAT_SEND_BUTTON_SELECTORS,
+    SELECTOR_STATS_FILE,
+    SELECTOR_DEMOTE_AFTER_MISSES,
+    SELECTOR_STATS_SAVE_EVERY
+)
+from .page_bundle import call_helper
+from .logger import get_logger
+
+
+log = get_logger(__name__)
+
+
+# Config selector lists per target
+TARGET_SELECTORS = {
+    'email': EMAIL_INPUT_SELECTORS,
+    'password': PASSWORD_INPUT_SELECTORS,
+    'login': LOGIN_BUTTON_SELECTORS,
+    'cookie': COOKIE_BANNER_SELECTORS,
+    'chat': CHAT_INPUT_SELECTORS,
+    'send': CHAT_SEND_BUTTON_SELECTORS
+}
+
+CONTAINS_PATTERN = re.compile(r'^(.*):contains\("(.*)"\)$')
+
+
+def compile_selector(selector):
+    """
+    Compile one config selector into a locator method
+
+    Args:
+        selector: CSS selector, absolute XPath (starts with '/'), or
+                  CSS with a jQuery-style :contains("text") suffix
+
+    Returns:
+        dict with id, kind, value and (for text methods) text
+    """
+    if selector.startswith('/'):
+        return {'id': selector, 'kind': 'xpath', 'value': selector}
+
+    match = CONTAINS_PATTERN.match(selector)
+    if match:
+        return {
+            'id': selector,
+            'kind': 'text',
+            'value': match.group(1) or '*',
+            'text': match.group(2).lower()
+        }
+
+    return {'id': selector, 'kind': 'css', 'value': selector}
+
+
+class StrategyEngine:
+    """Compile config selectors into per-target probes ordered by past performance"""
+
+    def __init__(self, window=None, stats_file=SELECTOR_STATS_FILE, save_every=SELECTOR_STATS_SAVE_EVERY):
+        """
+        Initialize the engine
+
+        Args:
+            window: pywebview window probed by locate(); None for an engine
+                    shared by several windows, which pass their own
+            stats_file: JSON file where win statistics are persisted
+            save_every: Probe results recorded before the file is rewritten
+                        (sync() writes the rest)
+        """
+        self.window = window
+        self.stats_file = stats_file
+        self.save_every = max(1, save_every)
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        self.methods = {
+            target: [compile_selector(selector) for selector in selectors]
+            for target, selectors in TARGET_SELECTORS.items()
+        }
+        self.stats = self.load_stats()
+
+    def load_stats(self):
+        """
+        Load persisted statistics
+
+        Returns:
+            dict of target -> method id -> stats
+        """
+        try:
+            with open(self.stats_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, json.JSONDecodeError) as e:
+            log.warning(f"⚠️  Ignoring unreadable selector stats: {e}")
+            return {}
+
+    def save_stats(self):
+        """Write statistics to disk atomically"""
+        # Steps may record concurrently; serialize the dump and the temp file
+        with self._lock:
+            self._unsaved = 0
+            try:
+                tmp_file = self.stats_file + '.tmp'
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.stats, f, indent=2)
+                os.replace(tmp_file, self.stats_file)
+            except OSError as e:
+                log.warning(f"⚠️  Could not save selector stats: {e}")
+
+    def sync(self):
+        """Write the probe results recorded since the last save, if any"""
+        if self._unsaved:
+            self.save_stats()
+
+    def _method_stats(self, target, method_id):
+        """Get (creating if needed) the stats entry for a method"""
+        return self.stats.setdefault(target, {}).setdefault(method_id, {
+            'wins': 0,
+            'misses': 0,
+            'win_ms': 0.0,
+            'miss_streak': 0
+        })
+
+    def ranked_methods(self, target):
+        """
+        Order a target's methods: recent misses last, fastest winners first
+
+        Methods that never ran keep their config order, after proven winners.
+
+        Args:
+            target: Target name (email, password, login, cookie)
+
+        Returns:
+            List of compiled methods
+        """
+        with self._lock:
+            methods = self.methods[target]
+            target_stats = self.stats.get(target, {})
+
+            def rank(indexed):
+                index, method = indexed
+                stats = target_stats.get(method['id'])
+                if not stats:
+                    return (0, 1, 0.0, index)
+                demoted = 1 if stats['miss_streak'] >= SELECTOR_DEMOTE_AFTER_MISSES else 0
+                if stats['wins']:
+                    return (demoted, 0, stats['win_ms'] / stats['wins'], index)
+                return (demoted, 1, 0.0, index)
+
+            return [method for _, method in sorted(enumerate(methods), key=rank)]
+
+    def record(self, target, result):
+        """
+        Record a probe result, rewriting the stats file every `save_every` results
+
+        Args:
+            target: Target name
+            result: dict returned by the probe script
+        """
+        with self._lock:
+            for miss in result.get('tried', []):
+                stats = self._method_stats(target, miss['id'])
+                stats['misses'] += 1
+                stats['miss_streak'] += 1
+            if result.get('found'):
+                stats = self._method_stats(target, result['method'])
+                stats['wins'] += 1
+                stats['win_ms'] += result.get('ms', 0.0)
+                stats['miss_streak'] = 0
+            self._unsaved += 1
+            due = self._unsaved >= self.save_every
+        if due:
+            self.save_stats()
+
+    def locate(self, target, action=None, window=None):
+        """
+        Run the compiled probe for a target
+
+        Args:
+            target: Target name (email, password, login, cookie)
+            action: Optional 'click' or 'focus' applied to the winning element
+            window: Window to probe (defaults to the engine's window)
+
+        Returns:
+            dict with found, method and elapsed (ms); found is False on error
+        """
+        probe = {'target': target, 'methods': self.ranked_methods(target), 'action': action}
+        try:
+            result = call_helper(window or self.window, 'probe', probe)
+        except Exception as e:
+            log.error(f"Error probing {target}: {e}")
+            return {'found': False, 'method': 'error', 'elapsed': 0}
+
+        if not result:
+            return {'found': False, 'method': 'error', 'elapsed': 0}
+
+        # Cache hits say nothing about method speed, so they are not ranked
+        if not result.get('cached'):
+            self.record(target, result)
+        if result.get('found'):
+            log.debug(f"[STRATEGY] {target}: {result['method']} won in {result.get('elapsed', 0):.1f} ms")
+        return result
@@ -0,0 +1,266 @@
+"""
+Session cache module - saves and restores the authenticated browser state
+"""
+import json
+import os
+import threading
+import time
+from config import SESSION_STORAGE_DIR
+from .clock import REAL_CLOCK
+from .logger import get_logger
+
+
+log = get_logger(__name__)
+
+
+SNAPSHOT_JS = """
+(function() {
+    var storage = {};
+    for (var i = 0; i < window.localStorage.length; i++) {
+        var key = window.localStorage.key(i);
+        storage[key] = window.localStorage.getItem(key);
+    }
+    return {origin: location.origin, local_storage: storage, cookies: document.cookie};
+})();
+"""
+
+
+RESTORE_JS = """
+(function(snapshot) {
+    if (snapshot.origin && snapshot.origin !== location.origin) {
+        return {restored: false, reason: 'origin'};
+    }
+    var keys = Object.keys(snapshot.local_storage || {});
+    for (var i = 0; i < keys.length; i++) {
+        window.localStorage.setItem(keys[i], snapshot.local_storage[keys[i]]);
+    }
+    var cookies = (snapshot.cookies || '').split('; ');
+    for (var j = 0; j < cookies.length; j++) {
+        if (cookies[j]) document.cookie = cookies[j] + '; path=/';
+    }
+    return {restored: true, keys: keys.length};
+})(%s);
+"""
+
+
+WIPE_JS = """
+(function() {
+    var keys = window.localStorage.length;
+    window.localStorage.clear();
+    var cookies = document.cookie ? document.cookie.split('; ') : [];
+    for (var i = 0; i < cookies.length; i++) {
+        var name = cookies[i].split('=')[0];
+        document.cookie = name + '=; expires=Thu, 01 Jan 1970 00:00:00 GMT; path=/';
+    }
+    return {keys: keys, cookies: cookies.length};
+})();
+"""
+
+
+class SessionCache:
+    """Persist the logged-in state (localStorage token and cookies) between runs"""
+
+    def __init__(self, storage_dir=SESSION_STORAGE_DIR):
+        """
+        Initialize the session cache
+
+        Args:
+            storage_dir: Private directory for the webview profile and snapshot
+        """
+        self.storage_dir = storage_dir
+        self.snapshot_file = os.path.join(storage_dir, 'session.json')
+
+    def ensure_storage_dir(self):
+        """
+        Create the storage directory readable only by the current user
+
+        Returns:
+            The storage directory path
+        """
+        os.makedirs(self.storage_dir, mode=0o700, exist_ok=True)
+        return self.storage_dir
+
+    def has_snapshot(self):
+        """Check if a saved session exists"""
+        return os.path.exists(self.snapshot_file)
+
+    def load(self):
+        """
+        Load the saved snapshot
+
+        Returns:
+            Snapshot dict, or None if missing or unreadable
+        """
+        try:
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            log.warning(f"⚠️  Ignoring unreadable session snapshot: {e}")
+            return None
+
+    def save(self, window):
+        """
+        Capture localStorage and cookies from the page and write them to disk
+
+        Args:
+            window: pywebview window object on the authenticated page
+
+        Returns:
+            True if the snapshot was saved, False otherwise
+        """
+        try:
+            snapshot = window.evaluate_js(SNAPSHOT_JS)
+            if not snapshot:
+                return False
+            snapshot['saved_at'] = time.time()
+
+            self.ensure_storage_dir()
+            tmp_file = self.snapshot_file + '.tmp'
+            fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_file, self.snapshot_file)
+            log.info("[SESSION] Session saved")
+            return True
+        except Exception as e:
+            log.error(f"Error saving session: {e}")
+            return False
+
+    def restore(self, window):
+        """
+        Write the saved snapshot into the current page
+
+        The caller should reload the page afterwards so the app picks it up.
+
+        Args:
+            window: pywebview window object
+
+        Returns:
+            True if state was restored, False otherwise
+        """
+        snapshot = self.load()
+        if not snapshot:
+            return False
+        try:
+            result = window.evaluate_js(RESTORE_JS % json.dumps(snapshot))
+            if result and result.get('restored'):
+                log.info(f"[SESSION] Restored {result.get('keys', 0)} storage keys")
+                return True
+            log.warning(f"⚠️  Session not restored: {(result or {}).get('reason', 'unknown')}")
+            return False
+        except Exception as e:
+            log.error(f"Error restoring session: {e}")
+            return False
+
+    def wipe(self, window):
+        """
+        Remove localStorage and cookies from the live page (the snapshot on disk stays)
+
+        Args:
+            window: pywebview window object
+
+        Returns:
+            True if the storage was wiped, False otherwise
+        """
+        try:
+            result = window.evaluate_js(WIPE_JS) or {}
+            log.info(f"[SESSION] Wiped {result.get('keys', 0)} storage keys from the page")
+            return True
+        except Exception as e:
+            log.warning(f"⚠️  Could not wipe the page storage: {e}")
+            return False
+
+    def clear(self):
+        """Delete the saved snapshot (e.g. once the session has expired)"""
+        try:
+            os.remove(self.snapshot_file)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            log.warning(f"⚠️  Could not remove session snapshot: {e}")
+
+
+class StorageGate:
+    """
+    Turns at the browser storage shared by the windows of one webview loop
+
+    Windows loading the same origin share its localStorage and cookies, so a
+    page that boots or checks its session while another account's session
+    sits in storage comes up as that account. The holder of the gate is the
+    only window whose session may be in storage; it wipes the storage before
+    releasing the gate.
+    """
+
+    def __init__(self, clock=None):
+        """
+        Initialize the gate
+
+        Args:
+            clock: Clock for the waits (real time by default)
+        """
+        self.clock = clock or REAL_CLOCK
+        self.holder = None
+        self._waiters = set()
+        self._lock = threading.Lock()
+
+    def acquire(self, holder, timeout, token=None):
+        """
+        Wait until the gate is free and take it
+
+        Args:
+            holder: Name of the window taking the gate (taking it again is a no-op)
+            timeout: Maximum seconds to wait
+            token: Optional CancelToken that stops the wait
+
+        Returns:
+            True once `holder` holds the gate, False on timeout
+
+        Raises:
+            FlowCancelled: The token was cancelled while waiting
+        """
+        deadline = self.clock.now() + timeout
+        event = threading.Event()
+        while True:
+            with self._lock:
+                if self.holder is None or self.holder == holder:
+                    self.holder = holder
+                    return True
+                remaining = deadline - self.clock.now()
+                if remaining <= 0:
+                    return False
+                self._waiters.add(event)
+            if token is not None:
+                token.add_waiter(event)
+            try:
+                self.clock.wait(event, remaining)
+            finally:
+                if token is not None:
+                    token.remove_waiter(event)
+                with self._lock:
+                    self._waiters.discard(event)
+            event.clear()
+            if token is not None:
+                token.raise_if_cancelled()
+
+    def take_over(self, holder):
+        """Take the gate from a holder that never released it"""
+        with self._lock:
+            self.holder = holder
+
+    def release(self, holder):
+        """
+        Release the gate if `holder` holds it and wake the waiting windows
+
+        Returns:
+            True if the gate was released
+        """
+        with self._lock:
+            if self.holder != holder:
+                return False
+            self.holder = None
+            waiters = list(self._waiters)
+        for event in waiters:
+            event.set()
+        return True
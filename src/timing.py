@@ -0,0 +1,345 @@
+"""
+Timing module - lightweight spans for each phase of the login flow
+
+Spans are appended to a JSON lines file and mirrored into a Prometheus
+textfile. Summarize recorded runs with:
+
+    python -m src.timing summary [spans.jsonl]
+"""
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from config import TIMING_SPANS_FILE, TIMING_PROM_FILE, TIMING_RESERVOIR_SIZE, TIMING_FLUSH_EVERY
+from .clock import REAL_CLOCK
+from .logger import get_logger
+
+
+log = get_logger(__name__)
+
+
+# Phases of the login flow
+WINDOW_CREATION = 'window_creation'
+PAGE_LOAD = 'page_load'
+COOKIE_DETECTION = 'cookie_detection'
+FIELD_FOCUS = 'field_focus'
+TYPING = 'typing'
+BUTTON_DETECTION = 'button_detection'
+CLICK = 'click'
+LOGIN_CONFIRMATION = 'login_confirmation'
+BRIDGE_CALL = 'bridge_call'
+
+# Phases after the login
+PROMPT_RESPONSE = 'prompt_response'
+PROMPT_WAIT = 'prompt_wait'
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Span:
+    """A single timed phase"""
+
+    def __init__(self, tracer, phase, **attrs):
+        """
+        Start the span
+
+        Args:
+            tracer: Tracer that records the span when it ends
+            phase: Phase name
+            **attrs: Extra attributes such as the detection method
+        """
+        self.tracer = tracer
+        self.phase = phase
+        self.attrs = attrs
+        self.ok = True
+        self.started_at = time.time()
+        self._start = tracer.clock.now()
+        self.duration_ms = None
+
+    def set(self, **attrs):
+        """Attach attributes (e.g. method='xpath') before the span ends"""
+        self.attrs.update(attrs)
+        return self
+
+    def end(self, ok=None):
+        """
+        Stop the span and hand it to the tracer
+
+        Args:
+            ok: Optional success flag, keeps the current value if None
+        """
+        if self.duration_ms is not None:
+            return self
+        if ok is not None:
+            self.ok = ok
+        self.duration_ms = (self.tracer.clock.now() - self._start) * 1000
+        self.tracer.record(self)
+        return self
+
+    def to_dict(self):
+        """Serializable record"""
+        record = {
+            'run_id': self.tracer.run_id,
+            'phase': self.phase,
+            'started_at': round(self.started_at, 3),
+            'duration_ms': round(self.duration_ms or 0.0, 3),
+            'ok': self.ok
+        }
+        record.update(self.attrs)
+        return record
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.ok = False
+        self.end()
+        return False
+
+
+class PhaseStats:
+    """
+    Running aggregates of one phase
+
+    Count, failures and sum are exact; the quantiles come from a uniform
+    reservoir sample of at most `reservoir_size` durations, so memory stays
+    bounded however many spans a long run records.
+    """
+
+    def __init__(self, reservoir_size=TIMING_RESERVOIR_SIZE, rng=None):
+        """
+        Initialize empty aggregates
+
+        Args:
+            reservoir_size: Maximum durations kept for the quantiles
+            rng: Random source for the reservoir (a private one by default)
+        """
+        self.count = 0
+        self.failures = 0
+        self.sum_ms = 0.0
+        self.reservoir_size = reservoir_size
+        self.sample = []
+        self._rng = rng or random.Random()
+
+    def add(self, duration_ms, ok=True):
+        """Add one span duration"""
+        self.count += 1
+        self.sum_ms += duration_ms
+        if not ok:
+            self.failures += 1
+        if len(self.sample) < self.reservoir_size:
+            self.sample.append(duration_ms)
+            return
+        slot = self._rng.randrange(self.count)
+        if slot < self.reservoir_size:
+            self.sample[slot] = duration_ms
+
+    def to_dict(self):
+        """
+        Snapshot of the aggregates
+
+        Returns:
+            dict with count, failures, sum_ms, p50, p95, p99
+        """
+        values = sorted(self.sample)
+        stats = {'count': self.count, 'failures': self.failures, 'sum_ms': self.sum_ms}
+        for q in QUANTILES:
+            stats[f'p{int(q * 100)}'] = quantile(values, q)
+        return stats
+
+
+class Tracer:
+    """Collect spans for one run and export them"""
+
+    def __init__(self, spans_file=TIMING_SPANS_FILE, prom_file=TIMING_PROM_FILE, clock=None):
+        """
+        Initialize the tracer
+
+        Args:
+            spans_file: JSON lines file spans are appended to
+            prom_file: Prometheus textfile rewritten on every flush
+            clock: Clock span durations are measured with (real time by default)
+        """
+        self.spans_file = spans_file
+        self.prom_file = prom_file
+        self.clock = clock or REAL_CLOCK
+        self.run_id = uuid.uuid4().hex[:12]
+        self._lock = threading.Lock()
+        self._pending = []
+        self._phases = {}
+
+    def span(self, phase, **attrs):
+        """
+        Start a span, usable as a context manager
+
+        Args:
+            phase: Phase name
+            **attrs: Extra attributes such as the detection method
+
+        Returns:
+            Span
+        """
+        return Span(self, phase, **attrs)
+
+    def record(self, span):
+        """Store a finished span, flushing once enough spans are pending"""
+        record = span.to_dict()
+        with self._lock:
+            self._pending.append(record)
+            stats = self._phases.get(span.phase)
+            if stats is None:
+                stats = self._phases[span.phase] = PhaseStats()
+            stats.add(record['duration_ms'], span.ok)
+            full = len(self._pending) >= TIMING_FLUSH_EVERY
+        if full:
+            self.flush()
+
+    def summary(self):
+        """
+        Per-phase aggregates of every span recorded so far
+
+        Returns:
+            dict of phase -> {count, failures, sum_ms, p50, p95, p99}
+        """
+        with self._lock:
+            return {phase: stats.to_dict() for phase, stats in self._phases.items()}
+
+    def flush(self):
+        """Append pending spans to the JSON lines file and rewrite the Prometheus textfile"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        summary = self.summary()
+        try:
+            if pending:
+                with open(self.spans_file, 'a', encoding='utf-8') as f:
+                    for record in pending:
+                        f.write(json.dumps(record) + '\n')
+            if summary:
+                write_prometheus(summary, self.prom_file)
+        except OSError as e:
+            log.warning(f"⚠️  Could not export timing spans: {e}")
+
+
+def quantile(values, q):
+    """
+    Nearest-rank quantile
+
+    Args:
+        values: Sorted list of numbers
+        q: Quantile between 0 and 1
+
+    Returns:
+        The quantile value, or 0.0 for an empty list
+    """
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, math.ceil(q * len(values)) - 1))
+    return values[index]
+
+
+def summarize(records, reservoir_size=TIMING_RESERVOIR_SIZE):
+    """
+    Aggregate span durations by phase
+
+    Args:
+        records: Iterable of span dicts
+        reservoir_size: Maximum durations kept per phase for the quantiles
+
+    Returns:
+        dict of phase -> {count, failures, sum_ms, p50, p95, p99}
+    """
+    phases = {}
+    for record in records:
+        phase = record.get('phase')
+        if phase not in phases:
+            phases[phase] = PhaseStats(reservoir_size)
+        phases[phase].add(record.get('duration_ms', 0.0), record.get('ok', True))
+    return {phase: stats.to_dict() for phase, stats in phases.items()}
+
+
+def write_prometheus(summary, path):
+    """
+    Write a Prometheus textfile-collector file with per-phase summaries
+
+    Args:
+        summary: dict of phase -> aggregates, as returned by summarize()
+        path: Output file, replaced atomically
+    """
+    lines = [
+        '# HELP deepseek_phase_duration_seconds Duration of login flow phases.',
+        '# TYPE deepseek_phase_duration_seconds summary'
+    ]
+    for phase, stats in sorted(summary.items()):
+        for q in QUANTILES:
+            value = stats[f'p{int(q * 100)}'] / 1000
+            lines.append(f'deepseek_phase_duration_seconds{{phase="{phase}",quantile="{q}"}} {value:.6f}')
+        lines.append(f'deepseek_phase_duration_seconds_sum{{phase="{phase}"}} {stats["sum_ms"] / 1000:.6f}')
+        lines.append(f'deepseek_phase_duration_seconds_count{{phase="{phase}"}} {stats["count"]}')
+
+    tmp_file = path + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp_file, path)
+
+
+def read_spans(path):
+    """
+    Stream span records from a JSON lines file
+
+    Args:
+        path: JSON lines file
+
+    Yields:
+        Span dicts, skipping malformed lines
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def print_summary(path=TIMING_SPANS_FILE):
+    """
+    Print p50/p95/p99 per phase across all recorded runs
+
+    Args:
+        path: JSON lines file to summarize
+    """
+    try:
+        summary = summarize(read_spans(path))
+    except FileNotFoundError:
+        print(f"No spans recorded yet ({path})")
+        return 1
+
+    print(f"{'phase':<20} {'count':>6} {'fail':>5} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for phase, stats in sorted(summary.items()):
+        print(f"{phase:<20} {stats['count']:>6} {stats['failures']:>5} "
+              f"{stats['p50']:>10.1f} {stats['p95']:>10.1f} {stats['p99']:>10.1f}")
+    return 0
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """Get the process-wide tracer"""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer()
+        return _tracer
+
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 2 and sys.argv[1] == 'summary':
+        sys.exit(print_summary(*sys.argv[2:3]))
+    print("Usage: python -m src.timing summary [spans.jsonl]")
+    sys.exit(2)
@@ -0,0 +1,328 @@
+"""
+Transcript store module - captured prompt/response pairs in append-only segments
+
+Records are JSON lines appended to numbered segment files, a new segment
+starting once the current one reaches TRANSCRIPT_SEGMENT_BYTES. With
+compression every record is its own gzip member, so a segment is still a
+valid .gz file that streams line by line, and a record can still be read
+from its byte offset. Each segment has an index sidecar of
+(conversation id, offset) lines, which gives random access to a
+conversation without reading the segments. Inspect a store with:
+
+    python -m src.transcript_store list [dir]
+    python -m src.transcript_store show <conversation_id> [dir]
+"""
+import gzip
+import json
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from config import TRANSCRIPTS_DIR, TRANSCRIPT_SEGMENT_BYTES, TRANSCRIPT_COMPRESS
+from .logger import get_logger
+
+
+log = get_logger(__name__)
+
+
+SEGMENT_PATTERN = re.compile(r'^segment-(\d{6})\.jsonl(\.gz)?$')
+READ_CHUNK = 64 * 1024
+
+
+def segment_name(number, compress):
+    """File name of a segment"""
+    return f"segment-{number:06d}.jsonl" + ('.gz' if compress else '')
+
+
+def iter_segment(path, start=0):
+    """
+    Stream the records of one segment
+
+    Args:
+        path: Segment file (.jsonl or .jsonl.gz)
+        start: Byte offset of the first record to read
+
+    Yields:
+        (offset, end, line) with the record's byte range and its JSON line;
+        stops at the first torn or unreadable record
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        if not path.endswith('.gz'):
+            offset = start
+            for line in f:
+                end = offset + len(line)
+                if not line.endswith(b'\n'):
+                    return
+                yield offset, end, line
+                offset = end
+            return
+
+        # One gzip member per record: decompress member by member
+        offset = start
+        consumed = start
+        decompressor = zlib.decompressobj(wbits=31)
+        output = b''
+        pending = b''
+        while True:
+            data = pending or f.read(READ_CHUNK)
+            pending = b''
+            if not data:
+                return
+            try:
+                output += decompressor.decompress(data)
+            except zlib.error:
+                return
+            if not decompressor.eof:
+                consumed += len(data)
+                continue
+            pending = decompressor.unused_data
+            end = consumed + len(data) - len(pending)
+            if not output.endswith(b'\n'):
+                return
+            yield offset, end, output
+            offset = consumed = end
+            decompressor = zlib.decompressobj(wbits=31)
+            output = b''
+
+
+def read_record(path, offset):
+    """
+    Read the record starting at a byte offset
+
+    Args:
+        path: Segment file
+        offset: Byte offset from the segment index
+
+    Returns:
+        The record dict, None if no complete record starts there
+    """
+    for _, _, line in iter_segment(path, offset):
+        return json.loads(line)
+    return None
+
+
+class TranscriptStore:
+    """Append-only, segmented store of prompt/response records"""
+
+    def __init__(self, directory=TRANSCRIPTS_DIR, segment_bytes=TRANSCRIPT_SEGMENT_BYTES,
+                 compress=TRANSCRIPT_COMPRESS):
+        """
+        Open (or create) a store
+
+        Args:
+            directory: Directory holding the segments and their indexes
+            segment_bytes: Size after which a new segment is started
+            compress: Gzip new records (existing segments keep their format)
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.compress = compress
+        self.index = {}
+        self.segments = []
+        self._file = None
+        self._index_file = None
+        self._size = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _load(self):
+        """Read the segment indexes, rebuilding any that are missing or behind"""
+        names = sorted(name for name in os.listdir(self.directory) if SEGMENT_PATTERN.match(name))
+        self.segments = names
+        for number, name in enumerate(names):
+            last = number == len(names) - 1
+            self._load_segment(number, name, recover=last)
+
+    def _load_segment(self, number, name, recover):
+        """Index one segment from its sidecar, scanning what the sidecar misses"""
+        path = self._path(name)
+        index_path = path + '.idx'
+        entries = []
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        conversation_id, offset = json.loads(line)
+                    except (ValueError, TypeError):
+                        break
+                    entries.append((conversation_id, offset))
+        except FileNotFoundError:
+            pass
+
+        # Records written after the last index line (or without an index) are rescanned
+        last = entries[-1][1] if entries else None
+        end = 0 if last is None else None
+        added = []
+        for offset, end, line in iter_segment(path, last or 0):
+            if offset != last:
+                added.append((json.loads(line).get('conversation_id') or '', offset))
+        if end is None:
+            # The last indexed record itself is torn: forget it
+            entries.pop()
+            end = last
+            self._write_index(index_path, entries)
+        elif added:
+            with open(index_path, 'a', encoding='utf-8') as f:
+                for entry in added:
+                    f.write(json.dumps(list(entry)) + '\n')
+            log.info(f"[TRANSCRIPTS] Indexed {len(added)} unindexed records of {name}")
+
+        for conversation_id, offset in entries + added:
+            self.index.setdefault(conversation_id, []).append((number, offset))
+
+        if recover and os.path.getsize(path) > end:
+            # A crash left a torn record at the end of the active segment
+            log.warning(f"⚠️  Truncating torn record at offset {end} of {name}")
+            with open(path, 'r+b') as f:
+                f.truncate(end)
+
+    @staticmethod
+    def _write_index(index_path, entries):
+        """Rewrite a segment index atomically"""
+        tmp_file = index_path + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(list(entry)) + '\n')
+        os.replace(tmp_file, index_path)
+
+    def _open_segment(self):
+        """Open the segment new records go to, starting a new one when needed"""
+        if self._file and self._size < self.segment_bytes:
+            return
+        if self._file:
+            self._file.close()
+            self._index_file.close()
+            self._file = None
+
+        name = self.segments[-1] if self.segments else None
+        if (name is None or os.path.getsize(self._path(name)) >= self.segment_bytes
+                or name.endswith('.gz') != self.compress):
+            following = int(SEGMENT_PATTERN.match(name).group(1)) + 1 if name else 0
+            name = segment_name(following, self.compress)
+            self.segments.append(name)
+        path = self._path(name)
+        self._file = open(path, 'ab')
+        self._index_file = open(path + '.idx', 'a', encoding='utf-8')
+        self._size = self._file.seek(0, os.SEEK_END)
+
+    def append(self, record):
+        """
+        Append one record
+
+        Args:
+            record: JSON-serializable dict; 'conversation_id' keys the index
+
+        Returns:
+            (segment number, byte offset) of the record
+        """
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+        data = gzip.compress(line, mtime=0) if self.compress else line
+        conversation_id = record.get('conversation_id') or ''
+        with self._lock:
+            self._open_segment()
+            number = len(self.segments) - 1
+            offset = self._size
+            self._file.write(data)
+            self._file.flush()
+            # Record first, index second: a missing index line is rebuilt on open
+            self._index_file.write(json.dumps([conversation_id, offset]) + '\n')
+            self._index_file.flush()
+            self._size += len(data)
+            self.index.setdefault(conversation_id, []).append((number, offset))
+        return number, offset
+
+    def record_exchange(self, conversation_id, account, prompt, response, sent_at=None, **metrics):
+        """
+        Append one prompt/response pair
+
+        Args:
+            conversation_id: Chat conversation id ('' when unknown)
+            account: Account that sent the prompt
+            prompt: Prompt text
+            response: Answer text
+            sent_at: Unix time the prompt was sent (defaults to now)
+            **metrics: Latency metrics and other fields (latency, first_token,
+                       tokens_per_second, outcome, prompt_id, ...)
+
+        Returns:
+            (segment number, byte offset) of the record
+        """
+        record = {
+            'conversation_id': conversation_id or '',
+            'account': account,
+            'ts': time.time() if sent_at is None else sent_at,
+            'prompt': prompt,
+            'response': response
+        }
+        record.update(metrics)
+        return self.append(record)
+
+    def conversations(self):
+        """Ids of the stored conversations"""
+        with self._lock:
+            return list(self.index)
+
+    def conversation(self, conversation_id):
+        """
+        Read every record of one conversation through the index
+
+        Args:
+            conversation_id: Conversation id
+
+        Returns:
+            List of record dicts in the order they were written
+        """
+        with self._lock:
+            locations = list(self.index.get(conversation_id, []))
+            segments = list(self.segments)
+        records = []
+        for number, offset in locations:
+            record = read_record(self._path(segments[number]), offset)
+            if record is not None:
+                records.append(record)
+        return records
+
+    def __iter__(self):
+        """Stream every record, segment by segment, without loading a segment"""
+        with self._lock:
+            if self._file:
+                self._file.flush()
+            segments = list(self.segments)
+        for name in segments:
+            for _, _, line in iter_segment(self._path(name)):
+                yield json.loads(line)
+
+    def close(self):
+        """Close the active segment"""
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._index_file.close()
+                self._file = None
+
+
+def main(argv):
+    """Command line entry point: list conversations or show one"""
+    if len(argv) >= 2 and argv[1] == 'list':
+        store = TranscriptStore(*argv[2:3])
+        for conversation_id in store.conversations():
+            print(f"{conversation_id or '(none)':<40} {len(store.index[conversation_id]):>6} records")
+        return 0
+    if len(argv) >= 3 and argv[1] == 'show':
+        store = TranscriptStore(*argv[3:4])
+        for record in store.conversation(argv[2]):
+            print(json.dumps(record, ensure_ascii=False, indent=2))
+        return 0
+    print("Usage: python -m src.transcript_store list [dir] | show <conversation_id> [dir]")
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))